@@ -0,0 +1,346 @@
+// ----- Decode the compact (columnar) data tables embedded by report() ----->
+//
+// A table is embedded as {"n": rows, "c": [column names], "v": [column values]}, where each
+// column is either an array of values or, for repetitive string columns, a dictionary
+// {"d": [distinct values], "i": [index of each row's value in d]}.
+// decodeTable() rebuilds the usual array of records ({column: value} objects, columns in order).
+function decodeColumn(v){
+  if (Array.isArray(v)) {
+    return v;
+  }
+  var dict = v["d"];
+  return v["i"].map(function(i){ return dict[i]; });
+}
+
+function decodeTable(t){
+  var names = t["c"];
+  var columns = t["v"].map(decodeColumn);
+  var rows = new Array(t["n"]);
+  for (var r = 0; r < t["n"]; r++) {
+    var row = {};
+    for (var j = 0; j < names.length; j++) {
+      row[names[j]] = columns[j][r];
+    }
+    rows[r] = row;
+  }
+  return rows;
+}
+
+// Define the global variable `name` whose value build() returns, built on first use only
+// (tables of tabs that are never opened are never decoded).
+function defineLazyData(name, build){
+  var root = (typeof window !== "undefined") ? window : globalThis;
+  function setValue(value){
+    Object.defineProperty(root, name, {value: value, writable: true, configurable: true, enumerable: true});
+    return value;
+  }
+  Object.defineProperty(root, name, {
+    configurable: true,
+    enumerable: true,
+    get: function(){ return setValue(build()); },
+    set: setValue,
+  });
+}
+
+
+
+// ----- Tab data kept in sibling JSON files or compressed blocks ----->
+//
+// A tab's data is {"compact": bool, "entries": [{"name": variable, "keys": [...], "table": table}]},
+// either in a sibling JSON file (report_to_file(..., tab_data_files=True)), fetched the first time
+// openTab() opens the tab, or embedded gzipped and base64-encoded (report(..., compress_data=True)),
+// decompressed when the page loads. Until a tab's data is in, the tab's update functions only
+// remember that they were called, and run once it has loaded.
+var tabDataFiles = {};
+
+function setGlobalData(name, keys, value){
+  var root = (typeof window !== "undefined") ? window : globalThis;
+  if (keys.length == 0) {
+    Object.defineProperty(root, name, {value: value, writable: true, configurable: true, enumerable: true});
+    return;
+  }
+  if (root[name] === undefined) {
+    setGlobalData(name, [], {});
+  }
+  var obj = root[name];
+  keys.slice(0, -1).forEach(function(key){
+    if (obj[key] === undefined) {
+      obj[key] = {};
+    }
+    obj = obj[key];
+  });
+  obj[keys[keys.length - 1]] = value;
+}
+
+function registerTabData(tab, url, gzipBase64){
+  tabDataFiles[tab] = {url: url, gzipBase64: gzipBase64, state: "pending", pending: []};
+}
+
+function readTabData(file){
+  if (file.gzipBase64 !== undefined) {
+    return gunzipBase64(file.gzipBase64).then(JSON.parse);
+  }
+  return fetch(file.url).then(function(response){
+    if (!response.ok) {
+      throw new Error(response.status + " " + response.statusText);
+    }
+    return response.json();
+  });
+}
+
+function loadTabData(tab){
+  var file = tabDataFiles[tab];
+  if (file === undefined || file.state != "pending") {
+    return;
+  }
+  file.state = "loading";
+  readTabData(file)
+    .then(function(data){
+      data["entries"].forEach(function(entry){
+        setGlobalData(entry["name"], entry["keys"], data["compact"] ? decodeTable(entry["table"]) : entry["table"]);
+      });
+      file.state = "loaded";
+      var pending = file.pending;
+      file.pending = [];
+      pending.forEach(function(fn){ fn(); });
+    })
+    .catch(function(error){
+      file.state = "pending";
+      console.error("Could not load the data of tab " + tab + (file.url ? " (" + file.url + ")" : "") + ":", error);
+    });
+}
+
+// Replace the global functions `names` with versions that wait for the tab's data
+function deferUntilTabData(tab, names){
+  var root = (typeof window !== "undefined") ? window : globalThis;
+  var file = tabDataFiles[tab];
+  names.forEach(function(name){
+    var fn = root[name];
+    if (file === undefined || typeof fn !== "function") {
+      return;
+    }
+    root[name] = function(){
+      if (file.state == "loaded") {
+        return fn.apply(this, arguments);
+      }
+      if (file.pending.indexOf(fn) < 0) {
+        file.pending.push(fn);
+      }
+    };
+  });
+}
+
+// Load a tab's data the first time openTab() shows it (tabs: {openTab name: tab})
+function loadTabDataOnOpen(tabs){
+  var root = (typeof window !== "undefined") ? window : globalThis;
+  var openTabOrig = root.openTab;
+  root.openTab = function(evt, tabName){
+    var result = openTabOrig.apply(this, arguments);
+    if (tabs[tabName] !== undefined) {
+      loadTabData(tabs[tabName]);
+    }
+    return result;
+  };
+}
+
+
+
+// ----- Decompress gzipped, base64-encoded text ----->
+//
+// Uses the browser's DecompressionStream, or inflate() below in browsers without it.
+function gunzipBase64(b64){
+  var binary = atob(b64);
+  var bytes = new Uint8Array(binary.length);
+  for (var i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  if (typeof DecompressionStream !== "undefined") {
+    var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"));
+    return new Response(stream).text();
+  }
+  return new Promise(function(resolve){
+    resolve(new TextDecoder("utf-8").decode(gunzip(bytes)));
+  });
+}
+
+// Strip the gzip header (RFC 1952) and inflate the deflate data
+function gunzip(bytes){
+  if (bytes[0] != 0x1f || bytes[1] != 0x8b || bytes[2] != 8) {
+    throw new Error("gunzip: not gzip data");
+  }
+  var flags = bytes[3];
+  var pos = 10;
+  if (flags & 4) {
+    pos += 2 + (bytes[pos] | (bytes[pos + 1] << 8));
+  }
+  if (flags & 8) {
+    while (bytes[pos++] != 0) {}
+  }
+  if (flags & 16) {
+    while (bytes[pos++] != 0) {}
+  }
+  if (flags & 2) {
+    pos += 2;
+  }
+  return inflate(bytes.subarray(pos));
+}
+
+// Inflate raw deflate data (RFC 1951), after zlib's reference decoder "puff"
+function inflate(src){
+  var LEN_BASE = [3, 4, 5, 6, 7, 8, 9, 10, 11, 13, 15, 17, 19, 23, 27, 31, 35, 43, 51, 59, 67, 83, 99, 115, 131, 163, 195, 227, 258];
+  var LEN_EXTRA = [0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 2, 2, 3, 3, 3, 3, 4, 4, 4, 4, 5, 5, 5, 5, 0];
+  var DIST_BASE = [1, 2, 3, 4, 5, 7, 9, 13, 17, 25, 33, 49, 65, 97, 129, 193, 257, 385, 513, 769, 1025, 1537, 2049, 3073, 4097, 6145, 8193, 12289, 16385, 24577];
+  var DIST_EXTRA = [0, 0, 0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 5, 5, 6, 6, 7, 7, 8, 8, 9, 9, 10, 10, 11, 11, 12, 12, 13, 13];
+  var CODE_LENGTH_ORDER = [16, 17, 18, 0, 8, 7, 9, 6, 10, 5, 11, 4, 12, 3, 13, 2, 14, 1, 15];
+
+  var pos = 0, bitBuf = 0, bitCnt = 0;
+  var out = new Uint8Array(Math.max(1024, src.length * 4)), outLen = 0;
+
+  function bits(n){
+    while (bitCnt < n) {
+      if (pos >= src.length) {
+        throw new Error("inflate: unexpected end of data");
+      }
+      bitBuf |= src[pos++] << bitCnt;
+      bitCnt += 8;
+    }
+    var value = bitBuf & ((1 << n) - 1);
+    bitBuf >>>= n;
+    bitCnt -= n;
+    return value;
+  }
+
+  function reserve(n){
+    if (outLen + n > out.length) {
+      var bigger = new Uint8Array(Math.max(out.length * 2, outLen + n));
+      bigger.set(out.subarray(0, outLen));
+      out = bigger;
+    }
+  }
+
+  // Canonical Huffman code from code lengths: number of codes of each length, symbols by code
+  function huffman(lengths){
+    var counts = new Array(16).fill(0), offsets = new Array(16).fill(0), symbols = [];
+    lengths.forEach(function(len){ counts[len]++; });
+    counts[0] = 0;
+    for (var len = 1; len < 15; len++) {
+      offsets[len + 1] = offsets[len] + counts[len];
+    }
+    lengths.forEach(function(len, symbol){
+      if (len != 0) {
+        symbols[offsets[len]++] = symbol;
+      }
+    });
+    return {counts: counts, symbols: symbols};
+  }
+
+  function decode(h){
+    var code = 0, first = 0, index = 0;
+    for (var len = 1; len < 16; len++) {
+      code |= bits(1);
+      var count = h.counts[len];
+      if (code - count < first) {
+        return h.symbols[index + (code - first)];
+      }
+      index += count;
+      first = (first + count) << 1;
+      code <<= 1;
+    }
+    throw new Error("inflate: invalid Huffman code");
+  }
+
+  function codes(lenCode, distCode){
+    for (;;) {
+      var symbol = decode(lenCode);
+      if (symbol < 256) {
+        reserve(1);
+        out[outLen++] = symbol;
+      }
+      else if (symbol == 256) {
+        return;
+      }
+      else {
+        symbol -= 257;
+        var len = LEN_BASE[symbol] + bits(LEN_EXTRA[symbol]);
+        var distSymbol = decode(distCode);
+        var dist = DIST_BASE[distSymbol] + bits(DIST_EXTRA[distSymbol]);
+        if (dist > outLen) {
+          throw new Error("inflate: distance too far back");
+        }
+        reserve(len);
+        for (var i = 0; i < len; i++, outLen++) {
+          out[outLen] = out[outLen - dist];
+        }
+      }
+    }
+  }
+
+  var fixedLen = null, fixedDist = null;
+  var last;
+  do {
+    last = bits(1);
+    var type = bits(2);
+    if (type == 0) {
+      // Stored block: skip to the byte boundary, then LEN, NLEN and LEN bytes
+      bitBuf = 0;
+      bitCnt = 0;
+      var storedLen = src[pos] | (src[pos + 1] << 8);
+      pos += 4;
+      reserve(storedLen);
+      out.set(src.subarray(pos, pos + storedLen), outLen);
+      outLen += storedLen;
+      pos += storedLen;
+    }
+    else if (type == 1) {
+      if (fixedLen === null) {
+        var lengths = [];
+        for (var s = 0; s < 288; s++) {
+          lengths.push(s < 144 ? 8 : s < 256 ? 9 : s < 280 ? 7 : 8);
+        }
+        fixedLen = huffman(lengths);
+        fixedDist = huffman(new Array(30).fill(5));
+      }
+      codes(fixedLen, fixedDist);
+    }
+    else if (type == 2) {
+      var nLen = bits(5) + 257, nDist = bits(5) + 1, nCode = bits(4) + 4;
+      var codeLengths = new Array(19).fill(0);
+      for (var k = 0; k < nCode; k++) {
+        codeLengths[CODE_LENGTH_ORDER[k]] = bits(3);
+      }
+      var lenLenCode = huffman(codeLengths);
+      var allLengths = [];
+      while (allLengths.length < nLen + nDist) {
+        var sym = decode(lenLenCode);
+        if (sym < 16) {
+          allLengths.push(sym);
+        }
+        else {
+          var repeat, value = 0;
+          if (sym == 16) {
+            if (allLengths.length == 0) {
+              throw new Error("inflate: repeat with no first length");
+            }
+            value = allLengths[allLengths.length - 1];
+            repeat = 3 + bits(2);
+          }
+          else if (sym == 17) {
+            repeat = 3 + bits(3);
+          }
+          else {
+            repeat = 11 + bits(7);
+          }
+          for (var r = 0; r < repeat; r++) {
+            allLengths.push(value);
+          }
+        }
+      }
+      codes(huffman(allLengths.slice(0, nLen)), huffman(allLengths.slice(nLen, nLen + nDist)));
+    }
+    else {
+      throw new Error("inflate: invalid block type");
+    }
+  } while (!last);
+
+  return out.subarray(0, outLen);
+}
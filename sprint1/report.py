@@ -27,6 +27,12 @@
 #
 #              report:         Takes results from extract_data and creates a Dashboard HTML file
 #
+#              write_report:   Streams the Dashboard HTML to an open file/stream, section by section
+#
+#              report_to_file: Writes the Dashboard HTML straight to a file (no full-page string in memory)
+#
+#              build_js_bundle: Writes the report's JS as one minified, content-hashed file shared by many reports
+#
 # Programmer:    Martin McSharry
 # Creation Date: 18-Feb-2024
 # ---------------------------------------------------------------------------
@@ -47,10 +53,34 @@ import boto3
 from datetime import date, timedelta, datetime
 import time
 import html
+import io
+import base64
+import gzip
+import hashlib
 from sshtunnel import SSHTunnelForwarder
 
+# JS files inlined by report(..., mckinsey=True), in page order (also the content of build_js_bundle)
+REPORT_JS_FILES = [
+	'chart_bar_horizontal.js',
+	'chart_bar_vertical_character.js',
+	'chart_donut.js',
+	'chart_line.js',
+	'chart_polar_mckinsey.js',
+	'createFilterData.js',
+	'chart_drag_drop.js',
+	'createSummaryData.js',
+	'decodeData.js',
+]
+
+# Contents of the JS files read by get_js_content, by path: (modification time, content)
+_JS_CONTENT_CACHE = {}
+
+
 def get_js_content(filename):
-	"""Reads and returns the content of a JS file from the original_dahsboard directory."""
+	"""
+	Reads and returns the content of a JS file from the original_dahsboard directory.
+	Each file is read once per process, and again only when its modification time changes.
+	"""
 	import os
 	# Look in original_dahsboard first, then current dir
 	paths_to_check = [
@@ -61,13 +91,214 @@ def get_js_content(filename):
 	for path in paths_to_check:
 		if os.path.exists(path):
 			try:
-				with open(path, 'r', encoding='utf-8') as f:
-					return f.read()
+				mtime = os.stat(path).st_mtime_ns
+				cached = _JS_CONTENT_CACHE.get(path)
+				if cached is None or cached[0] != mtime:
+					with open(path, 'r', encoding='utf-8') as f:
+						cached = (mtime, f.read())
+					_JS_CONTENT_CACHE[path] = cached
+				return cached[1]
 			except Exception as e:
 				print(f"Error reading {path}: {e}")
 				return f"// Error reading {filename}"
 	
 	return f"// File not found: {filename}"
+
+
+# Characters of JS identifiers, and the characters after which a "/" starts a regular expression
+_JS_WORD_CHARS = set('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_$')
+_JS_REGEX_AFTER = set('(,=:[!&|?{};+-*%<>~^')
+_JS_REGEX_KEYWORDS = ('return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw', 'instanceof', 'yield', 'await')
+
+
+def _js_skip_quoted(source, i):
+	"""Index just past the string, template literal or regular expression starting at source[i] (ValueError if it is not closed)."""
+	n = len(source)
+	quote = source[i]
+	if quote == '/':
+		in_class = False
+		i += 1
+		while i < n and (source[i] != '/' or in_class):
+			if source[i] == '\\':
+				i += 1
+			elif source[i] == '[':
+				in_class = True
+			elif source[i] == ']':
+				in_class = False
+			elif source[i] == '\n':
+				break
+			i += 1
+		if i >= n or source[i] != '/':
+			raise ValueError(f"Unterminated regular expression at {i}")
+		i += 1
+		while i < n and source[i] in _JS_WORD_CHARS:
+			i += 1
+		return i
+	i += 1
+	while i < n and source[i] != quote:
+		if source[i] == '\\':
+			i += 1
+		elif quote == '`' and source.startswith('${', i):
+			# Template expression: skip to its closing brace, past any nested strings and templates
+			i += 2
+			depth = 1
+			while depth > 0:
+				if i >= n:
+					raise ValueError(f"Unterminated template expression at {i}")
+				if source[i] in '\'"`':
+					i = _js_skip_quoted(source, i)
+					continue
+				if source[i] == '{':
+					depth += 1
+				elif source[i] == '}':
+					depth -= 1
+				i += 1
+			continue
+		i += 1
+	if i >= n:
+		raise ValueError(f"Unterminated {quote} literal at {i}")
+	return i + 1
+
+
+def minify_js(source):
+	"""
+	Minifies JavaScript conservatively: drops comments, indentation and blank lines and collapses spaces,
+	keeping strings, template literals and regular expressions as they are. Line breaks are kept (one per
+	line of code), so automatic semicolon insertion works as in the original.
+
+	If the source can't be tokenized (e.g. an unterminated string), it is returned as it is.
+
+	Args:
+		source (str): JavaScript source.
+
+	Returns:
+		str: The minified source.
+	"""
+	try:
+		return _minify_js(source)
+	except (ValueError, IndexError) as e:
+		print(f"Could not minify JS, keeping it as it is: {e}")
+		return source
+
+
+def _minify_js(source):
+	"""Minifies JavaScript (see minify_js); ValueError if a string or regular expression is not closed."""
+	out = []
+	last = ''  # Last character written
+	last_token = ''  # Last character written other than whitespace
+	last_word = ''  # Last identifier/keyword written, if it is the last token
+	i = 0
+	n = len(source)
+	while i < n:
+		c = source[i]
+		if c in ' \t\r\n\f\v' or source.startswith('//', i) or source.startswith('/*', i):
+			# Whitespace and comments: a line break if they contain one, else a space where tokens would merge
+			newline = False
+			while i < n:
+				if source[i] in ' \t\r\n\f\v':
+					newline = newline or source[i] == '\n'
+					i += 1
+				elif source.startswith('//', i):
+					end = source.find('\n', i)
+					i = n if end < 0 else end
+				elif source.startswith('/*', i):
+					end = source.find('*/', i + 2)
+					newline = newline or '\n' in source[i:end]
+					i = n if end < 0 else end + 2
+				else:
+					break
+			if i >= n or last == '':
+				continue
+			if newline:
+				if last != '\n':
+					out.append('\n')
+					last = '\n'
+			elif (last in _JS_WORD_CHARS and source[i] in _JS_WORD_CHARS) or (last in '+-' and source[i] == last):
+				out.append(' ')
+				last = ' '
+			continue
+
+		if c in '\'"`' or (c == '/' and (last_token == '' or last_token in _JS_REGEX_AFTER or last_word in _JS_REGEX_KEYWORDS)):
+			end = _js_skip_quoted(source, i)
+			word = ''
+		elif c in _JS_WORD_CHARS:
+			end = i
+			while end < n and source[end] in _JS_WORD_CHARS:
+				end += 1
+			word = source[i:end]
+		elif c in '+-' and source.startswith(c, i + 1):
+			# ++/--: after a value (postfix) a "/" is a division, as after ")"
+			end = i + 2
+			postfix = (last_token in _JS_WORD_CHARS and last_word not in _JS_REGEX_KEYWORDS) or last_token in ')]'
+			out.append(source[i:end])
+			last = c
+			last_token = ')' if postfix else c
+			last_word = ''
+			i = end
+			continue
+		else:
+			end = i + 1
+			word = ''
+		out.append(source[i:end])
+		last = last_token = source[end - 1]
+		last_word = word
+		i = end
+	return ''.join(out).strip() + '\n'
+
+
+# JS bundles made by get_js_bundle, by (files, minify): (contents of the files, bundle)
+_JS_BUNDLE_CACHE = {}
+
+
+def get_js_bundle(filenames=REPORT_JS_FILES, minify=True):
+	"""
+	Concatenates (and minifies) JS files into one script, rebuilt only when one of the files changes.
+
+	Args:
+		filenames (list, optional): JS files (see get_js_content). Defaults to REPORT_JS_FILES.
+		minify (bool, optional): Minify the script (minify_js). Defaults to True.
+
+	Returns:
+		str: Content of the bundle.
+	"""
+	# get_js_content returns the same strings while the files are unchanged, so comparing them is cheap
+	contents = tuple(get_js_content(filename) for filename in filenames)
+	key = (tuple(filenames), minify)
+	cached = _JS_BUNDLE_CACHE.get(key)
+	if cached is None or cached[0] != contents:
+		# Each file ends with a line break and ";" so no statement runs into the next file
+		parts = [minify_js(content) if minify else content for content in contents]
+		cached = (contents, ''.join('// {0}\n{1}\n;\n'.format(filename, part.rstrip('\n')) for filename, part in zip(filenames, parts)))
+		_JS_BUNDLE_CACHE[key] = cached
+	return cached[1]
+
+
+def build_js_bundle(output_dir, filenames=REPORT_JS_FILES, minify=True, prefix='skillwell-report'):
+	"""
+	Writes the JS of the report as one content-hashed bundle ({prefix}.{hash}.min.js), to be served once
+	and shared by many reports (report(..., js_asset_url=...)) instead of inlining the scripts in each of them.
+	The file is only written if a bundle with the same content is not already there.
+
+	Args:
+		output_dir (str): Directory of the bundle (created if missing).
+		filenames (list, optional): JS files (see get_js_content). Defaults to REPORT_JS_FILES.
+		minify (bool, optional): Minify the scripts (minify_js). Defaults to True.
+		prefix (str, optional): Start of the bundle's file name. Defaults to 'skillwell-report'.
+
+	Returns:
+		str: File name of the bundle (in output_dir).
+	"""
+
+	content = get_js_bundle(filenames, minify=minify).encode('utf-8')
+	name = '{0}.{1}{2}.js'.format(prefix, hashlib.sha256(content).hexdigest()[:16], '.min' if minify else '')
+	path = os.path.join(output_dir, name)
+	if not os.path.exists(path):
+		os.makedirs(output_dir, exist_ok=True)
+		tmp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+		with open(tmp_path, 'wb') as f:
+			f.write(content)
+		os.replace(tmp_path, path)
+	return name
 import re
 import xml.etree.ElementTree as ET
 import lxml.html
@@ -211,13 +442,156 @@ def create_proj_engagement_chart(df, project_name):
 	return chart_json, summary_html
 
 
+# ------------------------------------------------------------>
+# ----- Functions to embed DataFrames in the HTML Report ----->
+# ------------------------------------------------------------>
+
+def _json_float(value):
+	"""A float as to_json writes it (10 decimals, or 10 significant digits when very large or small; NaN/inf -> None)."""
+	if not math.isfinite(value):
+		return None
+	magnitude = abs(value)
+	if magnitude >= 1e16 or 0 < magnitude < 1e-15:
+		return float('{0:.10g}'.format(value))
+	return round(value, 10)
+
+
+
+def _json_column(series):
+	"""The values of a column as to_json(orient='records') writes them, as Python objects."""
+	dtype = series.dtype
+	if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_float_dtype(dtype):
+		is_float = pd.api.types.is_float_dtype(dtype)
+		mask = series.isna().tolist()
+		values = series.astype(object).tolist()
+		return [None if missing else (_json_float(float(v)) if is_float else v) for v, missing in zip(values, mask)]
+	if pd.api.types.is_datetime64_any_dtype(dtype) or pd.api.types.is_timedelta64_dtype(dtype):
+		# Epoch milliseconds (UTC for time zone aware dates)
+		mask = series.isna().tolist()
+		values = series.dt.as_unit('ms').array.asi8.tolist()
+		return [None if missing else v for v, missing in zip(values, mask)]
+	if pd.api.types.is_string_dtype(dtype):
+		values = series.astype(object).tolist()
+		if all(v is None or isinstance(v, str) or (isinstance(v, float) and v != v) or v is pd.NA for v in values):
+			return [v if isinstance(v, str) else None for v in values]
+	# Other values (lists, dicts, mixed types...): converted by to_json, one column at a time
+	return json.loads(series.to_json(orient='values'))
+
+
+
+def columnar_table(df):
+	"""
+	Converts a DataFrame into the compact, column-oriented table the HTML report embeds
+	(decoded back into records by decodeTable() in decodeData.js).
+
+	Values are converted as by to_json(orient='records') (NaN -> null, dates -> epoch ms), column by
+	column, so the table is never held as a whole in another form.
+	String columns where each value repeats on average at least twice are dictionary-encoded.
+
+	Args:
+		df (pandas.DataFrame): The table to convert.
+
+	Returns:
+		dict: {"n": number of rows, "c": column names, "v": values of each column - a list, or
+			{"d": distinct values, "i": index in "d" of each row's value}}
+	"""
+	n_rows = len(df)
+	list_values = []
+	for j in range(df.shape[1]):
+		values = _json_column(df.iloc[:, j])
+		if n_rows > 0 and all(v is None or isinstance(v, str) for v in values):
+			dict_codes = {}
+			codes = [dict_codes.setdefault(v, len(dict_codes)) for v in values]
+			if len(dict_codes) <= n_rows // 2:
+				list_values.append({'d': list(dict_codes), 'i': codes})
+				continue
+		list_values.append(values)
+
+	return {'n': n_rows, 'c': [c.item() if isinstance(c, np.generic) else c for c in df.columns], 'v': list_values}
+
+
+
+def write_table_json(out, df, compact=False):
+	"""
+	Writes a DataFrame to the HTML report as a JavaScript expression evaluating to its records.
+
+	Args:
+		out (file-like): Text stream the HTML is written to.
+		df (pandas.DataFrame): The table to write.
+		compact (bool, optional): Write decodeTable({...}) of columnar_table(df) (no whitespace, no repeated
+			column names) instead of to_json(orient='records', indent=1). Defaults to False.
+	"""
+	if compact:
+		out.write('decodeTable(')
+		# "</" would close the <script> block (to_json escapes every "/" instead)
+		out.write(json.dumps(columnar_table(df), separators=(',', ':'), ensure_ascii=False).replace('</', '<\\/'))
+		out.write(')')
+	else:
+		df.to_json(out, orient='records', indent=1)
+
+
+
+# Tab (openTab name) showing each part of dict_df
+TAB_NAMES = {'proj': 'multisim_data', 'sim': 'sim_data', 'srv': 'srv_data', 'dmg': 'dmg_data'}
+
+# Tables the selectors and filters use at page load (never moved to tab data files or compressed)
+TAB_DATA_INLINE = ['sims', 'proj_sims', 'dmg_vars']
+
+
+
+def write_tab_data(out, entries, compact=False):
+	"""
+	Writes the tables of one dashboard tab as the JSON loaded by loadTabData (decodeData.js): the content
+	of a tab data file, or of a compressed data block.
+
+	Args:
+		out (file-like): Text stream the JSON is written to.
+		entries (list): (variable name, keys under the variable, DataFrame) of each table,
+			e.g. ("data_component_dmg", ["dmg_engagement", "dataSemi"], df).
+		compact (bool, optional): Write the tables in compact columnar form. Defaults to False.
+	"""
+	out.write('{{"compact":{0},"entries":['.format('true' if compact else 'false'))
+	for i, (name, keys, df) in enumerate(entries):
+		out.write('{0}{{"name":{1},"keys":{2},"table":'.format(',' if i > 0 else '', json.dumps(name), json.dumps(keys)))
+		if compact:
+			out.write(json.dumps(columnar_table(df), separators=(',', ':'), ensure_ascii=False))
+		else:
+			df.to_json(out, orient='records')
+		out.write('}')
+	out.write(']}')
+
+
+
+def write_data_var(out, name, df, compact=False):
+	"""
+	Writes the JavaScript variable holding a table's records to the HTML report.
+
+	Args:
+		out (file-like): Text stream the HTML is written to.
+		name (str): Name of the variable (e.g. "data_component_survey_responses").
+		df (pandas.DataFrame): The table to write.
+		compact (bool, optional): Embed the table in compact form, decoded the first time the variable is used
+			(defineLazyData in decodeData.js). Defaults to False.
+	"""
+	if compact:
+		out.write('defineLazyData("{0}", function(){{ return '.format(name))
+		write_table_json(out, df, compact=True)
+		out.write('; });')
+	else:
+		out.write('var {0} = '.format(name))
+		write_table_json(out, df)
+		out.write(';')
+
+
+
 # ------------------------------------------------->
 # ----- Function for creating the HTML Report ----->
 # ------------------------------------------------->
 
 
 
-def report(
+def write_report(
+	out,
 	dict_df,
 	start_date,
 	end_date,
@@ -225,11 +599,17 @@ def report(
 	survey_comment_limit=None,
 	demog_filters=None,
 	mckinsey=False,
+	compact_data=False,
+	compress_data=False,
+	js_asset_url=None,
+	tab_data_path=None,
 	):
 	"""
-	Generates an HTML report from the extracted and summarized data.
+	Writes the HTML report of the extracted and summarized data to a text stream, one section
+	(and one table's JSON) at a time, so the page is never held as one string.
 
 	Args:
+		out (file-like): Text stream the HTML is written to (e.g. an open file or io.StringIO).
 		dict_df (dict): A dictionary containing the extracted and summarized data.
 		start_date (str): The start date for the data included in the report.
 		end_date (str): The end date for the data included in the report.
@@ -237,13 +617,19 @@ def report(
 		survey_comment_limit (int, optional): Integer to limit the number of comments from each free-text question. Defaults to None.
 		demog_filters (pandas.DataFrame, optional): DataFrame containing demographic filters. Defaults to None.
 		mckinsey (bool, optional): Flag to indicate if the report is for McKinsey. Defaults to False.
-
-	Returns:
-		str: The generated HTML report as a string.
+		compact_data (bool, optional): Embed the tables as compact column arrays, decoded in the browser on first use
+			(decodeData.js), instead of indented records (smaller, for single-file reports). Defaults to False.
+		compress_data (bool, optional): Embed the data of each tab gzipped and base64-encoded, decompressed when the page
+			loads (DecompressionStream, or a JavaScript inflate in older browsers). Defaults to False.
+		js_asset_url (str, optional): URL of a shared JS bundle made by build_js_bundle (mckinsey only), loaded
+			instead of inlining the chart scripts in the page. Defaults to None (scripts inlined).
+		tab_data_path (str, optional): Path prefix of per-tab data files. The data of every tab but the first goes to
+			'{tab_data_path}_data_{tab}.json' (next to the HTML file), fetched when the tab is first opened; the page
+			then has to be served over HTTP(S). Defaults to None (all data in the page, e.g. for email).
 	"""
   
 	if mckinsey:
-		html_page = '''
+		out.write('''
 			<!DOCTYPE html>
 			<html xmlns="http://www.w3.org/1999/xhtml">
 
@@ -260,37 +646,28 @@ def report(
 					<!-- JS & CHART LIBRARY -->
 					<script type = "text/javascript" src="d3.v7.min.js"></script>
 					<script src="https://cdn.plot.ly/plotly-2.27.0.min.js"></script>
+''')
+		if js_asset_url is not None:
+			out.write('''
+					<!-- Shared Custom JS (build_js_bundle) -->
+					<script type="text/javascript" src="{0}"></script>
+				</head>
 
+			'''.format(html.escape(js_asset_url)))
+		else:
+			out.write('''
 					<!-- Inline Custom JS -->
-					<script type="text/javascript">
-					''' + get_js_content('chart_bar_horizontal.js') + '''
-					</script>
-					<script type="text/javascript">
-					''' + get_js_content('chart_bar_vertical_character.js') + '''
+''')
+			for filename in REPORT_JS_FILES:
+				out.write('''					<script type="text/javascript">
+					''' + get_js_content(filename) + '''
 					</script>
-					<script type="text/javascript">
-					''' + get_js_content('chart_donut.js') + '''
-					</script>
-					<script type="text/javascript">
-					''' + get_js_content('chart_line.js') + '''
-					</script>
-					<script type="text/javascript">
-					''' + get_js_content('chart_polar_mckinsey.js') + '''
-					</script>
-					<script type="text/javascript">
-					''' + get_js_content('createFilterData.js') + '''
-					</script>
-					<script type="text/javascript">
-					''' + get_js_content('chart_drag_drop.js') + '''
-					</script>
-					<script type="text/javascript">
-					''' + get_js_content('createSummaryData.js') + '''
-					</script>
-				</head>
+''')
+			out.write('''				</head>
 
-			'''
+			''')
 	else:
-			html_page = '''
+			out.write('''
 		<!DOCTYPE html>
 		<html xmlns="http://www.w3.org/1999/xhtml">
 
@@ -315,11 +692,12 @@ def report(
 				<script type = "text/javascript" src="createFilterData.js"></script>
 				<script type = "text/javascript" src="chart_drag_drop.js"></script>
 				<script type = "text/javascript" src="createSummaryData.js"></script>
+				<script type = "text/javascript" src="decodeData.js"></script>
 			</head>
 
-		'''
+		''')
 
-	html_page += '''
+	out.write('''
 	<body class="main">
 
 		<div class="main-container">
@@ -376,7 +754,7 @@ def report(
 												Survey Results
 											</a>
 										</li>
-	'''
+	''')
 
 	# Add demographics tab conditionally - create it here before adding to HTML
 	demog_tab_html_early = '''
@@ -386,15 +764,15 @@ def report(
 											</a>
 										</li>''' if len(dict_df.get('dmg', [])) > 0 else ''
 
-	html_page += demog_tab_html_early
+	out.write(demog_tab_html_early)
 
-	html_page += '''
+	out.write('''
 									</ul>
 								</div>
 							</div>
 						</nav>
 
-	'''
+	''')
 
 	# Top Menu Items
 	hovered_num = 0
@@ -512,7 +890,7 @@ def report(
 	for item in sim_list:
 		sim_list_html += f"<li>{item}</li>"
 
-	html_page += '''
+	out.write('''
 
 		<!-- TOP MENU -->
 		<div class="selectsubmenu sim_data srv_data dmg_data">
@@ -928,7 +1306,7 @@ def report(
 		date.today().strftime("%b %-d, %Y"),
 		datetime.strptime(start_date, "%Y-%m-%d").strftime("%b %-d, %Y") + ' - ' + datetime.strptime(end_date, "%Y-%m-%d").strftime("%b %-d, %Y"),
 		sim_list_html,
-	)
+	))
 
 
 	# Add DIVs to page
@@ -979,7 +1357,7 @@ def report(
 
 					#top = '''.style("margin-top", "60px");''' if key2 in ("learner_engagement", "proj_engagement", "survey", "dmg_learner_counts") else ';'
 
-					html_page += '''
+					out.write('''
 					// Append div to html page to render chart in
 					d3.select("#component_content_{1}")
 					  .append("div")
@@ -1015,65 +1393,91 @@ def report(
 						key1,
 						dict_component_title.get(key2),
 						";", #top
-					)
+					))
 
 
 
 
 
-	# Add data to page
+	# Add data to page (with tab data files, the tables of every tab but the first go to the tab's file;
+	# with compressed data, the tables of the other tabs go to one compressed block per tab)
+	list_tabs = [key for key in dict_df if len(dict_df[key]) > 0]
+	list_file_tabs = list_tabs[1:] if tab_data_path is not None else []
+	list_compressed_tabs = [key for key in list_tabs if key not in list_file_tabs] if compress_data else []
+	dict_tab_entries = {}
 	for key1 in dict_df:
 		if key1 == "dmg":
 			if len(dict_df[key1]) > 0:
 				for i_key2, key2 in enumerate(dict_df[key1]):
 
 					if key2 == "dmg_vars":
-						html_page += '''
-							var data_component_{0} = {1};
+						out.write('''
+							''')
+						write_data_var(out, 'data_component_' + key2, dict_df[key1][key2], compact=compact_data)
+						out.write('''
 
-						'''.format(
-							key2,
-							dict_df[key1][key2].to_json(orient='records', indent=1)
-						)
+						''')
+
+					elif key1 in list_file_tabs or key1 in list_compressed_tabs:
+						dict_tab_entries.setdefault(key1, []).append(('data_component_dmg', [key2, 'dataSemi'], dict_df[key1][key2]))
 
 					else:
 
 						if i_key2 == 1:
-							html_page += '''
-								var data_component_dmg = {
-							'''
+							out.write('''
+								{0} {{
+							'''.format(
+								'defineLazyData("data_component_dmg", function(){ return' if compact_data else 'var data_component_dmg ='
+							))
 
-						html_page += '''
-							"{0}": {{ "dataSemi":{1} }},
-						'''.format(
-							key2,
-							dict_df[key1][key2].to_json(orient='records', indent=1)
-						)
+						out.write('''
+							"{0}": {{ "dataSemi":'''.format(key2))
+						write_table_json(out, dict_df[key1][key2], compact=compact_data)
+						out.write(''' },
+						''')
 
 						if i_key2 == (len(dict_df[key1])-1):
-							html_page += '''
-								};
+							out.write('''
+								{0}
 
-							'''
+							'''.format('}; });' if compact_data else '};'))
 
 		else:
 			if len(dict_df[key1]) > 0:
 				for key2 in dict_df[key1]:
 
-					html_page += '''
-						var data_component_{0} = {1};
-
-					'''.format(
-						key2,
-						dict_df[key1][key2].to_json(orient='records', indent=1)
-					)
+					if (key1 in list_file_tabs or key1 in list_compressed_tabs) and key2 not in TAB_DATA_INLINE:
+						dict_tab_entries.setdefault(key1, []).append(('data_component_' + key2, [], dict_df[key1][key2]))
+						continue
+
+					out.write('''
+						''')
+					write_data_var(out, 'data_component_' + key2, dict_df[key1][key2], compact=compact_data)
+					out.write('''
+
+					''')
+
+	for key1 in dict_tab_entries:
+		if key1 in list_file_tabs:
+			file_path = '{0}_data_{1}.json'.format(tab_data_path, key1)
+			with open(file_path, 'w', encoding='utf-8') as outfile:
+				write_tab_data(outfile, dict_tab_entries[key1], compact=compact_data)
+			out.write('''
+		registerTabData("{0}", "{1}");
+		'''.format(key1, os.path.basename(file_path)))
+		else:
+			tab_data = io.StringIO()
+			write_tab_data(tab_data, dict_tab_entries[key1], compact=compact_data)
+			out.write('''
+		registerTabData("{0}", null, "{1}");
+		'''.format(key1, base64.b64encode(gzip.compress(tab_data.getvalue().encode('utf-8'), mtime=0)).decode('ascii')))
 
 
 
 	# Add Project Selector (if required)
 	if len(dict_df['proj']) > 0:
 
-		html_page += '''
+		out.write('''
 
 		// ----- List of all Projects ----->
 		var projs = Array.from(new Set(data_component_proj_sims.map(d => d['project'])));
@@ -1084,23 +1488,23 @@ def report(
 			projSelector.appendChild(currentOption);
 		}
 
-		'''
+		''')
 
 	# Fill in Sim Selector
-	html_page += '''
+	out.write('''
 
 	// ----- List of all Sims ----->
 	var sims = Array.from(new Set(data_component_sims.map(d => d['simname'])));
 	simSelector = document.querySelector('.sim_filter');
 
-	'''
+	''')
 
 
 
 	# Add Demographic Selector (if required)
 	if demog_filters is not None:
 
-		html_page += '''
+		out.write('''
 
 		// ----- Add options to Demographic Variable Selector ----->
 		var demogs = {0};
@@ -1135,7 +1539,7 @@ def report(
 		}}
 		*/
 
-		'''.format(demog_filters.filter(['demog_var', 'demog_val']).drop_duplicates().to_json(orient='records', indent=1))
+		'''.format(demog_filters.filter(['demog_var', 'demog_val']).drop_duplicates().to_json(orient='records', indent=1)))
 
 
 
@@ -1143,7 +1547,7 @@ def report(
 	# Add Demographic code (if required)
 	if len(dict_df['dmg']) > 0:
 
-		html_page += '''
+		out.write('''
 			var filters = Array.from(new Set(data_component_dmg_vars.map(d => d["demog_var"])));
 			var selected_filter = filters[0];
 			var dataFilter = createFilterData(data_component_dmg_vars.filter(d => d["demog_val"] != null));
@@ -1258,7 +1662,7 @@ def report(
 
 			});
 
-		'''
+		''')
 
 
 
@@ -1275,13 +1679,13 @@ def report(
 		if len(dict_df[key1]) > 0:
 
 			# Add updateGraphs_sim function to page
-			html_page += '''
+			out.write('''
 			function updateGraphs_{0}(){{
 				var projSelector = document.getElementById("selectProj");
 
 				if({1}.value != ""){{
 
-			'''.format(key1, selector)
+			'''.format(key1, selector))
 
 
 			proj_selector = 'd["project"] == projSelector.value && ' if dict_project is not None else ''
@@ -1291,7 +1695,7 @@ def report(
 
 			for key2 in dict_df[key1]:
 				if key2 == 'learner_engagement':
-					html_page += '''
+					out.write('''
 					// LEARNER ENGAGEMENT (Vanilla JS + Plotly)
 					try {{
 						var parent = document.getElementById("component_content_learner_engagement");
@@ -1522,14 +1926,14 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
 
 
 				if key2 == 'learner_engagement_over_time':
-					html_page += '''
+					out.write('''
 					// LEARNER ENGAGEMENT OVER TIME
 
 					d3.select("#contentsub_{0}").remove();
@@ -1679,12 +2083,12 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
 				if key2 == 'overall_pass_rates':
-					html_page += '''
+					out.write('''
 					// OVERALL PASS RATES
 
 					d3.select("#contentsub_{0}").remove();
@@ -1818,14 +2222,14 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
 
 
 				if key2 == 'skill_pass_rates':
-					html_page += '''
+					out.write('''
 					// SKILL PASS RATES
 
 					d3.select("#contentsub_{0}").remove();
@@ -1997,14 +2401,14 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
 
 
 				if key2 == 'skill_baseline':
-					html_page += '''
+					out.write('''
 					// SKILL SCORES - BASELINE
 
 					d3.select("#contentsub_{0}").remove();
@@ -2154,12 +2558,12 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
 				if key2 == 'skill_improvement':
-					html_page += '''
+					out.write('''
 					// SKILL SCORES - IMPROVEMENT
 
 					d3.select("#contentsub_{0}").remove();
@@ -2309,12 +2713,12 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
 				if key2 == 'decision_levels':
-					html_page += '''
+					out.write('''
 					// DECISION LEVEL SUMMARY
 
 					d3.select("#contentsub_{0}").remove();
@@ -2480,14 +2884,14 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
 
 
 				if key2 == 'behaviors':
-					html_page += '''
+					out.write('''
 					// LEARNER BEHAVIORS AND DECISIONS
 
 					d3.select("#contentsub_{0}").remove();
@@ -2633,14 +3037,14 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
 
 
 				if key2 == 'time_spent':
-					html_page += '''
+					out.write('''
 					// TIME SPENT IN TASK MODE
 
 					d3.select("#contentsub_{0}").remove();
@@ -2756,12 +3160,12 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
 				if key2 == 'practice_mode':
-					html_page += '''
+					out.write('''
 					// PRACTICE MODE
 
 					d3.select("#contentsub_{0}").remove();
@@ -2959,12 +3363,12 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
 				if key2 == 'knowledge_check_1':
-					html_page += '''
+					out.write('''
 					// KNOWLEDGE CHECK
 
 					d3.select("#contentsub_knowledge_check").remove();
@@ -3193,7 +3597,7 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
@@ -3201,7 +3605,7 @@ def report(
 
 					srv_comment_limit = survey_comment_limit if survey_comment_limit is not None else "Infinity"
 
-					html_page += '''
+					out.write('''
 					// SURVEY RESPONSES
 
 					d3.select("#contentsub_{0}").remove();
@@ -3693,7 +4097,7 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector, srv_comment_limit)
+					'''.format(key2, proj_selector, dmg_selector, srv_comment_limit))
 
 				if key2 == 'proj_engagement':
 					# Generate Plotly Express charts server-side for each project
@@ -3713,7 +4117,7 @@ def report(
 					chart_data_js = json.dumps(proj_chart_data)
 					summary_html_js = json.dumps(proj_summary_html)
 
-					html_page += '''
+					out.write('''
 					// PROJECT - LEARNER ENGAGEMENT (Plotly Express - Server-side rendered)
 					try {{
 						console.log("Setting up Project Engagement chart display");
@@ -3805,11 +4209,11 @@ def report(
 						console.error("Error in Project Engagement Chart:", e);
 					}}
 
-					'''.format(key2, chart_data_js, summary_html_js)
+					'''.format(key2, chart_data_js, summary_html_js))
 
 				
 				if key2 == 'proj_engagement_over_time':
-					html_page += '''
+					out.write('''
 					// PROJECT - LEARNER ENGAGEMENT OVER TIME
 
 					d3.select("#contentsub_{0}").remove();
@@ -3946,10 +4350,10 @@ def report(
 
 					}}
 
-					'''.format(key2, dmg_selector)
+					'''.format(key2, dmg_selector))
 
 				if key2 == 'proj_performance_comparison_sim':
-					html_page += '''
+					out.write('''
 					// PERFORMANCE IN SHARED SKILLS ACROSS SIMS
 					// Remove the existing element with ID "contentsub_proj_performance_comparison_sim" if it exists
 					d3.select("#contentsub_{0}").remove();
@@ -4078,12 +4482,12 @@ def report(
 
 					}}
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 				
 
 				if key2 == 'proj_learner_counts_comparison_sim':
 					
-					html_page += '''
+					out.write('''
 					// LEARNER COUNTS SIM COMPARISON
 					// Remove the existing learner count comparison component if it exists
 					d3.select("#contentsub_{0}").remove();
@@ -4233,10 +4637,10 @@ def report(
 
 					}}
 
-					'''.format(key2, dmg_selector)
+					'''.format(key2, dmg_selector))
 
 				if key2 == 'proj_overall_pass_rates':
-					html_page += '''
+					out.write('''
 					// OVERALL PASS RATES BY SIM
 
 					d3.select("#contentsub_{0}").remove();
@@ -4432,11 +4836,11 @@ def report(
 					}}
 
 
-					'''.format(key2, dmg_selector)
+					'''.format(key2, dmg_selector))
 
 
 				if key2 == 'proj_skill_pass_rates':
-					html_page += '''
+					out.write('''
 					// SKILL PASS RATES BY SIM
 
 					d3.select("#contentsub_{0}").remove();
@@ -4673,12 +5077,12 @@ def report(
 					}}
 
 
-					'''.format(key2, dmg_selector)
+					'''.format(key2, dmg_selector))
 
 
 				if key2 == 'proj_time_spent':
 
-					html_page += '''
+					out.write('''
 					// TIME SPENT IN TASK MODE BY SIM
 
 					d3.select("#contentsub_{0}").remove();
@@ -4785,11 +5189,11 @@ def report(
 
 					}}
 
-					'''.format(key2, dmg_selector)
+					'''.format(key2, dmg_selector))
 
 
 				if key2 == 'proj_practice_mode':
-					html_page += '''
+					out.write('''
 					// PRACTICE MODE BY SIM
 
 					d3.select("#contentsub_{0}").remove();
@@ -5012,12 +5416,12 @@ def report(
 					}}
 
 
-					'''.format(key2, dmg_selector)
+					'''.format(key2, dmg_selector))
 
 
 				if key2 == 'proj_shared_skill_polar':
 
-					html_page += '''
+					out.write('''
 					// PERFORMANCE IN SHARED SKILLS ACROSS SIMS
 
 					d3.select("#contentsub_{0}").remove();
@@ -5095,12 +5499,12 @@ def report(
 
 					}}
 
-					'''.format(key2, dmg_selector)
+					'''.format(key2, dmg_selector))
 
 
 				if key2 == 'proj_shared_skill_bar':
 
-					html_page += '''
+					out.write('''
 					// PERFORMANCE IN SHARED SKILLS ACROSS SIMS
 
 					d3.select("#contentsub_{0}").remove();
@@ -5210,10 +5614,10 @@ def report(
 
 					}}
 
-					'''.format(key2, dmg_selector)
+					'''.format(key2, dmg_selector))
 
 				if key2 == 'proj_nps':
-					html_page += '''
+					out.write('''
 					// NPS SCORE BY SIM
 
 					d3.select("#contentsub_{0}").remove();
@@ -5320,10 +5724,10 @@ def report(
 					);
 
 
-					'''.format(key2, dmg_selector)
+					'''.format(key2, dmg_selector))
 				
 				if key2 == 'proj_seat_time':
-					html_page += '''
+					out.write('''
 					// TIME SEAT REDUCTION
 					// Remove the existing element with ID "contentsub_proj_seat_time" if it exists
 
@@ -5546,10 +5950,10 @@ def report(
 					);
 
 
-					'''.format(key2, proj_selector)
+					'''.format(key2, proj_selector))
 					
 				if key2 == 'dmg_engagement':
-					html_page += '''
+					out.write('''
 					// DEMOGRAPHICS - LEARNER ENGAGEMENT
 
 					d3.select("#contentsub_{0}").remove();
@@ -5680,11 +6084,11 @@ def report(
 					/*}}*/
 
 
-					'''.format(key2, proj_selector)
+					'''.format(key2, proj_selector))
 
 
 				if key2 == 'dmg_skill_baseline':
-					html_page += '''
+					out.write('''
 					// DEMOGRAPHICS - SKILL PERFORMANCE BASELINE
 
 					d3.select("#contentsub_{0}").remove();
@@ -5783,11 +6187,11 @@ def report(
 					/*}}*/
 
 
-					'''.format(key2, proj_selector)
+					'''.format(key2, proj_selector))
 
 
 				if key2 == 'dmg_decision_levels':
-					html_page += '''
+					out.write('''
 					// DEMOGRAPHICS - DECISION LEVEL SUMMARY
 
 					d3.select("#contentsub_{0}").remove();
@@ -5946,7 +6350,7 @@ def report(
 
 
 
-					'''.format(key2, proj_selector)
+					'''.format(key2, proj_selector))
 
 
 
@@ -5955,7 +6359,7 @@ def report(
 
 				if key2 == 'dmg_learner_counts':
 
-					html_page += '''
+					out.write('''
 					// LEARNER COUNTS BY DEMOGRAPHIC
 
 					d3.select("#contentsub_{0}").remove();
@@ -6062,7 +6466,7 @@ def report(
 
 					}}
 
-					'''.format(key2, proj_selector)
+					'''.format(key2, proj_selector))
 
 
 
@@ -6070,7 +6474,7 @@ def report(
 
 				if key2 == 'dmg_skill':
 
-					html_page += '''
+					out.write('''
 					// SKILL PERFORMANCE BY DEMOGRAPHIC
 
 					d3.select("#contentsub_{0}").remove();
@@ -6147,7 +6551,7 @@ def report(
 
 					}}
 
-					'''.format(key2, proj_selector)
+					'''.format(key2, proj_selector))
 
 
 
@@ -6155,7 +6559,7 @@ def report(
 
 				if key2 == 'dmg_shared_skill':
 
-					html_page += '''
+					out.write('''
 					// PERFORMANCE IN SHARED SKILLS ACROSS SIMS BY DEMOGRAPHIC
 
 					d3.select("#contentsub_{0}").remove();
@@ -6232,14 +6636,14 @@ def report(
 
 					}}
 
-					'''.format(key2, proj_selector)
+					'''.format(key2, proj_selector))
 
 
 
 
 
 			# Close updateGraph function
-			html_page += '''
+			out.write('''
 				}}
 
 				// Adjust heights of collapsible content
@@ -6253,10 +6657,10 @@ def report(
 
 			}}
 
-			'''.format(key1)
+			'''.format(key1))
 
 
-	html_page += '''
+	out.write('''
 
 	// Function to assign "options" to drop-down menu
 	function assignOptions(textArray, selector) {
@@ -6306,69 +6710,69 @@ def report(
 
 	}
 
-	'''
+	''')
 
 
 
 	# Change Graphs when Demographic variable/value changes
 	if demog_filters is not None:
-		html_page += '''
+		out.write('''
 		demogvarSelector.addEventListener('change', function(){
 			// Change options in Demog Value selector
 			assignOptions(demogs.filter(d => d['demog_var'] == demogvarSelector.value ).map(d => d['demog_val']), demogvalSelector);
 
-		'''
+		''')
 
 		if len(dict_df['proj']) > 0:
-			html_page += '''
+			out.write('''
 			updateGraphs_proj();
-		'''
+		''')
 
 		if len(dict_df['sim']) > 0:
-			html_page += '''
+			out.write('''
 			updateGraphs_sim();
-		'''
+		''')
 
 		if len(dict_df['srv']) > 0:
-			html_page += '''
+			out.write('''
 			updateGraphs_srv();
-		'''
+		''')
 
-		html_page += '''
+		out.write('''
 		}, true);
 
-		'''
+		''')
 
 
-		html_page += '''
+		out.write('''
 		demogvalSelector.addEventListener('change', function(){
-		'''
+		''')
 
 		if len(dict_df['proj']) > 0:
-			html_page += '''
+			out.write('''
 			updateGraphs_proj();
-		'''
+		''')
 
 		if len(dict_df['sim']) > 0:
-			html_page += '''
+			out.write('''
 			updateGraphs_sim();
-		'''
+		''')
 
 		if len(dict_df['srv']) > 0:
-			html_page += '''
+			out.write('''
 			updateGraphs_srv();
-		'''
+		''')
 
-		html_page += '''
+		out.write('''
 		}, true);
 
-		'''
+		''')
 
 
 
 	# Change graphs when projSelector changes
 	if len(dict_df['proj']) > 0:
-		html_page += '''
+		out.write('''
 		// Update plots when dropdown selections change
 		projSelector.addEventListener('change', function(){
 			var proj_sims = Array.from(new Set(data_component_proj_sims.filter(d => d['project'] == projSelector.value ).map(d => d['simname'])));
@@ -6389,54 +6793,54 @@ def report(
 			if (typeof updateProjEngagementChart === 'function') {
 				updateProjEngagementChart();
 			}
-		'''
+		''')
 
 		if len(dict_df['sim']) > 0:
-			html_page += '''
+			out.write('''
 			updateGraphs_sim();
-		'''
+		''')
 
 		if len(dict_df['srv']) > 0:
-			html_page += '''
+			out.write('''
 			updateGraphs_srv();
-		'''
+		''')
 
 		if len(dict_df['dmg']) > 0:
-			html_page += '''
+			out.write('''
 			updateGraphs_dmg();
-		'''
+		''')
 
-		html_page += '''
+		out.write('''
 		}, true);
-		'''
+		''')
 
 
 	# Change graphs when simSelector changes
-	html_page += '''
+	out.write('''
 	simSelector.addEventListener('change', function(){
 		d3.select("#sim_header").text(simSelector.value);
 
-	'''
+	''')
 
 	if len(dict_df['sim']) > 0:
-		html_page += '''
+		out.write('''
 		updateGraphs_sim();
-		'''
+		''')
 
 	if len(dict_df['srv']) > 0:
-		html_page += '''
+		out.write('''
 		updateGraphs_srv();
-		'''
+		''')
 
 	if len(dict_df['dmg']) > 0:
-		html_page += '''
+		out.write('''
 		updateGraphs_dmg();
-		'''
+		''')
 
-	html_page += '''
+	out.write('''
 
 	}, true);
-	'''
+	''')
 
 
 
@@ -6458,19 +6862,38 @@ def report(
 
 
 
+	# Tabs with a data file or compressed data: update their graphs once the data is in, loading a file when
+	# its tab is first opened and decompressing the compressed blocks right away
+	for key1 in dict_tab_entries:
+		update_functions = ['createSummaryData', 'updateGraphs_dmg'] if key1 == 'dmg' else ['updateGraphs_' + key1]
+		out.write('''
+		deferUntilTabData("{0}", {1});
+		'''.format(key1, json.dumps(update_functions)))
+
+	if any(key1 in list_file_tabs for key1 in dict_tab_entries):
+		out.write('''
+		loadTabDataOnOpen({0});
+		'''.format(json.dumps({TAB_NAMES[key1]: key1 for key1 in dict_tab_entries if key1 in list_file_tabs})))
+
+	for key1 in dict_tab_entries:
+		if key1 in list_compressed_tabs:
+			out.write('''
+		loadTabData("{0}");
+		'''.format(key1))
+
 	if len(dict_df['proj']) > 0:
-		html_page += '''
+		out.write('''
 		/* ----- Create initial version of graphs ----> */
 		assignOptions(Array.from(new Set(data_component_sims.filter(d => d['project'] == projSelector.value ).map(d => d['simname']))), simSelector);
-		'''
+		''')
 	else:
-		html_page += '''
+		out.write('''
 		/* ----- Create initial version of graphs ----> */
 		assignOptions(sims, simSelector);
-		'''
+		''')
 
 	if len(dict_df['proj']) > 0:
-		html_page += '''
+		out.write('''
 		d3.select("#sim_header_proj").selectAll(".tspan").remove();
 		Array.from(new Set(data_component_proj_sims.filter(d => d['project'] == projSelector.value ).map(d => d['simname']))).forEach(function(vSim, iSim, aSim){
 		  d3.select("#sim_header_proj")
@@ -6479,24 +6902,24 @@ def report(
 			  .text(vSim);
 		});
 
-		'''
+		''')
 
-	html_page += '''
+	out.write('''
 	d3.select("#sim_header").text(simSelector.value);
 
-	'''
+	''')
 
 	for key in dict_df:
 		if len(dict_df[key]) > 0:
 
 			updateFunction = 'createSummaryData();' if key == "dmg" else "updateGraphs_{0}();".format(key)
 
-			html_page += '''
+			out.write('''
 			{0}
-			'''.format(updateFunction)
+			'''.format(updateFunction))
 
 
-	html_page += '''
+	out.write('''
 
 
 	// ----- Collapsing Sections ----->
@@ -6557,10 +6980,10 @@ def report(
 	/* <----- Add hovered class in selected list item ----- */
 
 
-	'''
+	''')
 
 
-	html_page += '''
+	out.write('''
 		//]]>
 		</script>
 		</div>
@@ -6572,6 +6995,84 @@ def report(
 	
 	</body>
 	</html>
-	'''
+	''')
+
+
+
+def report_to_file(
+	dict_df,
+	path,
+	start_date,
+	end_date,
+	dict_project=None,
+	survey_comment_limit=None,
+	demog_filters=None,
+	mckinsey=False,
+	compact_data=False,
+	compress_data=False,
+	js_asset_url=None,
+	tab_data_files=False,
+	):
+	"""
+	Writes the HTML report straight to a file, streaming it section by section.
+
+	Args:
+		dict_df (dict): A dictionary containing the extracted and summarized data.
+		path (str): Path of the HTML file to create.
+		start_date (str): The start date for the data included in the report.
+		end_date (str): The end date for the data included in the report.
+		dict_project, survey_comment_limit, demog_filters, mckinsey, compact_data, compress_data, js_asset_url:
+			See write_report.
+		tab_data_files (bool, optional): Write the data of every tab but the first to sibling JSON files
+			(e.g. index_data_dmg.json), loaded when the tab is first opened. Defaults to False (single file).
+
+	Returns:
+		str: The path of the HTML file.
+	"""
+	with open(path, 'w', encoding='utf-8') as outfile:
+		write_report(
+			outfile, dict_df, start_date, end_date,
+			dict_project=dict_project,
+			survey_comment_limit=survey_comment_limit,
+			demog_filters=demog_filters,
+			mckinsey=mckinsey,
+			compact_data=compact_data,
+			compress_data=compress_data,
+			js_asset_url=js_asset_url,
+			tab_data_path=os.path.splitext(path)[0] if tab_data_files else None,
+		)
+	return path
 
-	return html_page
\ No newline at end of file
+
+
+def report(
+	dict_df,
+	start_date,
+	end_date,
+	dict_project=None,
+	survey_comment_limit=None,
+	demog_filters=None,
+	mckinsey=False,
+	compact_data=False,
+	compress_data=False,
+	js_asset_url=None,
+	):
+	"""
+	Generates an HTML report from the extracted and summarized data (see write_report for the arguments).
+	Prefer report_to_file for large reports, which never holds the whole page in memory.
+
+	Returns:
+		str: The generated HTML report as a string.
+	"""
+	out = io.StringIO()
+	write_report(
+		out, dict_df, start_date, end_date,
+		dict_project=dict_project,
+		survey_comment_limit=survey_comment_limit,
+		demog_filters=demog_filters,
+		mckinsey=mckinsey,
+		compact_data=compact_data,
+		compress_data=compress_data,
+		js_asset_url=js_asset_url,
+	)
+	return out.getvalue()
@@ -18,6 +18,8 @@ from skillwell_functions import *
 
 # Import from same directory
 from .parquet_pipeline import ParquetPipeline
+from .incremental_update import db_primary_keys
+from .parallel_sync import order_tables_by_size, run_tables_parallel, log_sync_summary
 
 
 # Configure logging
@@ -31,11 +33,21 @@ logger = logging.getLogger('Backfill')
 CUSTOMER = 'mckinsey.skillsims.com'
 S3_BUCKET = 'etu.appsciences'
 CHUNKSIZE = 5000
+PAGE_SIZE = 500000  # Rows per part file / checkpoint in keyset mode
 
 # Optional: Path to credentials file (can still be overridden or defaults used)
 CREDS_FILE = 'credentials.json' # Assumes in current dir or handled by get_db_connection logic
 
-def main():
+def main(workers=1, keyset=True):
+    """
+    One-time backfill of all raw tables.
+
+    Args:
+        workers (int): Number of tables backfilled concurrently, each over its own
+                       MySQL connection through the SSH tunnel (1 = one table at a time)
+        keyset (bool): Copy tables in primary-key pages with a checkpoint after each part,
+                       so re-running main() resumes an interrupted table instead of restarting it
+    """
     # Get RDS ID and Region of Customer database
     db_rds_endpoint, db_rds_port, db_rds_region = find_rds(CUSTOMER)
     print('### db_rds_endpoint:', db_rds_endpoint, '### db_rds_port:', db_rds_port)
@@ -71,64 +83,86 @@ def main():
 
         print("SSH Tunnel is open.")
 
-        with pymysql.connect(
-            host='127.0.0.1',
-            port=tunnel.local_bind_port,
-            user=db_user,
-            password=db_password,
-            database=db_name
-        ) as db_connection:
-
-            # 2. Initialize Pipeline
-            pipeline = ParquetPipeline(
-                s3_bucket=S3_BUCKET,
-                customer=CUSTOMER
+        def connect():
+            return pymysql.connect(
+                host='127.0.0.1',
+                port=tunnel.local_bind_port,
+                user=db_user,
+                password=db_password,
+                database=db_name
+            )
+
+        # 2. Initialize Pipeline
+        pipeline = ParquetPipeline(
+            s3_bucket=S3_BUCKET,
+            customer=CUSTOMER
+        )
+
+        # 3. Define tables to backfill
+        # Full list based on user request and proposal
+        tables = [
+            'user_sim_log',
+            'sim_score_log',
+            'user_dialogue_log',
+            'quiz_question',
+            'quiz_answer',
+            'quiz_option',
+            'simulation',
+            'user',
+            'language',
+            'knowledge_question',
+            'knowledge_answer',
+            'knowledge_option',
+            'score',
+            'section',
+            'user_group',
+            'explore_sim_log'  # Added for practice mode tracking
+        ]
+
+        logger.info(f"Starting backfill for {CUSTOMER} to {S3_BUCKET}")
+        logger.info(f"Processing {len(tables)} tables with chunksize={CHUNKSIZE}")
+
+        def backfill_table(table, db_connection):
+            # Check if table already exists (has metadata)
+            last_update = pipeline.get_last_update_date(table)
+            if last_update:
+                logger.info(f"Skipping backfill for {table}: Already exists (Last update: {last_update}). Run incremental update instead.")
+                return None
+
+            # We are NOT passing a WHERE clause, so it gets everything (as per "Full Table Storage" proposal)
+            if keyset and table in db_primary_keys:
+                checkpoint = pipeline.get_backfill_checkpoint(table)
+                if checkpoint is not None:
+                    logger.info(f"Resuming backfill for {table} after {db_primary_keys[table]} = {checkpoint}")
+
+                return pipeline.backfill_table_keyset(
+                    table_name=table,
+                    db_connection=db_connection,
+                    id_column=db_primary_keys[table],
+                    page_size=PAGE_SIZE,
+                    chunksize=CHUNKSIZE
+                )
+
+            # Using the pipeline's backfill_table method
+            return pipeline.backfill_table(
+                table_name=table,
+                db_connection=db_connection,
+                chunksize=CHUNKSIZE
             )
 
-            # 3. Define tables to backfill
-            # Full list based on user request and proposal
-            tables = [
-                'user_sim_log',
-                'sim_score_log',
-                'user_dialogue_log',
-                'quiz_question',
-                'quiz_answer',
-                'quiz_option',
-                'simulation',
-                'user',
-                'language',
-                'knowledge_question',
-                'knowledge_answer',
-                'knowledge_option',
-                'score',
-                'section',
-                'user_group',
-                'explore_sim_log'  # Added for practice mode tracking
-            ]
-
-            logger.info(f"Starting backfill for {CUSTOMER} to {S3_BUCKET}")
-            logger.info(f"Processing {len(tables)} tables with chunksize={CHUNKSIZE}")
-
-            # 4. Run Backfill
-            for table in tables:
-                try:
-                    # Check if table already exists (has metadata)
-                    last_update = pipeline.get_last_update_date(table)
-                    if last_update:
-                        logger.info(f"Skipping backfill for {table}: Already exists (Last update: {last_update}). Run incremental update instead.")
-                        continue
-
-                    # Using the pipeline's backfill_table method
-                    # We are NOT passing a WHERE clause, so it gets everything (as per "Full Table Storage" proposal)
-                    pipeline.backfill_table(
-                        table_name=table,
-                        db_connection=db_connection,
-                        chunksize=CHUNKSIZE
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to backfill {table}: {e}")
-                    # Continue to next table instead of crashing entire script
-                    continue
+        # 4. Run Backfill - largest tables first; a failed table doesn't stop the others
+        with connect() as db_connection:
+            tables = order_tables_by_size(db_connection, tables)
+
+        results = run_tables_parallel(tables, backfill_table, connect, workers=workers)
+        log_sync_summary(results, title='BACKFILL SUMMARY')
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='One-time backfill of the raw Parquet tables.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of tables to backfill concurrently (default: 1)')
+    parser.add_argument('--no-keyset', action='store_true',
+                        help='Single-pass streaming backfill instead of resumable primary-key pages')
+    args = parser.parse_args()
+
+    main(workers=args.workers, keyset=not args.no_keyset)
\ No newline at end of file
@@ -0,0 +1,503 @@
+"""
+Batch Report Generation for ETU Applied Sciences
+================================================
+
+Runs many report jobs (customer, sims, projects, date window) from one manifest,
+instead of one 1_process_data_poc.py run per report. The work jobs have in common
+is done once per worker process rather than once per report:
+
+- the jobs of a customer are split into groups, one per worker task; the raw tables
+  are loaded once per group, for the sims of its jobs only, and each job gets its
+  own copy of its sims' rows (transform.subset_raw_data)
+- pipelines, client demographics Excel files and EC2 lookups are kept between jobs,
+  as are the embedding model and the legacy modules (imported once per worker)
+- the report JS is written once as a shared, content-hashed bundle
+  (report.build_js_bundle) when the manifest asks for it
+
+Jobs run in a process pool. Each worker gets its share of the CPUs for the XML
+parsing and topic-model pools of the transformation, and every job reports how
+long it spent loading, transforming and writing its report.
+
+Manifest (JSON; relative paths are relative to the manifest):
+    {
+        "defaults": {"customer": "mckinsey.skillsims.com", "start_date": "2025-08-26",
+                     "client_demographics": "code_simulation_3_demographic_data.xlsx"},
+        "output_dir": "reports",
+        "shared_js": true,
+        "jobs": [
+            {"name": "our_code", "sim_ids": [86, 87],
+             "projects": {"Our Code: We Respect One Another": [86, 87]}},
+            {"name": "inclusion_90d", "sim_ids": [91], "days": 90}
+        ]
+    }
+
+Job keys: name, sim_ids (required); customer, s3_bucket, local_data_dir, projects
+({project name: [sim ids]}), start_date, end_date (default: yesterday) or days
+(window ending yesterday), client_demographics, ec2_id/ec2_region (default: looked
+up with find_ec2), mckinsey (default true), compress_data, output (default:
+{output_dir}/{name}.html). "defaults" applies to every job.
+
+Example:
+    python -m skillwell_etl.batch manifest.json --workers 4
+
+Author: ETU Applied Sciences
+Date: 2025-11-20
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, timedelta
+
+from .pipeline import ParquetPipeline
+from .postprocess import prepare_report_data
+from .topics import init_worker_threads, worker_thread_env
+from .transform import (get_base_demographics_from_parquet, get_transformed_data_from_parquet,
+                        load_client_demographics, merge_client_demographics, subset_raw_data)
+
+# report.py and skillwell_functions.py live in the parent directory
+_parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _parent_dir not in sys.path:
+    sys.path.append(_parent_dir)
+
+logger = logging.getLogger('Batch')
+
+# Job settings and their defaults ("required" ones have none)
+JOB_DEFAULTS = {
+    'customer': None,
+    's3_bucket': 'etu.appsciences',
+    'local_data_dir': None,
+    'projects': None,
+    'start_date': None,
+    'end_date': None,
+    'days': None,
+    'client_demographics': None,
+    'ec2_id': None,
+    'ec2_region': None,
+    'mckinsey': True,
+    'compress_data': False,
+    'output': None,
+}
+
+# Loaded once per process and shared by its jobs
+_PIPELINES = {}            # (customer, s3_bucket, local_data_dir) -> ParquetPipeline
+_RAW_DATA = {}             # (customer, s3_bucket, local_data_dir) -> (sim ids, raw tables)
+_CLIENT_DEMOGRAPHICS = {}  # path -> (modification time, DataFrame)
+_EC2 = {}                  # customer -> (ec2_id, ec2_region)
+
+
+# ============================================================================
+# Manifest
+# ============================================================================
+
+def load_manifest(path):
+    """
+    Read a batch manifest and resolve its jobs (defaults applied, dates and paths filled in).
+
+    Args:
+        path (str): Path of the JSON manifest
+
+    Returns:
+        list: One dict per job, with every key of JOB_DEFAULTS plus name, sim_ids,
+            dict_project ({(sim ids): project name}) and js_asset_url (None unless shared_js)
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    output_dir = os.path.join(base_dir, manifest.get('output_dir', '.'))
+    yesterday = (date.today() - timedelta(days=1)).strftime('%Y-%m-%d')
+
+    unknown = set(manifest.get('defaults', {})) - set(JOB_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown keys in manifest defaults: {sorted(unknown)}")
+
+    jobs = []
+    for entry in manifest.get('jobs', []):
+        unknown = set(entry) - set(JOB_DEFAULTS) - {'name', 'sim_ids'}
+        if unknown:
+            raise ValueError(f"Unknown keys in job {entry.get('name')}: {sorted(unknown)}")
+        if not entry.get('name') or not entry.get('sim_ids'):
+            raise ValueError(f"Every job needs a name and sim_ids: {entry}")
+
+        job = dict(JOB_DEFAULTS)
+        job.update(manifest.get('defaults', {}))
+        job.update(entry)
+        job['sim_ids'] = [int(simid) for simid in job['sim_ids']]
+
+        if not job['customer']:
+            raise ValueError(f"Job {job['name']} has no customer")
+        if job['end_date'] is None:
+            job['end_date'] = yesterday
+        if job['days'] is not None:
+            job['start_date'] = (date.fromisoformat(job['end_date']) - timedelta(days=int(job['days']) - 1)).isoformat()
+        if job['start_date'] is None:
+            raise ValueError(f"Job {job['name']} needs a start_date or days")
+
+        # JSON keys can't be tuples: {project name: [sim ids]} -> {(sim ids): project name}
+        job['dict_project'] = {tuple(int(s) for s in sims): project for project, sims in job['projects'].items()} \
+            if job['projects'] else None
+
+        for key in ('local_data_dir', 'client_demographics', 'output'):
+            if job[key] is not None:
+                job[key] = os.path.join(base_dir, job[key])
+        if job['output'] is None:
+            job['output'] = os.path.join(output_dir, f"{job['name']}.html")
+        job['js_asset_url'] = None
+        jobs.append(job)
+
+    names = [job['name'] for job in jobs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate job names: {duplicates}")
+
+    if manifest.get('shared_js'):
+        add_shared_js(jobs, output_dir, manifest.get('js_asset_base_url'))
+
+    return jobs
+
+
+def lake_key(job):
+    """Key of the lake a job reads (jobs with the same key share their raw tables)."""
+    return (job['customer'], job['s3_bucket'], job['local_data_dir'])
+
+
+def add_shared_js(jobs, output_dir, base_url=None):
+    """
+    Write the report JS once (report.build_js_bundle) and point the McKinsey reports at it.
+
+    Args:
+        jobs (list): Jobs from load_manifest (js_asset_url set in place)
+        output_dir (str): Directory of the bundle
+        base_url (str, optional): URL the bundle is served from (default: a path relative to each report)
+    """
+    from report import build_js_bundle
+
+    name = build_js_bundle(output_dir)
+    logger.info(f"✓ Shared report JS: {os.path.join(output_dir, name)}")
+    for job in jobs:
+        if not job['mckinsey']:
+            continue
+        if base_url:
+            job['js_asset_url'] = base_url.rstrip('/') + '/' + name
+        else:
+            relative = os.path.relpath(os.path.join(output_dir, name), os.path.dirname(os.path.abspath(job['output'])))
+            job['js_asset_url'] = relative.replace(os.sep, '/')
+
+
+# ============================================================================
+# Shared Data (per process)
+# ============================================================================
+
+def get_pipeline(job):
+    """ParquetPipeline of the job's lake, created once per process."""
+    key = lake_key(job)
+    if key not in _PIPELINES:
+        _PIPELINES[key] = ParquetPipeline(s3_bucket=job['s3_bucket'], customer=job['customer'],
+                                          local_data_dir=job['local_data_dir'])
+    return _PIPELINES[key]
+
+
+def get_raw_data(job):
+    """
+    Raw tables of the job's sims, cut from the tables of all the sims of its job group
+    (job['lake_sim_ids'], set by run_job_group), loaded once per group.
+
+    Returns:
+        dict: table_name -> DataFrame of the job's sims (the job's own copies)
+    """
+    key = lake_key(job)
+    cached = _RAW_DATA.get(key)
+    if cached is None or not set(job['sim_ids']) <= cached[0]:
+        sim_ids = sorted(set(job.get('lake_sim_ids') or job['sim_ids']) | set(job['sim_ids']))
+        logger.info(f"Loading raw tables of {job['customer']} for sims {sim_ids}...")
+        cached = (set(sim_ids), get_pipeline(job).load_raw_data_for_analysis(sim_ids=sim_ids))
+        _RAW_DATA[key] = cached
+    return subset_raw_data(cached[1], job['sim_ids'])
+
+
+def get_client_demographics(file_path):
+    """Client demographics Excel (transform.load_client_demographics), read again only when it changes."""
+    mtime = os.path.getmtime(file_path) if os.path.exists(file_path) else None
+    cached = _CLIENT_DEMOGRAPHICS.get(file_path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, load_client_demographics(file_path))
+        _CLIENT_DEMOGRAPHICS[file_path] = cached
+    return cached[1]
+
+
+def get_ec2(job):
+    """EC2 instance (ID, region) of the job's sim XMLs: from the job, else find_ec2 (once per customer)."""
+    if job['ec2_id']:
+        return job['ec2_id'], job['ec2_region'] or 'us-east-1'
+
+    customer = job['customer']
+    if customer not in _EC2:
+        from skillwell_functions import find_ec2
+
+        ec2_customer = customer if '.' in customer else f"{customer}.skillsims.com"
+        try:
+            _EC2[customer] = find_ec2(ec2_customer) or (None, 'us-east-1')
+        except Exception as e:
+            logger.warning(f"⚠ Could not find the EC2 instance of {customer} ({e}); using cached sim XMLs only")
+            _EC2[customer] = (None, 'us-east-1')
+    return _EC2[customer]
+
+
+# ============================================================================
+# Jobs
+# ============================================================================
+
+def run_job(job, cpu_share=None):
+    """
+    Load, transform and write the report of one job, timing each stage.
+
+    Args:
+        job (dict): Job from load_manifest
+        cpu_share (int, optional): Processes the job may use for XML parsing and topic fits
+            (default: one per CPU)
+
+    Returns:
+        dict: {'status': 'ok'|'failed', 'seconds': float, 'stages': {stage: seconds},
+               'output': str or None, 'error': str or None}
+    """
+    from report import report_to_file
+
+    start = time.time()
+    stages = {}
+    stage_start = start
+
+    def end_stage(stage):
+        nonlocal stage_start
+        now = time.time()
+        stages[stage] = now - stage_start
+        stage_start = now
+
+    try:
+        # 1. Raw tables and demographics
+        pipeline = get_pipeline(job)
+        raw_data = get_raw_data(job)
+        df_demog = get_base_demographics_from_parquet(pipeline, job['sim_ids'], raw_data=raw_data)
+        if job['client_demographics']:
+            df_demog = merge_client_demographics(df_demog, get_client_demographics(job['client_demographics']))
+        ec2_id, ec2_region = get_ec2(job)
+        end_stage('load')
+
+        # 2. Transformations
+        dict_df = get_transformed_data_from_parquet(
+            pipeline=pipeline,
+            sim_ids=job['sim_ids'],
+            start_date=job['start_date'],
+            end_date=job['end_date'],
+            df_demog=df_demog,
+            dict_project=job['dict_project'],
+            ec2_id=ec2_id,
+            ec2_region=ec2_region,
+            xml_workers=cpu_share,
+            topic_workers=cpu_share,
+            raw_data=raw_data,
+        )
+        if not dict_df:
+            raise ValueError(f"No data for sims {job['sim_ids']}")
+        prepare_report_data(dict_df, job['sim_ids'])
+        end_stage('transform')
+
+        # 3. HTML report
+        os.makedirs(os.path.dirname(os.path.abspath(job['output'])), exist_ok=True)
+        report_to_file(
+            dict_df,
+            job['output'],
+            start_date=job['start_date'],
+            end_date=job['end_date'],
+            dict_project=job['dict_project'],
+            mckinsey=job['mckinsey'],
+            # McKinsey reports are single files (JS inlined or shared): embed their tables compact
+            compact_data=job['mckinsey'],
+            compress_data=job['compress_data'],
+            js_asset_url=job['js_asset_url'],
+        )
+        end_stage('report')
+
+        return {'status': 'ok', 'seconds': time.time() - start, 'stages': stages, 'output': job['output'], 'error': None}
+    except Exception:
+        logger.exception(f"Failed to run job {job['name']}")
+        return {'status': 'failed', 'seconds': time.time() - start, 'stages': stages, 'output': None,
+                'error': traceback.format_exc()}
+
+
+def run_job_group(jobs, cpu_share=None):
+    """
+    Run jobs of the same lake one after the other, loading the raw tables of their sims once.
+
+    The tables are dropped afterwards, so a worker only ever holds the sims of the group
+    it is running.
+
+    Args:
+        jobs (list): Jobs of one lake
+        cpu_share (int, optional): CPUs for the pools of each job
+
+    Returns:
+        list: result of run_job for each job, in order
+    """
+    sim_ids = sorted({sim_id for job in jobs for sim_id in job['sim_ids']})
+    try:
+        return [run_job(dict(job, lake_sim_ids=sim_ids), cpu_share=cpu_share) for job in jobs]
+    finally:
+        _RAW_DATA.pop(lake_key(jobs[0]), None)
+
+
+def group_jobs(jobs, workers):
+    """
+    Split jobs into groups of the same lake, one per worker task.
+
+    Each lake gets a number of groups in proportion to its share of the jobs, so the
+    workers stay busy while each group loads only the sims of its own jobs.
+
+    Args:
+        jobs (list): Jobs from load_manifest
+        workers (int): Worker processes
+
+    Returns:
+        list: lists of jobs, largest groups first
+    """
+    by_lake = {}
+    for job in jobs:
+        by_lake.setdefault(lake_key(job), []).append(job)
+
+    groups = []
+    for lake_jobs in by_lake.values():
+        n_groups = max(1, min(len(lake_jobs), round(workers * len(lake_jobs) / len(jobs))))
+        # Jobs sharing sims next to each other, so a group loads as few sims as possible
+        lake_jobs = sorted(lake_jobs, key=lambda job: sorted(job['sim_ids']))
+        size = -(-len(lake_jobs) // n_groups)
+        groups.extend(lake_jobs[i:i + size] for i in range(0, len(lake_jobs), size))
+    return sorted(groups, key=len, reverse=True)
+
+
+def run_batch(jobs, workers=None):
+    """
+    Run jobs in a process pool (or in this process with one worker). A failing job doesn't
+    stop the others - its error is recorded in the results.
+
+    Workers are spawned (the transformation loads torch and pyarrow, which don't survive a
+    fork) and keep their pipelines, caches and models from one job to the next. Jobs are
+    sent in groups of the same lake (group_jobs) and each group loads only its own sims.
+
+    Args:
+        jobs (list): Jobs from load_manifest
+        workers (int, optional): Worker processes (default: one per CPU, at most one per job)
+
+    Returns:
+        dict: job name -> result of run_job, in the order of jobs
+    """
+    if not jobs:
+        return {}
+
+    n_cpus = os.cpu_count() or 1
+    workers = max(1, min(workers or n_cpus, len(jobs)))
+    groups = group_jobs(jobs, workers)
+    workers = min(workers, len(groups))
+    cpu_share = max(1, n_cpus // workers)
+
+    results = {}
+
+    def log_result(job):
+        r = results[job['name']]
+        status = '✓' if r['status'] == 'ok' else '✗'
+        stages = ', '.join(f"{stage} {seconds:.1f}s" for stage, seconds in r['stages'].items())
+        logger.info(f"{status} {job['name']} finished in {r['seconds']:.1f}s ({stages or 'no stage completed'})")
+
+    def record(group, group_results):
+        for job, result in zip(group, group_results):
+            results[job['name']] = result
+            log_result(job)
+
+    def run_serial(remaining):
+        for group in remaining:
+            record(group, run_job_group(group, cpu_share=cpu_share))
+
+    logger.info(f"Running {len(jobs)} report jobs in {len(groups)} group(s) with {workers} worker(s) "
+                f"({cpu_share} CPUs each)")
+
+    if workers == 1:
+        run_serial(groups)
+    else:
+        try:
+            with worker_thread_env(cpu_share), \
+                    ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=init_worker_threads, initargs=(cpu_share,)) as executor:
+                futures = {executor.submit(run_job_group, group, cpu_share): group for group in groups}
+                for future in as_completed(futures):
+                    record(futures[future], future.result())
+        except (BrokenProcessPool, OSError) as e:
+            remaining = [group for group in groups if group[0]['name'] not in results]
+            logger.warning(f"⚠ Batch process pool unavailable ({e}); running {sum(map(len, remaining))} jobs "
+                           f"in this process")
+            run_serial(remaining)
+
+    return {job['name']: results[job['name']] for job in jobs}
+
+
+def log_batch_summary(results, title='BATCH SUMMARY'):
+    """
+    Log one line per job (status, stage times, report) and the overall counts.
+
+    Args:
+        results (dict): Output of run_batch()
+        title (str): Header line
+
+    Returns:
+        list: Names of the jobs that failed
+    """
+    failed = [name for name, r in results.items() if r['status'] != 'ok']
+
+    logger.info(f"\n{'='*60}")
+    logger.info(title)
+    logger.info(f"{'='*60}")
+
+    for name, r in results.items():
+        stages = '  '.join(f"{stage} {r['stages'][stage]:>6.1f}s" if stage in r['stages'] else f"{stage} {'-':>7}"
+                           for stage in ('load', 'transform', 'report'))
+        if r['status'] == 'ok':
+            logger.info(f"  ✓ {name:<24} {stages}  total {r['seconds']:>7.1f}s  {r['output']}")
+        else:
+            logger.error(f"  ✗ {name:<24} {stages}  total {r['seconds']:>7.1f}s  FAILED: {r['error'].strip().splitlines()[-1]}")
+
+    logger.info(f"{'='*60}")
+    logger.info(f"{len(results) - len(failed)} succeeded, {len(failed)} failed")
+    logger.info(f"{'='*60}\n")
+
+    return failed
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Generate the HTML reports of a batch manifest.')
+    parser.add_argument('manifest', help='JSON manifest of report jobs')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--only', nargs='+', default=None, help='Run only these jobs (by name)')
+    args = parser.parse_args()
+
+    jobs = load_manifest(args.manifest)
+    if args.only:
+        missing = set(args.only) - {job['name'] for job in jobs}
+        if missing:
+            parser.error(f"Unknown jobs: {sorted(missing)}")
+        jobs = [job for job in jobs if job['name'] in args.only]
+
+    start = time.time()
+    failed = log_batch_summary(run_batch(jobs, workers=args.workers))
+    logger.info(f"Batch finished in {time.time() - start:.1f}s")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
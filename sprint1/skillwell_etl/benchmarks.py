@@ -0,0 +1,332 @@
+"""
+Benchmarks for ETU Applied Sciences ETL Transformations
+=======================================================
+
+Times the optimized transformations against the implementations they replaced,
+on synthetic data, and checks that both give the same output.
+
+Usage:
+    python -m skillwell_etl.benchmarks pass_rates --users 200000 --sims 5
+    python -m skillwell_etl.benchmarks text_clean --fields 500000 --distinct 5000
+    python -m skillwell_etl.benchmarks sim_levels --nodes 2000 --graphs 500
+
+Author: ETU Applied Sciences
+Date: 2025-11-20
+"""
+
+import argparse
+import html
+import logging
+import random
+import re
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from .transform import get_overall_pass_rates, sim_levels, stringcleaner
+from .text_clean import clean_xml_text
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('Benchmarks')
+
+
+def timed(func, *args, repeat=1, **kwargs):
+    """
+    Run func `repeat` times and return (last result, best time in seconds).
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def log_result(name, baseline_seconds, new_seconds, labels=('loop', 'vectorized')):
+    """Log both timings and the speedup."""
+    speedup = baseline_seconds / new_seconds if new_seconds > 0 else float('inf')
+    logger.info(f"✓ {name}: {labels[0]} {baseline_seconds:.3f}s -> {labels[1]} {new_seconds:.3f}s ({speedup:,.1f}x)")
+
+
+# ============================================================================
+# OVERALL PASS RATES
+# ============================================================================
+
+def make_sim_logs(n_users=10000, n_sims=3, max_attempts=6, seed=0):
+    """
+    Generate a synthetic user_sim_log: every user gets 1..max_attempts attempts of
+    some sims with random complete/pass flags.
+
+    Returns:
+        pd.DataFrame: logid, simid, userid, start, complete, pass
+    """
+    rng = np.random.default_rng(seed)
+
+    n_pairs = n_users * n_sims
+    userid = np.repeat(np.arange(n_users), n_sims)
+    simid = np.tile(np.arange(1, n_sims + 1) * 10, n_users)
+    attempts = rng.integers(1, max_attempts + 1, n_pairs)
+
+    df = pd.DataFrame({
+        'simid': np.repeat(simid, attempts),
+        'userid': np.repeat(userid, attempts),
+    })
+    n = len(df)
+    df.insert(0, 'logid', np.arange(n))
+    df['start'] = pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 365 * 24 * 3600, n), unit='s')
+    df['complete'] = (rng.random(n) < 0.7).astype('int8')
+    df['pass'] = ((rng.random(n) < 0.4) & (df['complete'] == 1)).astype('int8')
+    return df
+
+
+def pass_rates_loop(df_logs):
+    """
+    Reference implementation: the per-user loop get_transformed_data_from_parquet used
+    before get_overall_pass_rates().
+    """
+    pass_results = []
+
+    for simid, group in df_logs.groupby('simid'):
+        user_status = []
+        for userid, user_logs in group.groupby('userid'):
+            passed_logs = user_logs[user_logs['pass'] == 1]
+            if not passed_logs.empty:
+                first_pass = passed_logs.iloc[0]
+                if first_pass['attempt_calc'] >= 4:
+                    status = "Passed Attempt 4+"
+                else:
+                    status = f"Passed Attempt {first_pass['attempt_calc']}"
+            else:
+                completed_logs = user_logs[user_logs['complete'] == 1]
+                status = "Completed, not yet Passed" if not completed_logs.empty else "Incomplete"
+
+            if status != "Incomplete": user_status.append(status)
+
+        counts = Counter(user_status)
+        total = sum(counts.values())
+        rows = [
+            {'simid': simid, 'stat_order': 1, 'stat': 'Passed Attempt 1', 'n': counts.get('Passed Attempt 1', 0), 'total': total},
+            {'simid': simid, 'stat_order': 2, 'stat': 'Passed Attempt 2', 'n': counts.get('Passed Attempt 2', 0), 'total': total},
+            {'simid': simid, 'stat_order': 3, 'stat': 'Passed Attempt 3', 'n': counts.get('Passed Attempt 3', 0), 'total': total},
+            {'simid': simid, 'stat_order': 4, 'stat': 'Passed Attempt 4+', 'n': counts.get('Passed Attempt 4+', 0), 'total': total},
+            {'simid': simid, 'stat_order': 5, 'stat': 'Completed, not yet Passed', 'n': counts.get('Completed, not yet Passed', 0), 'total': total}
+        ]
+        pass_results.extend(rows)
+    return pd.DataFrame(pass_results)
+
+
+def bench_pass_rates(n_users=10000, n_sims=3, repeat=3):
+    """
+    Compare pass_rates_loop() and get_overall_pass_rates() on synthetic logs.
+
+    Returns:
+        dict: rows, loop_seconds, vectorized_seconds
+    """
+    df_logs = make_sim_logs(n_users, n_sims)
+    df_logs.sort_values(['userid', 'simid', 'start'], inplace=True)
+    df_logs['attempt_calc'] = df_logs.groupby(['userid', 'simid']).cumcount() + 1
+    logger.info(f"Pass rates: {len(df_logs):,} logs, {n_users:,} users, {n_sims} sims")
+
+    expected, loop_seconds = timed(pass_rates_loop, df_logs)
+    result, vectorized_seconds = timed(get_overall_pass_rates, df_logs, repeat=repeat)
+
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    log_result('pass_rates', loop_seconds, vectorized_seconds)
+
+    return {'rows': len(df_logs), 'loop_seconds': loop_seconds, 'vectorized_seconds': vectorized_seconds}
+
+
+# ============================================================================
+# XML TEXT CLEANING
+# ============================================================================
+
+def clean_text_chain(text, kind='markup'):
+    """
+    Reference implementation: the per-field cleaning chains xml_to_df inlined before
+    clean_xml_text().
+    """
+    if kind == 'plain' or kind == 'section':
+        text = stringcleaner(text)
+        text = html.unescape(text).replace(u'\xa0', u' ').replace(u'\r', '').replace(u'\n', '')
+        return stringcleaner(text) if kind == 'section' else text
+
+    if kind == 'label':
+        text = text.strip().replace('\u200b', '')
+        text = re.sub(r'<[^>]*>', '', text.replace('<br>', '?br?')).replace('?br?', '<br>')
+    elif kind == 'feedback':
+        text = re.sub(r'<[^>]*>', '', text.replace('<br>', '?br?')).replace('?br?', '<br>')
+    else:
+        text = re.sub(r'<[^>]*>', '', text.replace('<br />', '?br?').replace('<br>', '?br?')).replace('?br?', '<br>')
+    text = html.unescape(text).replace(u'\xa0', u' ').replace(u'\r', '')
+    return stringcleaner(text)
+
+
+def make_xml_texts(n_fields=200000, n_distinct=2000, seed=0):
+    """
+    Generate (text, kind) pairs like the fields of a batch of sim XMLs: n_fields
+    values drawn from n_distinct raw strings, with markup, entities and line breaks.
+
+    Returns:
+        list: (text, kind) tuples
+    """
+    rng = random.Random(seed)
+    kinds = ['markup', 'markup', 'markup', 'feedback', 'label', 'plain', 'section']
+    words = ['coach', 'learner', 'patient', 'team', 'value', 'respect', 'listen', 'decide', 'explain', 'safety']
+
+    def text():
+        parts = [rng.choice(words) for _ in range(rng.randint(3, 40))]
+        for i in range(0, len(parts), 7):
+            parts[i] = rng.choice(['<p>', '<br>', '<br />', '&nbsp;', '&amp;', '<b>', '</b>', '\r\n', '&#8217;']) + parts[i]
+        return ' ' + ' '.join(parts) + ' '
+
+    distinct = [(text(), rng.choice(kinds)) for _ in range(n_distinct)]
+    return [rng.choice(distinct) for _ in range(n_fields)]
+
+
+def bench_text_clean(n_fields=200000, n_distinct=2000, repeat=3):
+    """
+    Compare clean_text_chain() and clean_xml_text() on synthetic XML fields.
+    The cache is cleared before every run, so only repeats within the batch hit it.
+
+    Returns:
+        dict: fields, chain_seconds, cached_seconds
+    """
+    texts = make_xml_texts(n_fields, n_distinct)
+    logger.info(f"Text cleaning: {n_fields:,} fields, {n_distinct:,} distinct")
+
+    def run_cached():
+        clean_xml_text.cache_clear()
+        return [clean_xml_text(text, kind) for text, kind in texts]
+
+    expected, chain_seconds = timed(lambda: [clean_text_chain(text, kind) for text, kind in texts])
+    result, cached_seconds = timed(run_cached, repeat=repeat)
+
+    assert result == expected, "clean_xml_text() differs from the original cleaning chains"
+    log_result('text_clean', chain_seconds, cached_seconds, labels=('chain', 'compiled+cached'))
+
+    return {'fields': n_fields, 'chain_seconds': chain_seconds, 'cached_seconds': cached_seconds}
+
+
+# ============================================================================
+# SIM LEVELS
+# ============================================================================
+
+def make_dialogue_links(n_nodes=40, width=4, p_decision=0.5, p_back=0.05, n_roots=1, p_branch=0.1, seed=0):
+    """
+    Generate the links of a synthetic sim for sim_levels(): dialogues 1..n_nodes where
+    a decision dialogue links to 1-4 of the next `width` dialogues (optimal/suboptimal/
+    critical) and any other dialogue has one neutral link. Paths converge, some links
+    go back (p_back) and extra starting points link into the sim (n_roots).
+
+    Returns:
+        pd.DataFrame: relationid, relationtype, performancebranch
+    """
+    rng = random.Random(seed)
+    rows = []
+
+    for i in range(1, n_nodes - 1):
+        last = min(n_nodes, i + width)
+        if rng.random() < p_decision:
+            for end in rng.sample(range(i + 1, last + 1), min(rng.randint(1, 4), last - i)):
+                rows.append((f'{i}-{end}', rng.randint(1, 3)))
+        else:
+            rows.append((f'{i}-{rng.randint(i + 1, last)}', 4))
+        if i > 3 and rng.random() < p_back:
+            rows.append((f'{i}-{rng.randint(2, i - 1)}', rng.choice([3, 4])))
+
+    for r in range(n_roots - 1):
+        rows.append((f'{n_nodes + 10 + r}-{rng.randint(2, n_nodes)}', rng.randint(1, 4)))
+
+    df = pd.DataFrame(rows, columns=['relationid', 'relationtype'])
+    branches = {i for i in range(1, n_nodes + 1) if rng.random() < p_branch}
+    df['performancebranch'] = df['relationid'].map(lambda x: 1 if int(x.split('-')[0]) in branches else 0)
+    return df.drop_duplicates()
+
+
+def check_sim_levels(n_graphs=500, seed=0):
+    """
+    Equivalence test: the 'graph' and 'merge' engines of sim_levels() must return the
+    same frame (values, dtypes and index) on random dialogue graphs of every shape.
+
+    Returns:
+        int: Graphs checked
+    """
+    rng = random.Random(seed)
+    for i in range(n_graphs):
+        df = make_dialogue_links(
+            n_nodes=rng.randint(3, 60), width=rng.randint(1, 6), p_decision=rng.random(),
+            p_back=rng.choice([0, 0, 0.05, 0.2]), n_roots=rng.randint(1, 3),
+            p_branch=rng.choice([0, 0.1, 0.3]), seed=seed + i
+        )
+        if rng.random() < 0.2:
+            df = df.drop(columns=['performancebranch'])
+
+        expected = sim_levels(df, engine='merge')
+        result = sim_levels(df, engine='graph')
+        try:
+            pd.testing.assert_frame_equal(result, expected)
+        except AssertionError:
+            logger.error(f"❌ sim_levels engines differ on graph seed {seed + i}:\n{df.to_string()}")
+            raise
+
+    logger.info(f"✓ sim_levels: graph and merge engines agree on {n_graphs} random dialogue graphs")
+    return n_graphs
+
+
+def bench_sim_levels(n_nodes=1000, n_graphs=500, repeat=3):
+    """
+    Check the sim_levels() engines agree, then time both on one large synthetic sim.
+
+    Returns:
+        dict: nodes, merge_seconds, graph_seconds
+    """
+    check_sim_levels(n_graphs)
+
+    df = make_dialogue_links(n_nodes=n_nodes, width=6, p_decision=0.6, p_back=0.01, n_roots=2, seed=1)
+    logger.info(f"Sim levels: {n_nodes:,} dialogues, {len(df):,} links")
+
+    expected, merge_seconds = timed(sim_levels, df, engine='merge')
+    result, graph_seconds = timed(sim_levels, df, engine='graph', repeat=repeat)
+
+    pd.testing.assert_frame_equal(result, expected)
+    log_result('sim_levels', merge_seconds, graph_seconds, labels=('merge', 'graph'))
+
+    return {'nodes': n_nodes, 'merge_seconds': merge_seconds, 'graph_seconds': graph_seconds}
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+BENCHMARKS = {
+    'pass_rates': lambda args: bench_pass_rates(args.users, args.sims, args.repeat),
+    'text_clean': lambda args: bench_text_clean(args.fields, args.distinct, args.repeat),
+    'sim_levels': lambda args: bench_sim_levels(args.nodes, args.graphs, args.repeat),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the optimized ETL transformations')
+    parser.add_argument('benchmark', nargs='?', choices=list(BENCHMARKS) + ['all'], default='all')
+    parser.add_argument('--users', type=int, default=10000, help='Synthetic learners')
+    parser.add_argument('--sims', type=int, default=3, help='Synthetic simulations')
+    parser.add_argument('--fields', type=int, default=200000, help='Synthetic XML text fields')
+    parser.add_argument('--distinct', type=int, default=2000, help='Distinct raw strings among the fields')
+    parser.add_argument('--nodes', type=int, default=1000, help='Dialogues of the synthetic sim')
+    parser.add_argument('--graphs', type=int, default=500, help='Random dialogue graphs of the equivalence test')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs of the optimized version (best is reported)')
+    args = parser.parse_args()
+
+    names = list(BENCHMARKS) if args.benchmark == 'all' else [args.benchmark]
+    for name in names:
+        BENCHMARKS[name](args)
+
+
+if __name__ == '__main__':
+    main()
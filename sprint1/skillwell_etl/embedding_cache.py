@@ -0,0 +1,351 @@
+"""
+Embedding Cache for Free-Text Survey Answers
+============================================
+
+quiz_answer rows never change once written, but topic analysis used to embed the
+whole free-text history on every run. This cache keeps the sentence embedding of
+every answer text on local disk, per customer and model:
+
+    {directory}/{customer}/{model}/vectors.f16   float16 [count, dim], append-only (np.memmap)
+    {directory}/{customer}/{model}/index.npz     keys (16-byte blake2b of the text), last_used (day)
+    {directory}/{customer}/{model}/meta.json     model name, dim, count
+
+Answers are keyed by their text rather than answerid: the embedding depends only
+on the text, and short answers ("Nothing", "N/A") repeat thousands of times.
+Embeddings are always returned through float16, so results don't depend on
+whether an answer was cached.
+
+The vectors are memory-mapped, so the cache has to live on a local filesystem:
+the pipeline's local_data_dir in local mode, DEFAULT_EMBEDDING_CACHE_DIR otherwise.
+
+Usage:
+    python -m skillwell_etl.embedding_cache warm  --customer mckinsey.skillsims.com --s3-bucket etu.appsciences
+    python -m skillwell_etl.embedding_cache prune --customer mckinsey.skillsims.com --max-age-days 180 --orphans
+    python -m skillwell_etl.embedding_cache stats --customer mckinsey.skillsims.com
+
+Author: ETU Applied Sciences
+Date: 2025-11-20
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows - no cross-process locking
+    fcntl = None
+
+if __package__:
+    from .topics import EMBEDDING_MODEL_NAME
+else:
+    from topics import EMBEDDING_MODEL_NAME  # Running as a script
+
+logger = logging.getLogger('EmbeddingCache')
+
+# Local cache directory when the pipeline reads from S3
+DEFAULT_EMBEDDING_CACHE_DIR = os.environ.get(
+    'SKILLWELL_EMBEDDING_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'skillwell_etl', 'embeddings')
+)
+
+# Stored vector type (little-endian float16)
+VECTOR_DTYPE = np.dtype('<f2')
+
+# Bytes of the blake2b text key
+KEY_SIZE = 16
+
+
+def text_key(text):
+    """Cache key of an answer text."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=KEY_SIZE).digest()
+
+
+def _today():
+    """Days since the epoch (the unit of last_used)."""
+    return int(time.time() // 86400)
+
+
+class EmbeddingCache:
+    """
+    Append-only float16 store of text embeddings for one customer and model.
+    """
+
+    def __init__(self, directory, customer, model_name=EMBEDDING_MODEL_NAME):
+        """
+        Args:
+            directory (str): Local cache directory
+            customer (str): Customer name (answers of different customers are kept apart)
+            model_name (str): sentence-transformers model the embeddings come from
+        """
+        self.model_name = model_name
+        self.path = os.path.join(directory, customer, model_name.replace('/', '__'))
+        self._load()
+
+    @classmethod
+    def from_pipeline(cls, pipeline, model_name=EMBEDDING_MODEL_NAME):
+        """Cache next to the raw tables in local mode, in DEFAULT_EMBEDDING_CACHE_DIR otherwise."""
+        if getattr(pipeline, 'local_data_dir', None):
+            directory = os.path.join(pipeline.local_data_dir, 'embedding_cache')
+        else:
+            directory = DEFAULT_EMBEDDING_CACHE_DIR
+        return cls(directory, pipeline.customer, model_name)
+
+    # ------------------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------------------
+
+    @property
+    def vectors_path(self):
+        return os.path.join(self.path, 'vectors.f16')
+
+    @property
+    def index_path(self):
+        return os.path.join(self.path, 'index.npz')
+
+    @property
+    def meta_path(self):
+        return os.path.join(self.path, 'meta.json')
+
+    @contextmanager
+    def _lock(self):
+        """Exclusive lock of the cache files across processes."""
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, '.lock'), 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self):
+        """Read the index and map the vectors (rows past the index count are ignored)."""
+        self.dim = None
+        self.keys = np.empty(0, dtype=f'S{KEY_SIZE}')
+        self.last_used = np.empty(0, dtype=np.int32)
+        self.vectors = None
+
+        if os.path.exists(self.meta_path) and os.path.exists(self.index_path):
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            with np.load(self.index_path) as index:
+                self.keys = index['keys']
+                self.last_used = index['last_used']
+            self.dim = meta['dim']
+            if len(self.keys) > 0:
+                self.vectors = np.memmap(self.vectors_path, dtype=VECTOR_DTYPE, mode='r', shape=(len(self.keys), self.dim))
+
+        # 'keys' stores fixed-width bytes; numpy drops trailing NUL bytes, so look up the stripped key
+        self.rows = {key: i for i, key in enumerate(self.keys.tolist())}
+
+    def _save_index(self):
+        """Write the index and meta atomically (vectors must already be on disk)."""
+        tmp_index = self.index_path + '.tmp.npz'
+        np.savez(tmp_index, keys=self.keys, last_used=self.last_used)
+        os.replace(tmp_index, self.index_path)
+
+        tmp_meta = self.meta_path + '.tmp'
+        with open(tmp_meta, 'w') as f:
+            json.dump({'model_name': self.model_name, 'dim': self.dim, 'count': len(self.keys)}, f)
+        os.replace(tmp_meta, self.meta_path)
+
+    def __len__(self):
+        return len(self.keys)
+
+    # ------------------------------------------------------------------------
+    # Lookup / Add
+    # ------------------------------------------------------------------------
+
+    def _row(self, key):
+        return self.rows.get(key.rstrip(b'\x00'), -1)
+
+    def embed(self, texts, embed_fn):
+        """
+        Embeddings of texts, computing (and storing) only the texts not cached yet.
+
+        Args:
+            texts (list): Texts to embed
+            embed_fn (callable): list of texts -> np.ndarray (n, dim), called once with the misses
+
+        Returns:
+            np.ndarray: (len(texts), dim) float32 embeddings, in the order of texts
+        """
+        texts = list(texts)
+        keys = [text_key(text) for text in texts]
+
+        dict_missing = {}
+        for key, text in zip(keys, texts):
+            if self._row(key) < 0:
+                dict_missing.setdefault(key, text)
+
+        n_hits = len(texts) - sum(1 for key in keys if key in dict_missing)
+        logger.info(f"  Embedding cache: {n_hits:,}/{len(texts):,} answers cached, embedding {len(dict_missing):,} new texts")
+
+        if dict_missing:
+            new_embeddings = np.asarray(embed_fn(list(dict_missing.values())))
+            self._append(list(dict_missing.keys()), new_embeddings)
+
+        rows = np.array([self._row(key) for key in keys], dtype=np.int64)
+        with self._lock():
+            self._touch(rows)
+        if len(rows) == 0:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.asarray(self.vectors[rows], dtype=np.float32)
+
+    def _append(self, keys, embeddings):
+        """Append new vectors (under the lock, re-reading what other processes added)."""
+        with self._lock():
+            self._load()
+            if self.dim is not None and embeddings.shape[1] != self.dim:
+                raise ValueError(f"Embedding dim {embeddings.shape[1]} != cache dim {self.dim} ({self.path})")
+            self.dim = embeddings.shape[1]
+
+            new = [i for i, key in enumerate(keys) if self._row(key) < 0]
+            if not new:
+                return
+
+            # Drop rows a crashed writer left past the index, then append
+            with open(self.vectors_path, 'ab') as f:
+                f.truncate(len(self.keys) * self.dim * VECTOR_DTYPE.itemsize)
+                f.write(np.ascontiguousarray(embeddings[new], dtype=VECTOR_DTYPE).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            self.keys = np.concatenate([self.keys, np.array([keys[i] for i in new], dtype=f'S{KEY_SIZE}')])
+            self.last_used = np.concatenate([self.last_used, np.full(len(new), _today(), dtype=np.int32)])
+            self._save_index()
+            self._load()
+
+    def _touch(self, rows):
+        """Mark rows as used today (saved only when something changed)."""
+        rows = rows[rows >= 0]
+        today = _today()
+        if len(rows) == 0 or (self.last_used[rows] == today).all():
+            return
+        self._load()
+        self.last_used[rows[rows < len(self.last_used)]] = today
+        self._save_index()
+
+    # ------------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------------
+
+    def prune(self, max_age_days=None, keep_texts=None):
+        """
+        Drop entries not used for max_age_days and/or whose text isn't in keep_texts,
+        rewriting the vectors compactly.
+
+        Args:
+            max_age_days (int, optional): Keep entries used within this many days
+            keep_texts (iterable, optional): Keep only the entries of these texts
+
+        Returns:
+            int: Entries removed
+        """
+        with self._lock():
+            self._load()
+            keep = np.ones(len(self.keys), dtype=bool)
+            if max_age_days is not None:
+                keep &= self.last_used >= _today() - max_age_days
+            if keep_texts is not None:
+                keep_keys = {text_key(text).rstrip(b'\x00') for text in keep_texts}
+                keep &= np.array([key in keep_keys for key in self.keys.tolist()], dtype=bool)
+
+            n_removed = int((~keep).sum())
+            if n_removed == 0:
+                return 0
+
+            tmp_vectors = self.vectors_path + '.tmp'
+            with open(tmp_vectors, 'wb') as f:
+                if keep.any():
+                    f.write(np.ascontiguousarray(self.vectors[keep], dtype=VECTOR_DTYPE).tobytes())
+            self.vectors = None
+            os.replace(tmp_vectors, self.vectors_path)
+
+            self.keys = self.keys[keep]
+            self.last_used = self.last_used[keep]
+            self._save_index()
+            self._load()
+
+        logger.info(f"✓ Pruned {n_removed:,} embeddings, {len(self):,} left ({self.path})")
+        return n_removed
+
+    def stats(self):
+        """Entries, dim and size on disk."""
+        size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        return {'path': self.path, 'model_name': self.model_name, 'count': len(self), 'dim': self.dim, 'bytes': size}
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def free_text_answers(pipeline):
+    """
+    Free-text answer texts of a customer, cleaned as in get_survey_responses
+    (typeid 4, stripped, at least 4 characters).
+
+    Returns:
+        list: Answer texts (with repeats)
+    """
+    df_answers = pipeline.read_parquet_from_s3('quiz_answer')
+    df_questions = pipeline.read_parquet_from_s3('quiz_question')
+    if df_answers is None or df_questions is None or 'answer' not in df_answers.columns:
+        return []
+
+    question_ids = df_questions.loc[df_questions['typeid'] == 4, 'questionid']
+    answers = df_answers.loc[df_answers['questionid'].isin(question_ids), 'answer'].astype(str).str.strip()
+    return answers[answers.str.len() >= 4].tolist()
+
+
+def main():
+    if __package__:
+        from .pipeline import ParquetPipeline
+        from .topics import embed_texts
+    else:
+        from pipeline import ParquetPipeline
+        from topics import embed_texts
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Warm or prune the embedding cache of free-text survey answers.')
+    parser.add_argument('command', choices=['warm', 'prune', 'stats'])
+    parser.add_argument('--customer', required=True, help='Customer (raw_tables/{customer}/)')
+    parser.add_argument('--s3-bucket', default='etu.appsciences', help='Lake bucket (default: etu.appsciences)')
+    parser.add_argument('--local-data-dir', default=None, help='Read the raw tables from this local directory')
+    parser.add_argument('--cache-dir', default=None, help='Cache directory (default: next to the pipeline data)')
+    parser.add_argument('--model', default=EMBEDDING_MODEL_NAME, help=f'Embedding model (default: {EMBEDDING_MODEL_NAME})')
+    parser.add_argument('--max-age-days', type=int, default=None, help='prune: drop entries unused for this many days')
+    parser.add_argument('--orphans', action='store_true', help='prune: drop entries whose text is no longer an answer')
+    args = parser.parse_args()
+
+    pipeline = ParquetPipeline(s3_bucket=args.s3_bucket, customer=args.customer, local_data_dir=args.local_data_dir)
+    if args.cache_dir:
+        cache = EmbeddingCache(args.cache_dir, args.customer, args.model)
+    else:
+        cache = EmbeddingCache.from_pipeline(pipeline, args.model)
+
+    if args.command == 'warm':
+        texts = free_text_answers(pipeline)
+        logger.info(f"Warming {cache.path} with {len(texts):,} free-text answers...")
+        embed_texts(texts, model_name=args.model, cache=cache)
+        logger.info(f"✓ Embedding cache warm: {len(cache):,} texts")
+
+    elif args.command == 'prune':
+        if args.max_age_days is None and not args.orphans:
+            parser.error('prune needs --max-age-days and/or --orphans')
+        keep_texts = free_text_answers(pipeline) if args.orphans else None
+        cache.prune(max_age_days=args.max_age_days, keep_texts=keep_texts)
+
+    logger.info(f"{cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
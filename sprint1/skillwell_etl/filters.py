@@ -3,6 +3,11 @@ import pandas as pd
 import logging
 from datetime import datetime
 
+if __package__:
+    from . import lake
+else:
+    import lake  # Running as a script
+
 logger = logging.getLogger('FilterLogic')
 
 def filter_logs_and_users(raw_data, sim_ids, start_date, end_date):
@@ -77,3 +82,126 @@ def filter_logs_and_users(raw_data, sim_ids, start_date, end_date):
     df_final = df_logs[mask_start & mask_end & mask_sim].copy()
 
     return df_final, df_final['userid'].unique()
+
+
+# ============================================================================
+# SHARED ANALYSIS CONTEXT
+# ============================================================================
+
+def normalize_logs(df_logs):
+    """
+    Cast user_sim_log in place: start/end to datetime, BIT columns to int8.
+
+    Frames loaded through the pipeline already have int8 BIT columns; bytes
+    (older files, pd.read_sql_query results) are decoded vectorized.
+
+    Args:
+        df_logs (pd.DataFrame): Raw user_sim_log frame
+
+    Returns:
+        pd.DataFrame: The same frame, normalized
+    """
+    if 'start' in df_logs.columns:
+        df_logs['start'] = pd.to_datetime(df_logs['start'])
+    if 'end' in df_logs.columns:
+        df_logs['end'] = pd.to_datetime(df_logs['end'])
+
+    return lake.decode_bit_frame(df_logs)
+
+
+def rank_attempts(df_logs):
+    """
+    Add first_attempt / last_attempt ranks (1 = first / last by start) per sim/user in place.
+
+    Args:
+        df_logs (pd.DataFrame): Logs with simid, userid and start
+
+    Returns:
+        pd.DataFrame: The same frame, with the rank columns added
+    """
+    grouped = df_logs.groupby(['simid', 'userid'])['start']
+    df_logs['first_attempt'] = grouped.rank(method='first')
+    df_logs['last_attempt'] = grouped.rank(method='first', ascending=False)
+    return df_logs
+
+
+class AnalysisContext:
+    """
+    Prepared log frames shared by every transformation of one report.
+
+    Built once per (sim_ids, window): normalizes user_sim_log (dates and BIT
+    columns), runs filter_logs_and_users and ranks first/last attempts, so the
+    transformations don't each repeat that work on the full log table.
+
+    The frames are shared - transformations must treat them as read-only
+    (filter/copy before adding columns or sorting in place).
+
+    Example:
+        >>> context = AnalysisContext(raw_data, sim_ids, start_dt, end_dt)
+        >>> df_logs_filtered, valid_uids = context.filtered(sim_ids, start_dt, end_dt)
+    """
+
+    def __init__(self, raw_data, sim_ids, start_date, end_date):
+        """
+        Args:
+            raw_data (dict): table_name -> DataFrame from load_raw_data_for_analysis()
+            sim_ids (list): Simulation IDs of the report
+            start_date: Report window start (str or datetime)
+            end_date: Report window end (str or datetime)
+        """
+        self.raw_data = raw_data
+        self.sim_ids = list(sim_ids)
+        self.start_date = pd.to_datetime(start_date)
+        self.end_date = pd.to_datetime(end_date)
+
+        df_logs = raw_data.get('user_sim_log')
+        self.logs = normalize_logs(df_logs) if df_logs is not None else None
+
+        self.logs_filtered, self.valid_uids = filter_logs_and_users(
+            raw_data, self.sim_ids, self.start_date, self.end_date
+        )
+        if not self.logs_filtered.empty:
+            rank_attempts(self.logs_filtered)
+
+        logger.info(f"✓ Analysis context ready: {len(self.logs_filtered):,} logs, {len(self.valid_uids):,} users")
+
+    def matches(self, sim_ids, start_date, end_date):
+        """Check whether the context was built for this (sim_ids, window)."""
+        return (
+            list(sim_ids) == self.sim_ids and
+            pd.to_datetime(start_date) == self.start_date and
+            pd.to_datetime(end_date) == self.end_date
+        )
+
+    def filtered(self, sim_ids, start_date, end_date):
+        """
+        Filtered logs and valid users for a window (same result as filter_logs_and_users).
+
+        Returns the shared frames when the window matches the context and falls
+        back to filtering raw_data otherwise.
+
+        Returns:
+            tuple: (df_logs_filtered, valid_uids)
+        """
+        if self.matches(sim_ids, start_date, end_date):
+            return self.logs_filtered, self.valid_uids
+        return filter_logs_and_users(self.raw_data, sim_ids, start_date, end_date)
+
+
+def get_filtered_logs(raw_data, sim_ids, start_date, end_date, context=None):
+    """
+    filter_logs_and_users() through an optional AnalysisContext.
+
+    Args:
+        raw_data (dict): table_name -> DataFrame
+        sim_ids (list): Simulation IDs
+        start_date: Window start
+        end_date: Window end
+        context (AnalysisContext, optional): Prepared context to reuse
+
+    Returns:
+        tuple: (df_logs_filtered, valid_uids)
+    """
+    if context is not None:
+        return context.filtered(sim_ids, start_date, end_date)
+    return filter_logs_and_users(raw_data, sim_ids, start_date, end_date)
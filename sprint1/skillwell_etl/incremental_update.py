@@ -2,6 +2,7 @@
 import os
 import sys
 import json
+import argparse
 import pymysql
 from datetime import datetime
 import logging
@@ -14,6 +15,7 @@ from skillwell_functions import *
 
 # Import from same directory
 from .parquet_pipeline import ParquetPipeline
+from .parallel_sync import order_tables_by_size, run_tables_parallel, log_sync_summary
 
 # Configure logging
 logging.basicConfig(
@@ -45,7 +47,14 @@ db_primary_keys = {
             'explore_sim_log': 'logid'  # Added for practice mode tracking
 }
 
-def main():
+def main(workers=1):
+    """
+    Incremental update of every table in db_primary_keys.
+
+    Args:
+        workers (int): Number of tables synced concurrently, each over its own
+                       MySQL connection through the SSH tunnel (1 = one table at a time)
+    """
     db_user = 'etu_data'
     #db_user = 'root'
     db_name = 'etu_sim'
@@ -72,38 +81,48 @@ def main():
 
         print("SSH Tunnel is open.")
 
-        with pymysql.connect(
-            host='127.0.0.1',
-            port=tunnel.local_bind_port,
-            user=db_user,
-            password=db_password,
-            database=db_name
-        ) as db_connection:
-
-            # 2. Initialize Pipeline
-            pipeline = ParquetPipeline(
-                s3_bucket=S3_BUCKET,
-                customer=CUSTOMER
+        def connect():
+            return pymysql.connect(
+                host='127.0.0.1',
+                port=tunnel.local_bind_port,
+                user=db_user,
+                password=db_password,
+                database=db_name
+            )
+
+        # 2. Initialize Pipeline
+        pipeline = ParquetPipeline(
+            s3_bucket=S3_BUCKET,
+            customer=CUSTOMER
+        )
+
+
+        # 3. Tables to update (using db_primary_keys map from global scope)
+        # Full list based on user request edit
+
+        logger.info(f"Starting incremental update for {CUSTOMER} in {S3_BUCKET}...")
+
+        def update_table(table, db_connection):
+            # Use ID-based incremental update
+            return pipeline.update_table_incremental_by_id(
+                table_name=table,
+                db_connection=db_connection,
+                id_column=db_primary_keys[table]
             )
 
+        # Largest tables first so they don't end up running alone at the end
+        with connect() as db_connection:
+            tables = order_tables_by_size(db_connection, list(db_primary_keys))
+
+        results = run_tables_parallel(tables, update_table, connect, workers=workers)
+        log_sync_summary(results, title='INCREMENTAL UPDATE SUMMARY')
+
+        logger.info("Incremental update process finished.")
 
-            # 3. Tables to update (using db_primary_keys map from global scope)
-            # Full list based on user request edit
-            
-            logger.info(f"Starting incremental update for {CUSTOMER} in {S3_BUCKET}...")
-
-            for table, pk in db_primary_keys.items():
-                try:
-                    # Use ID-based incremental update
-                    pipeline.update_table_incremental_by_id(
-                        table_name=table,
-                        db_connection=db_connection,
-                        id_column=pk
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to update {table}: {e}")
-                    
-            logger.info("Incremental update process finished.")
-        
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='Incremental update of the raw Parquet tables.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of tables to sync concurrently (default: 1)')
+    args = parser.parse_args()
+
+    main(workers=args.workers)
@@ -0,0 +1,1383 @@
+"""
+Parquet Lake Helpers for ETU Applied Sciences
+=============================================
+
+Shared storage-layer helpers used by both ParquetPipeline classes
+(pipeline.py and parquet_pipeline.py).
+
+Reads go through pyarrow.dataset so that:
+- simid IN (...) and date-range filters are pushed down to row-group statistics
+- only the columns listed in ANALYSIS_COLUMNS are read for the large tables
+- the same code path works against S3 and against a local_data_dir
+
+Event tables can optionally be stored hive-partitioned by simid and month:
+
+    raw_tables/{customer}/user_sim_log/simid=86/ym=2025-09/part-0.parquet
+
+Readers detect the layout per table ({table}/ directory vs {table}.parquet file),
+so partitioned and single-file tables can coexist during a migration.
+
+Incremental updates append new rows as part files instead of rewriting the table
+(into the partitions, or {table}_parts/ for single-file tables). The list of live
+files is kept in a small per-table manifest (metadata/{customer}/{table}_manifest.json)
+and compact_files() periodically merges small parts into large row groups. LakeTables
+ties these together for the tables of one customer (pipeline.tables).
+
+Author: ETU Applied Sciences
+Date: 2025-11-20
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+import pymysql
+
+logger = logging.getLogger(__name__)
+
+# Columns compared against start_date/end_date, in order of preference
+# (matches the pandas filter in load_raw_data_for_analysis)
+DATE_COLUMNS = ['start', 'end', 'dt']
+
+# Per-table column projection for load_raw_data_for_analysis.
+# Only the large tables are projected - reference tables are small and read in full.
+# Date columns are always kept so the date-range filter sees the same column as before.
+ANALYSIS_COLUMNS = {
+    'user_sim_log': [
+        'logid', 'simid', 'userid', 'uid', 'languageid', 'languageId',
+        'start', 'end', 'duration', 'complete', 'pass', 'assess',
+    ],
+    'sim_score_log': [
+        'id', 'logid', 'simid', 'userid', 'scoreid', 'value', 'start', 'end',
+    ],
+    'user_dialogue_log': [
+        'id', 'logid', 'simid', 'userid', 'relationid', 'relationType', 'start', 'end',
+    ],
+    'explore_sim_log': [
+        'logid', 'simid', 'userid', 'duration', 'start', 'end',
+    ],
+    'quiz_answer': [
+        'answerid', 'logid', 'questionid', 'optionid', 'userid', 'answer', 'yesno', 'value',
+        'start', 'end', 'dt',
+    ],
+}
+
+# Event tables that can be stored in the partitioned layout
+PARTITIONED_TABLES = ['user_sim_log', 'sim_score_log', 'user_dialogue_log', 'explore_sim_log']
+
+# Hive partitioning: simid=<int>/ym=<YYYY-MM>. ym is derived from the table's date
+# column on write and dropped again on read.
+PARTITION_COLUMN = 'ym'
+PARTITION_SCHEMA = pa.schema([('simid', pa.int64()), (PARTITION_COLUMN, pa.string())])
+PARTITIONING = ds.partitioning(PARTITION_SCHEMA, flavor='hive')
+
+# Delta part files of single-file tables go to {table}_parts/
+PARTS_SUFFIX = '_parts'
+
+# Row group size used when compacting part files
+COMPACT_ROW_GROUP_SIZE = 500_000
+
+# Files with at least this many rows are already large and are left out of compaction
+# (so a compaction only rewrites the recent small parts, not the table's history)
+COMPACT_MAX_FILE_ROWS = 1_000_000
+
+# MySQL BIT(1) flags. New backfills store BIT columns as int8 (decoded from the MySQL
+# column type); these names are also decoded on read for files written as raw bytes.
+BIT_COLUMNS = ['complete', 'pass', 'assess']
+MYSQL_BIT_TYPE = 16
+
+
+def get_filesystem(s3_bucket, local_data_dir=None, s3_region=None):
+    """
+    Build the pyarrow filesystem and root path for the lake.
+
+    Args:
+        s3_bucket (str): S3 bucket name (ignored in local mode)
+        local_data_dir (str, optional): Local data directory. If set, uses the local filesystem.
+        s3_region (str, optional): AWS region of the bucket
+
+    Returns:
+        tuple: (pyarrow.fs.FileSystem, root path without trailing slash)
+    """
+    if local_data_dir:
+        return pafs.LocalFileSystem(), local_data_dir.rstrip('/')
+
+    return pafs.S3FileSystem(region=s3_region), s3_bucket
+
+
+def get_date_column(column_names):
+    """Return the column used for date-range filtering, or None if the table has none."""
+    for date_col in DATE_COLUMNS:
+        if date_col in column_names:
+            return date_col
+    return None
+
+
+def table_path(root, prefix, table_name):
+    """Path of the single-file layout for a table ({root}/{prefix}{table}.parquet)."""
+    return f'{root}/{prefix}{table_name}.parquet'
+
+
+def partitioned_path(root, prefix, table_name):
+    """Path of the partitioned layout for a table ({root}/{prefix}{table}/)."""
+    return f'{root}/{prefix}{table_name}'
+
+
+def parts_path(root, prefix, table_name):
+    """Directory holding the delta part files of a single-file table ({root}/{prefix}{table}_parts/)."""
+    return f'{root}/{prefix}{table_name}{PARTS_SUFFIX}'
+
+
+def is_partitioned(filesystem, path):
+    """True if `path` is a partitioned dataset directory."""
+    return filesystem.get_file_info(path).type == pafs.FileType.Directory
+
+
+def is_file(filesystem, path):
+    """True if `path` is a single Parquet file."""
+    return filesystem.get_file_info(path).type == pafs.FileType.File
+
+
+def resolve_table_path(filesystem, root, prefix, table_name):
+    """
+    Find where a table is stored, preferring the partitioned layout.
+
+    Returns:
+        str or None: Directory or file path, or None if the table doesn't exist
+    """
+    path = partitioned_path(root, prefix, table_name)
+    if is_partitioned(filesystem, path):
+        return path
+
+    path = table_path(root, prefix, table_name)
+    if is_file(filesystem, path):
+        return path
+
+    return None
+
+
+def build_filter(schema, sim_ids=None, start_date=None, end_date=None, in_filters=None):
+    """
+    Build a pyarrow filter expression for the given dataset schema.
+
+    Only filters that apply to the schema are included: simid IN (...) when the table
+    has a simid column, and start_date <= date_col <= end_date when the table has a
+    timestamp/date column (string-typed dates are left to the pandas filter).
+
+    Args:
+        schema (pa.Schema): Dataset schema
+        sim_ids (list, optional): Simulation IDs
+        start_date (str, optional): Start date (YYYY-MM-DD)
+        end_date (str, optional): End date (YYYY-MM-DD)
+        in_filters (dict, optional): Extra column -> values IN filters (e.g. {'questionid': [...]})
+
+    Returns:
+        pyarrow.dataset.Expression or None
+    """
+    expressions = []
+
+    if sim_ids and 'simid' in schema.names:
+        expressions.append(ds.field('simid').isin(list(sim_ids)))
+
+    for col, values in (in_filters or {}).items():
+        if col in schema.names and values is not None:
+            expressions.append(ds.field(col).isin(list(values)))
+
+    if start_date and end_date:
+        date_col = get_date_column(schema.names)
+        if date_col is not None:
+            date_type = schema.field(date_col).type
+            bounds = None
+            if pa.types.is_timestamp(date_type) and date_type.tz is None:
+                bounds = (
+                    pa.scalar(pd.Timestamp(start_date), type=date_type),
+                    pa.scalar(pd.Timestamp(end_date), type=date_type),
+                )
+            elif pa.types.is_date(date_type):
+                bounds = (
+                    pa.scalar(pd.Timestamp(start_date).date(), type=date_type),
+                    pa.scalar(pd.Timestamp(end_date).date(), type=date_type),
+                )
+            if bounds is not None:
+                expressions.append((ds.field(date_col) >= bounds[0]) & (ds.field(date_col) <= bounds[1]))
+
+        # Partition pruning: ym is derived from the same date column
+        if PARTITION_COLUMN in schema.names and date_col is not None:
+            expressions.append(
+                (ds.field(PARTITION_COLUMN) >= pd.Timestamp(start_date).strftime('%Y-%m')) &
+                (ds.field(PARTITION_COLUMN) <= pd.Timestamp(end_date).strftime('%Y-%m'))
+            )
+
+    if not expressions:
+        return None
+
+    expression = expressions[0]
+    for e in expressions[1:]:
+        expression = expression & e
+    return expression
+
+
+def read_table(filesystem, path, columns=None, sim_ids=None, start_date=None, end_date=None, in_filters=None,
+               files=None, partitioned=None):
+    """
+    Read a Parquet table with column projection and predicate pushdown.
+
+    `path` may be a single Parquet file or a partitioned dataset directory; for the
+    latter, simid/ym filters prune whole partitions before any file is opened.
+
+    Args:
+        filesystem (pyarrow.fs.FileSystem): Filesystem from get_filesystem()
+        path (str): Path of the Parquet file or directory (without the s3:// scheme)
+        columns (list, optional): Columns to read. Columns missing from the file are ignored.
+        sim_ids (list, optional): Push down simid IN (...)
+        start_date (str, optional): Push down date_col >= start_date
+        end_date (str, optional): Push down date_col <= end_date
+        in_filters (dict, optional): Extra column -> values IN filters
+        files (list, optional): Explicit list of files (from the table manifest). Overrides
+            listing `path`, which is then only used as the partition base directory.
+        partitioned (bool, optional): Whether `files` use the simid=/ym= layout
+
+    Returns:
+        pd.DataFrame or None: DataFrame with table data, or None if the file doesn't exist
+    """
+    dataset = open_dataset(filesystem, path, files=files, partitioned=partitioned)
+    if dataset is None:
+        return None
+
+    if columns is not None:
+        columns = [c for c in dataset.schema.names if c in columns]
+
+    expression = build_filter(dataset.schema, sim_ids, start_date, end_date, in_filters)
+
+    try:
+        table = dataset.to_table(columns=columns, filter=expression)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError) as e:
+        # e.g. filter values that can't be cast to the column type - read unfiltered,
+        # the caller's pandas filters still apply
+        logger.warning(f"Filter pushdown failed for {path} ({e}); reading without filter")
+        table = dataset.to_table(columns=columns)
+
+    if PARTITION_COLUMN in table.schema.names:
+        table = table.drop_columns([PARTITION_COLUMN])
+
+    return decode_bit_columns(table).to_pandas()
+
+
+def open_dataset(filesystem, path, files=None, partitioned=None):
+    """
+    Open a single-file or partitioned Parquet dataset.
+
+    Args:
+        filesystem (pyarrow.fs.FileSystem): Filesystem from get_filesystem()
+        path (str): Parquet file or dataset directory
+        files (list, optional): Explicit list of files (from the table manifest)
+        partitioned (bool, optional): Whether `files` use the simid=/ym= layout
+
+    Returns:
+        pyarrow.dataset.Dataset or None: Dataset, or None if `path` doesn't exist
+    """
+    if files is not None:
+        if not files:
+            return None
+        if partitioned:
+            return ds.dataset(files, filesystem=filesystem, format='parquet',
+                              partitioning=PARTITIONING, partition_base_dir=path)
+        return ds.dataset(files, filesystem=filesystem, format='parquet')
+
+    info = filesystem.get_file_info(path)
+    if info.type == pafs.FileType.NotFound:
+        return None
+
+    if info.type == pafs.FileType.Directory:
+        return ds.dataset(path, filesystem=filesystem, format='parquet', partitioning=PARTITIONING)
+
+    return ds.dataset(path, filesystem=filesystem, format='parquet')
+
+
+def list_files(filesystem, path, suffix, recursive=True):
+    """Files under a directory ending with `suffix`, sorted. Empty if the directory doesn't exist."""
+    if not is_partitioned(filesystem, path):
+        return []
+    selector = pafs.FileSelector(path, recursive=recursive)
+    return sorted(
+        info.path for info in filesystem.get_file_info(selector)
+        if info.type == pafs.FileType.File and info.path.endswith(suffix)
+    )
+
+
+def list_parquet_files(filesystem, path):
+    """All Parquet files under a directory (recursive), sorted."""
+    return list_files(filesystem, path, '.parquet')
+
+
+def read_schema(filesystem, path):
+    """Read the schema from a Parquet file footer (no data is read)."""
+    with filesystem.open_input_file(path) as f:
+        return pq.read_schema(f)
+
+
+def count_rows(filesystem, files):
+    """Total row count of Parquet files, from their footers (no data is read)."""
+    n_rows = 0
+    for path in files:
+        with filesystem.open_input_file(path) as f:
+            n_rows += pq.ParquetFile(f).metadata.num_rows
+    return n_rows
+
+
+def schema_hash(schema):
+    """
+    Stable hash of a table schema (column names and types, partition column excluded).
+
+    Columns are sorted by name so the hash doesn't depend on where the partitioned
+    layout puts simid.
+    """
+    fields = sorted((f.name, str(f.type)) for f in schema if f.name != PARTITION_COLUMN)
+    return hashlib.sha256(json.dumps(fields).encode('utf-8')).hexdigest()[:16]
+
+
+def column_max(filesystem, files, column):
+    """
+    Max value of a column across Parquet files, from row-group statistics.
+
+    Only the footers are read; a file's column is scanned only when its statistics
+    are missing.
+
+    Args:
+        filesystem (pyarrow.fs.FileSystem): Filesystem from get_filesystem()
+        files (list): Parquet file paths
+        column (str): Column name
+
+    Returns:
+        Max value, or None if the column is missing or empty
+    """
+    result = None
+
+    for path in files:
+        with filesystem.open_input_file(path) as f:
+            parquet_file = pq.ParquetFile(f)
+            metadata = parquet_file.metadata
+
+            if column not in metadata.schema.names:
+                continue
+            col_idx = metadata.schema.names.index(column)
+
+            file_max = None
+            for i in range(metadata.num_row_groups):
+                row_group = metadata.row_group(i)
+                if row_group.num_rows == 0:
+                    continue
+                stats = row_group.column(col_idx).statistics
+                if stats is None or not stats.has_min_max:
+                    file_max = pc.max(parquet_file.read(columns=[column]).column(column)).as_py()
+                    break
+                file_max = stats.max if file_max is None else max(file_max, stats.max)
+
+        if file_max is not None:
+            result = file_max if result is None else max(result, file_max)
+
+    return result
+
+
+# ========================================================================
+# MANIFESTS
+# ========================================================================
+
+def read_json(filesystem, path):
+    """Read a JSON document, or None if it doesn't exist."""
+    if not is_file(filesystem, path):
+        return None
+    with filesystem.open_input_stream(path) as f:
+        return json.loads(f.read().decode('utf-8'))
+
+
+def write_json(filesystem, path, obj, atomic=False):
+    """
+    Write a JSON document.
+
+    With atomic=True readers see either the old or the new document: locally the file
+    is written to a temp name and renamed; on S3 a single PUT is already atomic.
+    """
+    body = json.dumps(obj, indent=2, default=_json_default).encode('utf-8')
+    ensure_parent_dir(filesystem, path)
+
+    if atomic and isinstance(filesystem, pafs.LocalFileSystem):
+        tmp_path = f'{path}.tmp-{uuid.uuid4().hex[:8]}'
+        with filesystem.open_output_stream(tmp_path) as f:
+            f.write(body)
+        filesystem.move(tmp_path, path)
+        return
+
+    with filesystem.open_output_stream(path) as f:
+        f.write(body)
+
+
+def _json_default(o):
+    # numpy scalars (e.g. df[id_column].max()) -> Python scalars
+    if hasattr(o, 'item'):
+        return o.item()
+    return str(o)
+
+
+def ensure_parent_dir(filesystem, path):
+    """Create the parent directory of a local path before writing (no-op on S3, which has no directories)."""
+    if isinstance(filesystem, pafs.LocalFileSystem):
+        filesystem.create_dir(os.path.dirname(path), recursive=True)
+
+
+def new_part_id():
+    """Unique, time-ordered id for a new part file."""
+    return f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+# ========================================================================
+# PART FILES
+# ========================================================================
+
+def conform_to_schema(table, schema, keep_columns=()):
+    """
+    Cast and reorder a new part to the schema of the existing files.
+
+    pd.read_sql_query infers types per batch (e.g. an all-NULL column becomes null,
+    an int column with NULLs becomes double), so new parts are cast back to the
+    table's schema to keep all files readable as one dataset.
+
+    Args:
+        table (pa.Table): New rows
+        schema (pa.Schema): Schema of the existing files
+        keep_columns (list): Columns to keep even if not in `schema` (e.g. simid for partitioned files)
+
+    Returns:
+        pa.Table: Table with the columns of `schema` (missing ones null) plus `keep_columns`
+    """
+    arrays = []
+    fields = []
+
+    for field in schema:
+        if field.name in table.schema.names:
+            column = table.column(field.name)
+            if is_binary(column.type) and pa.types.is_integer(field.type):
+                # BIT bytes from pd.read_sql_query into a table stored as int8
+                column = decode_bits(column).cast(field.type)
+            elif column.type != field.type:
+                column = column.cast(field.type, safe=False)
+        else:
+            column = pa.nulls(table.num_rows, type=field.type)
+        arrays.append(column)
+        fields.append(field)
+
+    extra = [c for c in table.schema.names if c not in schema.names]
+    for name in extra:
+        if name in keep_columns:
+            arrays.append(table.column(name))
+            fields.append(table.schema.field(name))
+        else:
+            logger.warning(f"  ⚠ Column {name} is not in the existing schema, dropping it")
+
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def write_part(filesystem, path, table, compression='snappy', row_group_size=None):
+    """Write an Arrow table to a single Parquet file."""
+    ensure_parent_dir(filesystem, path)
+    with filesystem.open_output_stream(path) as f:
+        pq.write_table(table, f, compression=compression, row_group_size=row_group_size)
+
+
+def compact_files(filesystem, files, target, compression='snappy', row_group_size=COMPACT_ROW_GROUP_SIZE):
+    """
+    Merge several Parquet files into one file with large row groups.
+
+    The files are streamed batch by batch into write_table_stream, so memory is bounded
+    by the row group size, not by the size of the files. The source files are not deleted -
+    the caller swaps them out in the manifest first.
+
+    Args:
+        filesystem (pyarrow.fs.FileSystem): Filesystem from get_filesystem()
+        files (list): Files to merge (same schema, same partition)
+        target (str): Path of the merged file
+        compression (str): Compression algorithm
+        row_group_size (int): Rows per row group in the merged file
+
+    Returns:
+        int: Number of rows written
+    """
+    # Files read one after the other, batch by batch (cast to the first file's schema)
+    schema = read_schema(filesystem, files[0])
+    progress = {'rows': 0}
+
+    def tables():
+        for path in files:
+            with filesystem.open_input_file(path) as f:
+                for batch in pq.ParquetFile(f).iter_batches():
+                    progress['rows'] += batch.num_rows
+                    table = pa.Table.from_batches([batch])
+                    yield table if table.schema.equals(schema) else table.cast(schema)
+        if progress['rows'] == 0:
+            yield schema.empty_table()
+
+    write_table_stream(filesystem, target, tables(), compression=compression, row_group_size=row_group_size)
+    return progress['rows']
+
+
+# ========================================================================
+# PARTITIONED WRITES
+# ========================================================================
+
+def add_partition_columns(table):
+    """
+    Prepare an Arrow table for the partitioned layout.
+
+    Casts simid to the partition type and appends ym (YYYY-MM of the table's date
+    column; null when the table has no date column or the date is missing).
+
+    Args:
+        table (pa.Table): Table with a simid column
+
+    Returns:
+        pa.Table: Table with simid (int64) and ym (string) columns
+    """
+    simid_idx = table.schema.get_field_index('simid')
+    table = table.set_column(simid_idx, 'simid', table.column('simid').cast(pa.int64()))
+
+    date_col = get_date_column(table.schema.names)
+    if date_col is None:
+        ym = pa.nulls(table.num_rows, type=pa.string())
+    else:
+        dates = pd.to_datetime(table.column(date_col).to_pandas(), errors='coerce')
+        ym = pa.array(dates.dt.strftime('%Y-%m'), type=pa.string(), from_pandas=True)
+
+    return table.append_column(PARTITION_COLUMN, ym)
+
+
+def write_partitioned(filesystem, path, data, compression='snappy', basename_template='part-{i}.parquet',
+                      existing_data_behavior='delete_matching'):
+    """
+    Write a DataFrame/Arrow table as a hive-partitioned dataset (simid=/ym=).
+
+    Args:
+        filesystem (pyarrow.fs.FileSystem): Filesystem from get_filesystem()
+        path (str): Dataset directory (without the s3:// scheme)
+        data (pd.DataFrame or pa.Table): Rows to write
+        compression (str): Compression algorithm ('snappy', 'gzip', 'brotli')
+        basename_template (str): File name template inside each partition
+        existing_data_behavior (str): 'delete_matching' replaces the partitions being written,
+            'overwrite_or_ignore' adds files next to the existing ones
+
+    Returns:
+        list: Paths of the files written
+    """
+    table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+    table = add_partition_columns(table)
+
+    written = []
+    ds.write_dataset(
+        table,
+        path,
+        filesystem=filesystem,
+        format='parquet',
+        partitioning=PARTITIONING,
+        basename_template=basename_template,
+        existing_data_behavior=existing_data_behavior,
+        file_options=ds.ParquetFileFormat().make_write_options(compression=compression),
+        file_visitor=lambda written_file: written.append(written_file.path),
+    )
+    return sorted(written)
+
+
+def migrate_to_partitioned(filesystem, source_files, target, keep_source=False, compression='snappy'):
+    """
+    Convert a single-file table (plus any delta parts) into the partitioned layout.
+
+    The new dataset is written next to the old files and its row count verified
+    before the old files are deleted.
+
+    Args:
+        filesystem (pyarrow.fs.FileSystem): Filesystem from get_filesystem()
+        source_files (list): Current files of the table
+        target (str): Partitioned dataset directory
+        keep_source (bool): Keep the old files after migrating
+        compression (str): Compression algorithm
+
+    Returns:
+        tuple: (rows migrated, list of files written)
+    """
+    table = ds.dataset(source_files, filesystem=filesystem, format='parquet').to_table()
+
+    if is_partitioned(filesystem, target):
+        filesystem.delete_dir(target)
+    written = write_partitioned(filesystem, target, table, compression=compression)
+
+    n_written = open_dataset(filesystem, target).count_rows()
+    if n_written != table.num_rows:
+        raise RuntimeError(f"Migrated {n_written:,} rows to {target} but source has {table.num_rows:,}")
+
+    if not keep_source:
+        for path in source_files:
+            filesystem.delete_file(path)
+
+    return table.num_rows, written
+
+
+# ========================================================================
+# BIT COLUMNS
+# ========================================================================
+
+def is_binary(arrow_type):
+    """Check for a (large) binary Arrow type."""
+    return pa.types.is_binary(arrow_type) or pa.types.is_large_binary(arrow_type)
+
+
+def decode_bits(array):
+    """
+    Decode MySQL BIT(n) bytes (big-endian) to integers without a Python loop.
+
+    Works directly on the Arrow offsets/data buffers: one numpy pass per byte of
+    the widest value (one pass for BIT(1)).
+
+    Args:
+        array (pa.Array or pa.ChunkedArray): Binary values, e.g. b'\\x01' / b'\\x00'
+
+    Returns:
+        pa.Array: int8 for BIT(1) values, int64 for wider ones; nulls are kept
+    """
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks() if array.num_chunks else pa.array([], type=array.type)
+    if pa.types.is_large_binary(array.type):
+        array = array.cast(pa.binary())
+
+    n = len(array)
+    offsets = np.frombuffer(array.buffers()[1], dtype=np.int32, count=n + 1, offset=array.offset * 4) if n else np.zeros(1, np.int32)
+    data = np.frombuffer(array.buffers()[2], dtype=np.uint8) if n and array.buffers()[2] is not None else np.zeros(1, np.uint8)
+
+    starts = offsets[:-1]
+    lengths = np.diff(offsets)
+    width = int(lengths.max()) if n else 0
+
+    values = np.zeros(n, dtype=np.int64)
+    for k in range(width):
+        has_byte = lengths > k
+        byte = data[np.minimum(starts + k, len(data) - 1)]
+        values = np.where(has_byte, values * 256 + byte, values)
+
+    mask = array.is_null().to_numpy(zero_copy_only=False) if array.null_count else None
+    return pa.array(values.astype(np.int8) if width <= 1 else values, mask=mask)
+
+
+def decode_bit_columns(table, columns=BIT_COLUMNS, fill_null=0):
+    """
+    Replace BIT columns stored as bytes with int8 (files written before BIT decoding).
+
+    Args:
+        table (pa.Table): Table read from Parquet
+        columns (list): BIT column names
+        fill_null (int, optional): Value for NULL flags (None keeps them); 0 matches
+            the old per-row convert_bit()
+
+    Returns:
+        pa.Table
+    """
+    for name in columns:
+        if name not in table.schema.names:
+            continue
+        i = table.schema.get_field_index(name)
+        column = table.column(i)
+        if is_binary(column.type):
+            column = decode_bits(column)
+        elif not pa.types.is_integer(column.type) and not pa.types.is_boolean(column.type):
+            continue
+        if fill_null is not None and column.null_count:
+            column = pc.fill_null(column, fill_null)
+        table = table.set_column(i, name, column.cast(pa.int8()))
+    return table
+
+
+def decode_bit_frame(df, columns=BIT_COLUMNS):
+    """
+    In-place pandas counterpart of decode_bit_columns() (e.g. for pd.read_parquet results).
+
+    Args:
+        df (pd.DataFrame): DataFrame with BIT columns as bytes, numbers or bools
+        columns (list): BIT column names
+
+    Returns:
+        pd.DataFrame: The same DataFrame, BIT columns as int8 (NULL -> 0)
+    """
+    for name in columns:
+        if name not in df.columns or pd.api.types.is_integer_dtype(df[name]):
+            continue
+        values = df[name]
+        if values.dtype == object:
+            try:
+                decoded = decode_bits(pa.array(values, type=pa.binary(), from_pandas=True))
+                df[name] = pc.fill_null(decoded, 0).cast(pa.int8()).to_numpy(zero_copy_only=False)
+                continue
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # Mixed bytes / ints / strings
+                values = values.map(lambda x: int.from_bytes(x, 'big') if isinstance(x, bytes) else x)
+        df[name] = pd.to_numeric(values, errors='coerce').fillna(0).astype('int8')
+    return df
+
+
+# ========================================================================
+# STREAMING WRITES (BACKFILL)
+# ========================================================================
+
+# Arrow types for MySQL column types (pymysql FIELD_TYPE codes). Only used for columns
+# the first chunk can't type (all NULL), so later chunks with values still fit the schema.
+MYSQL_ARROW_TYPES = {
+    1: pa.int64(), 2: pa.int64(), 3: pa.int64(), 8: pa.int64(), 9: pa.int64(), 13: pa.int64(),  # TINY..YEAR
+    4: pa.float64(), 5: pa.float64(), 0: pa.float64(), 246: pa.float64(),                      # FLOAT/DOUBLE/DECIMAL
+    7: pa.timestamp('us'), 12: pa.timestamp('us'),                                            # TIMESTAMP/DATETIME
+    10: pa.date32(), 14: pa.date32(),                                                         # DATE
+    11: pa.duration('us'),                                                                    # TIME
+    16: pa.binary(), 249: pa.binary(), 250: pa.binary(), 251: pa.binary(), 252: pa.binary(),  # BIT/BLOB
+}
+
+# Rows buffered per row group when streaming (memory stays bounded by this, not the table size)
+STREAM_ROW_GROUP_SIZE = 100_000
+
+
+def records_to_table(rows, columns, type_codes, schema=None):
+    """
+    Convert a chunk of cursor rows to Arrow the same way pd.read_sql_query types it,
+    except that BIT columns are decoded to int8 instead of kept as bytes.
+
+    Args:
+        rows (list): Tuples from cursor.fetchmany()
+        columns (list): Column names (cursor.description)
+        type_codes (list): MySQL type codes (cursor.description)
+        schema (pa.Schema, optional): Schema fixed from the first chunk. If None, the
+            chunk's own types are used, with all-NULL columns typed from MySQL.
+
+    Returns:
+        pa.Table
+    """
+    df = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    # BIT columns -> int8 (unless resuming onto parts that stored them as bytes)
+    for i, (name, type_code) in enumerate(zip(columns, type_codes)):
+        if type_code != MYSQL_BIT_TYPE or not is_binary(table.column(i).type):
+            continue
+        if schema is not None and name in schema.names and not pa.types.is_integer(schema.field(name).type):
+            continue
+        table = table.set_column(i, name, decode_bits(table.column(i)))
+
+    if schema is not None:
+        return conform_to_schema(table, schema)
+
+    fields = []
+    for field, type_code in zip(table.schema, type_codes):
+        if pa.types.is_null(field.type):
+            field = field.with_type(pa.int8() if type_code == MYSQL_BIT_TYPE
+                                    else MYSQL_ARROW_TYPES.get(type_code, pa.string()))
+        fields.append(field)
+    return table.cast(pa.schema(fields))
+
+
+def stream_query(db_connection, query, chunksize=10000, args=None, schema=None):
+    """
+    Run a query on a server-side (unbuffered) cursor and yield Arrow tables of `chunksize` rows.
+
+    The schema is fixed from the first chunk; later chunks are cast to it. A query with
+    no rows yields one empty table so the caller can still write a file with the schema.
+
+    Args:
+        db_connection: PyMySQL connection object
+        query (str): SQL query
+        chunksize (int): Rows per chunk
+        args (tuple, optional): Query parameters
+        schema (pa.Schema, optional): Schema to cast every chunk to (e.g. of the parts already
+            written when resuming); defaults to the first chunk's schema
+
+    Yields:
+        pa.Table
+    """
+    cursor = db_connection.cursor(pymysql.cursors.SSCursor)
+    try:
+        cursor.execute(query, args)
+        columns = [d[0] for d in cursor.description]
+        type_codes = [d[1] for d in cursor.description]
+
+        n_chunks = 0
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            if not rows:
+                break
+            table = records_to_table(rows, columns, type_codes, schema)
+            schema = table.schema
+            n_chunks += 1
+            yield table
+
+        if n_chunks == 0:
+            yield records_to_table([], columns, type_codes, schema)
+    finally:
+        # Drains any unread rows so the connection can be reused
+        cursor.close()
+
+
+def write_table_stream(filesystem, path, tables, partitioned=False, compression='snappy',
+                       row_group_size=STREAM_ROW_GROUP_SIZE, basename_template='part-{i}.parquet',
+                       existing_data_behavior='delete_matching'):
+    """
+    Write an iterator of Arrow tables (same schema) without holding the whole table in memory.
+
+    Single-file tables go through a pyarrow.parquet.ParquetWriter, buffering up to
+    `row_group_size` rows per row group; partitioned tables are streamed through
+    pyarrow.dataset.write_dataset.
+
+    Args:
+        filesystem (pyarrow.fs.FileSystem): Filesystem from get_filesystem()
+        path (str): Parquet file, or dataset directory when partitioned
+        tables (iterator): pa.Table chunks, e.g. from stream_query()
+        partitioned (bool): Write the simid=/ym= layout
+        compression (str): Compression algorithm
+        row_group_size (int): Rows per row group
+        basename_template (str): File name template inside each partition (partitioned only)
+        existing_data_behavior (str): What to do with files already in the partitions (partitioned only)
+
+    Returns:
+        list: Paths of the files written
+    """
+    tables = iter(tables)
+    first = next(tables)
+
+    if partitioned:
+        first = add_partition_columns(first)
+        schema = first.schema
+
+        def batches():
+            yield from first.to_batches()
+            for table in tables:
+                yield from add_partition_columns(table).cast(schema).to_batches()
+
+        written = []
+        ds.write_dataset(
+            pa.RecordBatchReader.from_batches(schema, batches()),
+            path,
+            filesystem=filesystem,
+            format='parquet',
+            partitioning=PARTITIONING,
+            basename_template=basename_template,
+            existing_data_behavior=existing_data_behavior,
+            min_rows_per_group=row_group_size,
+            max_rows_per_group=max(row_group_size, COMPACT_ROW_GROUP_SIZE),
+            file_options=ds.ParquetFileFormat().make_write_options(compression=compression),
+            file_visitor=lambda written_file: written.append(written_file.path),
+        )
+        return sorted(written)
+
+    ensure_parent_dir(filesystem, path)
+    with filesystem.open_output_stream(path) as f:
+        with pq.ParquetWriter(f, first.schema, compression=compression) as writer:
+            buffer = [first]
+            buffered_rows = first.num_rows
+
+            for table in tables:
+                buffer.append(table)
+                buffered_rows += table.num_rows
+                if buffered_rows >= row_group_size:
+                    writer.write_table(pa.concat_tables(buffer), row_group_size=row_group_size)
+                    buffer, buffered_rows = [], 0
+
+            if buffer:
+                writer.write_table(pa.concat_tables(buffer), row_group_size=row_group_size)
+
+    return [path]
+
+
+# ========================================================================
+# TABLE FILES (MANIFEST, DELTA PARTS, COMPACTION)
+# ========================================================================
+
+class LakeTables:
+    """
+    Manifests, delta part files and compaction of the raw tables of one customer.
+
+    Both ParquetPipeline classes hold one (pipeline.tables) and delegate to it.
+
+    Example:
+        >>> tables = LakeTables(fs, root, 'raw_tables/mckinsey/', 'metadata/mckinsey/')
+        >>> tables.append_part(df_new, 'user_sim_log', id_column='logid')
+    """
+
+    def __init__(self, filesystem, lake_root, raw_tables_prefix, metadata_prefix):
+        """
+        Args:
+            filesystem (pyarrow.fs.FileSystem): Filesystem from get_filesystem()
+            lake_root (str): Bucket or local_data_dir, as returned by get_filesystem()
+            raw_tables_prefix (str): Prefix of the raw tables (e.g., 'raw_tables/mckinsey/')
+            metadata_prefix (str): Prefix of the manifests (e.g., 'metadata/mckinsey/')
+        """
+        self.fs = filesystem
+        self.lake_root = lake_root
+        self.raw_tables_prefix = raw_tables_prefix
+        self.metadata_prefix = metadata_prefix
+
+    def get_lake_path(self, relative_path):
+        """Full lake path (bucket or local_data_dir) of a path relative to the raw tables prefix."""
+        return f'{self.lake_root}/{self.raw_tables_prefix}{relative_path}'
+
+    def get_relative_path(self, lake_path):
+        """Path relative to the raw tables prefix, as stored in the manifest."""
+        return lake_path[len(f'{self.lake_root}/{self.raw_tables_prefix}'):]
+
+    def get_manifest_path(self, table_name):
+        """Lake path of the table manifest (metadata/{customer}/{table}_manifest.json)."""
+        return f'{self.lake_root}/{self.metadata_prefix}{table_name}_manifest.json'
+
+    def read_manifest(self, table_name):
+        """
+        Read the table manifest listing the live Parquet files of a table.
+
+        Args:
+            table_name (str): Table name (e.g., 'user_sim_log')
+
+        Returns:
+            dict or None: Manifest, or None if the table has none yet
+        """
+        try:
+            return read_json(self.fs, self.get_manifest_path(table_name))
+        except Exception as e:
+            logger.error(f"Error reading manifest for {table_name}: {e}")
+            return None
+
+    def write_manifest(self, table_name, files, partitioned, previous=None, **stats):
+        """
+        Write the table manifest (atomically - readers never see a partial file).
+
+        Besides the file list the manifest holds the table's high-water marks, so
+        incremental runs don't have to read the Parquet data:
+            row_count, id_column, max_id, schema_hash
+        and the checkpoint of a keyset backfill:
+            backfill_last_key, backfill_complete
+
+        Args:
+            table_name (str): Table name
+            files (list): Live files, relative to the raw tables prefix
+            partitioned (bool): Whether the files use the simid=/ym= layout
+            previous (dict, optional): Previous manifest - stats not passed are carried over
+            **stats: row_count, id_column, max_id, schema_hash, backfill_last_key, backfill_complete
+
+        Returns:
+            dict: The manifest written
+        """
+        manifest = {
+            'table': table_name,
+            'partitioned': partitioned,
+            'row_count': None,
+            'id_column': None,
+            'max_id': None,
+            'schema_hash': None,
+            'backfill_last_key': None,
+            'backfill_complete': None,
+        }
+        manifest.update({k: v for k, v in (previous or {}).items() if k in manifest and k != 'partitioned'})
+        manifest.update(stats)
+        manifest['files'] = list(files)
+        manifest['updated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        write_json(self.fs, self.get_manifest_path(table_name), manifest, atomic=True)
+        return manifest
+
+    def get_table_files(self, table_name):
+        """
+        Get the manifest of a table, creating it from the files on disk for tables
+        written before manifests existed.
+
+        Args:
+            table_name (str): Table name
+
+        Returns:
+            dict or None: Manifest, or None if the table doesn't exist
+        """
+        manifest = self.read_manifest(table_name)
+        if manifest is not None:
+            return manifest
+
+        files, partitioned = self.discover_table_files(table_name)
+        if files is None:
+            return None
+
+        # One-off: row count and schema from the footers (no data read)
+        dataset = open_dataset(self.fs, partitioned_path(self.lake_root, self.raw_tables_prefix, table_name),
+                                    files=files, partitioned=partitioned)
+
+        logger.info(f"Creating manifest for {table_name} ({len(files)} files)")
+        return self.write_manifest(
+            table_name,
+            [self.get_relative_path(f) for f in files],
+            partitioned,
+            row_count=count_rows(self.fs, files),
+            schema_hash=schema_hash(dataset.schema)
+        )
+
+    def discover_table_files(self, table_name):
+        """
+        List the files of a table from the layout on disk (used when there is no manifest).
+
+        Args:
+            table_name (str): Table name
+
+        Returns:
+            tuple: (list of lake paths or None if the table doesn't exist, partitioned flag)
+        """
+        path = resolve_table_path(self.fs, self.lake_root, self.raw_tables_prefix, table_name)
+
+        if path is not None and is_partitioned(self.fs, path):
+            return list_parquet_files(self.fs, path), True
+
+        files = [path] if path is not None else []
+        files += list_parquet_files(self.fs, parts_path(self.lake_root, self.raw_tables_prefix, table_name))
+
+        return (files or None), False
+
+    def reset_table_files(self, table_name, files, partitioned, df=None, row_count=None, schema=None,
+                          delete_parts=True, keep_max_id=False):
+        """
+        Point the manifest at a freshly (re)written table and drop its old delta parts.
+
+        The max_id watermark is recomputed from the new data (df, or the footers of the
+        files), never carried over: a full rewrite may hold rows past the old watermark.
+
+        Args:
+            table_name (str): Table name
+            files (list): Lake paths of the files now holding the full table
+            partitioned (bool): Whether the files use the simid=/ym= layout
+            df (pd.DataFrame, optional): The data written - row count, max id and schema hash are taken from it
+            row_count (int, optional): Row count when df is not available (other stats are carried over)
+            schema (pa.Schema, optional): Schema when df is not available
+            delete_parts (bool): Delete the {table}_parts/ directory of single-file tables
+            keep_max_id (bool): Keep the previous max_id - only when the files hold exactly the
+                previous rows (e.g. a layout migration)
+        """
+        previous = self.read_manifest(table_name)
+        id_column = (previous or {}).get('id_column')
+        stats = {}
+
+        if df is not None:
+            stats['row_count'] = len(df)
+            stats['schema_hash'] = schema_hash(pa.Schema.from_pandas(df, preserve_index=False))
+        else:
+            if row_count is not None:
+                stats['row_count'] = row_count
+            if schema is not None:
+                stats['schema_hash'] = schema_hash(schema)
+
+        if not keep_max_id:
+            if id_column is None:
+                stats['max_id'] = None
+            elif df is not None:
+                stats['max_id'] = df[id_column].max() if id_column in df.columns and len(df) else None
+            else:
+                # From the row-group statistics of the new files (footers only)
+                stats['max_id'] = column_max(self.fs, files, id_column)
+
+        self.write_manifest(table_name, [self.get_relative_path(f) for f in files], partitioned,
+                            previous=previous, **stats)
+
+        parts = parts_path(self.lake_root, self.raw_tables_prefix, table_name)
+        if delete_parts and is_partitioned(self.fs, parts):
+            self.fs.delete_dir(parts)
+
+    def append_part(self, df, table_name, compression='snappy', id_column=None):
+        """
+        Append new rows as a new part file instead of rewriting the table.
+
+        Cost is O(new rows): only the schema footer of one existing file is read.
+        Partitioned tables get one part per touched partition; single-file tables
+        get {table}_parts/part-<id>.parquet.
+
+        Args:
+            df (pd.DataFrame): New rows
+            table_name (str): Table name (e.g., 'user_sim_log')
+            compression (str): Compression algorithm ('snappy', 'gzip', 'brotli')
+            id_column (str, optional): Primary key column whose max is tracked in the manifest
+                (defaults to the manifest's id_column)
+
+        Returns:
+            list or None: Lake paths of the part files written, or None if the table doesn't exist
+        """
+        manifest = self.get_table_files(table_name)
+        if manifest is None:
+            return None
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if manifest['files']:
+            existing_schema = read_schema(self.fs, self.get_lake_path(manifest['files'][0]))
+            keep_columns = ['simid'] if manifest['partitioned'] else []
+            table = conform_to_schema(table, existing_schema, keep_columns=keep_columns)
+
+        part_id = new_part_id()
+        if manifest['partitioned']:
+            written = write_partitioned(
+                self.fs,
+                partitioned_path(self.lake_root, self.raw_tables_prefix, table_name),
+                table,
+                compression=compression,
+                basename_template=f'part-{part_id}-{{i}}.parquet',
+                existing_data_behavior='overwrite_or_ignore'
+            )
+        else:
+            path = f'{parts_path(self.lake_root, self.raw_tables_prefix, table_name)}/part-{part_id}.parquet'
+            write_part(self.fs, path, table, compression=compression)
+            written = [path]
+
+        # Advance the high-water marks
+        stats = {}
+        id_column = id_column or manifest.get('id_column')
+        if id_column in df.columns and len(df):
+            new_max = df[id_column].max()
+            old_max = manifest.get('max_id') if manifest.get('id_column') == id_column else None
+            stats['id_column'] = id_column
+            stats['max_id'] = new_max if old_max is None else max(old_max, new_max)
+        if manifest.get('row_count') is not None:
+            stats['row_count'] = manifest['row_count'] + len(df)
+
+        self.write_manifest(
+            table_name,
+            manifest['files'] + [self.get_relative_path(f) for f in written],
+            manifest['partitioned'],
+            previous=manifest,
+            **stats
+        )
+
+        logger.info(f"✓ Appended {len(df):,} rows to {table_name} as {len(written)} part file(s)")
+        return written
+
+    def compact(self, table_name, compression='snappy', row_group_size=COMPACT_ROW_GROUP_SIZE,
+                max_file_rows=COMPACT_MAX_FILE_ROWS):
+        """
+        Merge the small part files of a table into large row groups.
+
+        Partitioned tables are compacted per partition; the {table}_parts/ files of single-file
+        tables into one part. The base {table}.parquet and any file with max_file_rows rows or
+        more are left as they are, so the cost follows the recent parts, not the table's size.
+        The manifest is switched to the merged files before the old files are deleted.
+
+        Args:
+            table_name (str): Table name (e.g., 'user_sim_log')
+            compression (str): Compression algorithm ('snappy', 'gzip', 'brotli')
+            row_group_size (int): Rows per row group in the merged files
+            max_file_rows (int): Files with at least this many rows are not merged
+
+        Returns:
+            int: Number of files merged away (0 if nothing to compact)
+        """
+        manifest = self.read_manifest(table_name)
+
+        if manifest is None or len(manifest['files']) <= 1:
+            logger.info(f"✓ {table_name}: nothing to compact")
+            return 0
+
+        # Group the small files that can be merged together (same partition directory);
+        # the base file of a single-file table and large files stay as they are
+        base_file = self.get_relative_path(table_path(self.lake_root, self.raw_tables_prefix, table_name))
+        groups = {}
+        files = []
+        for f in manifest['files']:
+            if (not manifest['partitioned'] and f == base_file) or \
+                    count_rows(self.fs, [self.get_lake_path(f)]) >= max_file_rows:
+                files.append(f)
+                continue
+            key = os.path.dirname(f) if manifest['partitioned'] else table_name
+            groups.setdefault(key, []).append(f)
+
+        part_id = new_part_id()
+        replaced = []
+
+        for key, group_files in groups.items():
+            if len(group_files) <= 1:
+                files.extend(group_files)
+                continue
+
+            if manifest['partitioned']:
+                target = self.get_lake_path(f'{key}/part-{part_id}.parquet')
+            else:
+                target = f'{parts_path(self.lake_root, self.raw_tables_prefix, table_name)}/part-{part_id}.parquet'
+
+            n_rows = compact_files(
+                self.fs,
+                [self.get_lake_path(f) for f in group_files],
+                target,
+                compression=compression,
+                row_group_size=row_group_size
+            )
+            logger.info(f"  Merged {len(group_files)} files ({n_rows:,} rows) -> {target}")
+
+            files.append(self.get_relative_path(target))
+            replaced.extend(group_files)
+
+        if not replaced:
+            logger.info(f"✓ {table_name}: nothing to compact")
+            return 0
+
+        # Switch readers to the merged files, then remove the old ones
+        self.write_manifest(table_name, sorted(files), manifest['partitioned'], previous=manifest)
+        for f in replaced:
+            self.fs.delete_file(self.get_lake_path(f))
+
+        logger.info(f"✓ Compacted {table_name}: {len(manifest['files'])} -> {len(files)} files")
+        return len(manifest['files']) - len(files)
+
+    def backfill_keyset(self, table_name, db_connection, id_column, partitioned, where_clause=None,
+                        page_size=500000, chunksize=10000):
+        """
+        Copy a table in primary-key order, one page per part file, checkpointing the manifest after each page.
+
+        Each page is `SELECT * ... WHERE pk > last ORDER BY pk LIMIT page_size`, streamed into its
+        own part file. After each part is written the manifest records the last committed key, so a
+        run that dies is continued after that key by the next call instead of starting over.
+
+        Args:
+            table_name (str): Table name (e.g., 'user_sim_log')
+            db_connection: PyMySQL connection object
+            id_column (str): Primary key column
+            partitioned (bool): Write the parts in the simid=/ym= layout
+            where_clause (str, optional): SQL WHERE clause to filter data (e.g., "WHERE simid IN (55, 57)")
+            page_size (int): Rows per page / part file
+            chunksize (int): Rows fetched from MySQL at a time within a page
+
+        Returns:
+            dict: The final manifest (backfill_complete=True)
+        """
+        dataset_path = partitioned_path(self.lake_root, self.raw_tables_prefix, table_name)
+        parts = parts_path(self.lake_root, self.raw_tables_prefix, table_name)
+        single_file = table_path(self.lake_root, self.raw_tables_prefix, table_name)
+
+        manifest = self.read_manifest(table_name)
+        resuming = (
+            manifest is not None
+            and manifest.get('backfill_complete') is False
+            and manifest.get('id_column') == id_column
+            and manifest.get('partitioned') == partitioned
+        )
+
+        if resuming:
+            last_key = manifest['backfill_last_key']
+            logger.info(f"Resuming after {id_column} = {last_key} ({manifest['row_count'] or 0:,} rows already copied)")
+        else:
+            # Fresh start - drop whatever a previous backfill left behind
+            for path in [dataset_path, parts]:
+                if is_partitioned(self.fs, path):
+                    self.fs.delete_dir(path)
+            if is_file(self.fs, single_file):
+                self.fs.delete_file(single_file)
+
+            last_key = None
+            manifest = self.write_manifest(
+                table_name, [], partitioned,
+                row_count=0, id_column=id_column, max_id=None,
+                backfill_last_key=None, backfill_complete=False
+            )
+
+        # Later pages are cast to the schema of the parts already written
+        schema = None
+        if manifest['files']:
+            schema = open_dataset(self.fs, dataset_path, files=[self.get_lake_path(f) for f in manifest['files']],
+                                       partitioned=partitioned).schema
+            if PARTITION_COLUMN in schema.names:
+                schema = schema.remove(schema.get_field_index(PARTITION_COLUMN))
+
+        condition = None
+        if where_clause:
+            condition = where_clause.strip()
+            if condition.upper().startswith('WHERE'):
+                condition = condition[len('WHERE'):].strip()
+
+        start_time = time.time()
+        rows_copied = 0
+
+        while True:
+            conditions = [f"({condition})"] if condition else []
+            if last_key is not None:
+                conditions.append(f"{id_column} > %s")
+            query = f"SELECT * FROM {table_name}"
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            query += f" ORDER BY {id_column} LIMIT {int(page_size)}"
+            args = (last_key,) if last_key is not None else None
+
+            logger.info(f"Query: {query} {args or ''}")
+
+            page = {'rows': 0, 'last_key': None}
+
+            def chunks():
+                for table in stream_query(db_connection, query, chunksize=chunksize, args=args, schema=schema):
+                    if table.num_rows:
+                        page['rows'] += table.num_rows
+                        page['last_key'] = table.column(id_column)[-1].as_py()
+                    yield table
+
+            stream = chunks()
+            first = next(stream)
+            if first.num_rows == 0:
+                break
+
+            def page_chunks():
+                yield first
+                yield from stream
+
+            # 1. Flush the page as its own part file
+            part_id = new_part_id()
+            if partitioned:
+                written = write_table_stream(
+                    self.fs, dataset_path, page_chunks(), partitioned=True,
+                    basename_template=f'part-{part_id}-{{i}}.parquet',
+                    existing_data_behavior='overwrite_or_ignore'
+                )
+            else:
+                written = write_table_stream(self.fs, f'{parts}/part-{part_id}.parquet', page_chunks())
+
+            schema = schema or first.schema
+            last_key = page['last_key']
+            rows_copied += page['rows']
+
+            # 2. Checkpoint the last committed key
+            manifest = self.write_manifest(
+                table_name,
+                manifest['files'] + [self.get_relative_path(f) for f in written],
+                partitioned,
+                previous=manifest,
+                row_count=(manifest['row_count'] or 0) + page['rows'],
+                max_id=last_key,
+                schema_hash=schema_hash(schema),
+                backfill_last_key=last_key
+            )
+
+            elapsed = max(time.time() - start_time, 1e-9)
+            logger.info(f"  ✓ Part {len(manifest['files'])}: {page['rows']:,} rows up to {id_column} = {last_key} "
+                        f"({rows_copied:,} rows this run, {rows_copied / elapsed:,.0f} rows/s)")
+
+            if page['rows'] < page_size:
+                break
+
+        return self.write_manifest(table_name, manifest['files'], partitioned,
+                                   previous=manifest, backfill_complete=True)
+
+    def get_backfill_checkpoint(self, table_name):
+        """
+        Get the checkpoint of an unfinished keyset backfill.
+
+        Args:
+            table_name (str): Table name
+
+        Returns:
+            Last committed key, or None if no keyset backfill of the table is in progress
+        """
+        manifest = self.read_manifest(table_name)
+        if manifest is None or manifest.get('backfill_complete') is not False:
+            return None
+        return manifest.get('backfill_last_key')
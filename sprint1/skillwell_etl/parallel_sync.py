@@ -0,0 +1,189 @@
+"""
+Parallel Table Sync for ETU Applied Sciences
+============================================
+
+Runs a per-table sync task (backfill or incremental update) over a bounded pool
+of worker threads. Each worker opens its own pymysql connection (through the
+caller's SSH tunnel) and reuses it for every table it picks up, so MySQL and S3
+waits of different tables overlap instead of running one table at a time.
+
+Tables are submitted largest first (by information_schema size) so the long
+tables start immediately and the small ones fill in the gaps.
+
+Example:
+    >>> tables = order_tables_by_size(db_connection, list(db_primary_keys))
+    >>> results = run_tables_parallel(tables, update_table, connect, workers=4)
+    >>> log_sync_summary(results)
+
+Author: ETU Applied Sciences
+Date: 2025-11-20
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+logger = logging.getLogger('ParallelSync')
+
+
+def get_table_sizes(db_connection, tables):
+    """
+    Get the on-disk size of tables from information_schema (no table scan).
+
+    Args:
+        db_connection: PyMySQL connection object
+        tables (list): Table names
+
+    Returns:
+        dict: table_name -> (approximate rows, data + index bytes)
+    """
+    placeholders = ', '.join(['%s'] * len(tables))
+    query = f"""
+        SELECT table_name, table_rows, data_length + index_length
+        FROM information_schema.tables
+        WHERE table_schema = DATABASE()
+          AND table_name IN ({placeholders})
+    """
+
+    with db_connection.cursor() as cursor:
+        cursor.execute(query, list(tables))
+        return {name: (rows or 0, size or 0) for name, rows, size in cursor.fetchall()}
+
+
+def order_tables_by_size(db_connection, tables):
+    """
+    Order tables from largest to smallest so the longest syncs start first.
+
+    Tables missing from information_schema keep their relative order at the end.
+    Falls back to the given order if the sizes can't be read.
+
+    Args:
+        db_connection: PyMySQL connection object
+        tables (list): Table names
+
+    Returns:
+        list: Table names, largest first
+    """
+    try:
+        sizes = get_table_sizes(db_connection, tables)
+    except Exception as e:
+        logger.warning(f"Could not read table sizes ({e}); keeping the default order")
+        return list(tables)
+
+    ordered = sorted(tables, key=lambda t: sizes.get(t, (0, -1))[1], reverse=True)
+
+    for table in ordered:
+        rows, size = sizes.get(table, (None, None))
+        if size is not None:
+            logger.info(f"  {table:<22} ~{rows:>12,} rows  {size / 1024**2:>10,.1f} MB")
+
+    return ordered
+
+
+def run_tables_parallel(tables, task, connect, workers=4):
+    """
+    Run `task(table_name, db_connection)` for every table on a bounded thread pool.
+
+    Each worker thread opens one connection with `connect()` on its first table and
+    reuses it; all connections are closed when the pool is done. A failing table
+    doesn't stop the others - its error is recorded in the results.
+
+    Args:
+        tables (list): Table names, in submission order (see order_tables_by_size)
+        task (callable): task(table_name, db_connection) -> result (new rows DataFrame or row count)
+        connect (callable): Returns a new pymysql connection (e.g. through the SSH tunnel)
+        workers (int): Number of worker threads / concurrent MySQL connections
+
+    Returns:
+        dict: table_name -> {'status': 'ok'|'failed', 'seconds': float, 'rows': int or None,
+                             'result': task result, 'error': str or None}, in `tables` order
+    """
+    workers = max(1, min(workers, len(tables))) if tables else 1
+    local = threading.local()
+    connections = []
+    connections_lock = threading.Lock()
+
+    def get_connection():
+        if getattr(local, 'db_connection', None) is None:
+            local.db_connection = connect()
+            with connections_lock:
+                connections.append(local.db_connection)
+        return local.db_connection
+
+    def run_one(table):
+        start = time.time()
+        try:
+            result = task(table, get_connection())
+            if isinstance(result, pd.DataFrame):
+                rows = len(result)
+            elif isinstance(result, int):
+                rows = result
+            else:
+                rows = None
+            return {'status': 'ok', 'seconds': time.time() - start, 'rows': rows, 'result': result, 'error': None}
+        except Exception as e:
+            logger.error(f"Failed to sync {table}: {e}")
+            # Drop the connection - it may be mid-result or broken
+            _close_quietly(getattr(local, 'db_connection', None))
+            local.db_connection = None
+            return {'status': 'failed', 'seconds': time.time() - start, 'rows': None, 'result': None, 'error': str(e)}
+
+    logger.info(f"Syncing {len(tables)} tables with {workers} worker(s)")
+
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sync') as executor:
+            futures = {executor.submit(run_one, table): table for table in tables}
+            for future in as_completed(futures):
+                table = futures[future]
+                results[table] = future.result()
+                status = '✓' if results[table]['status'] == 'ok' else '✗'
+                logger.info(f"{status} {table} finished in {results[table]['seconds']:.1f}s")
+    finally:
+        for db_connection in connections:
+            _close_quietly(db_connection)
+
+    return {table: results[table] for table in tables}
+
+
+def log_sync_summary(results, title='SYNC SUMMARY'):
+    """
+    Log one line per table (status, rows, time) and the overall counts.
+
+    Args:
+        results (dict): Output of run_tables_parallel()
+        title (str): Header line
+
+    Returns:
+        list: Names of the tables that failed
+    """
+    failed = [table for table, r in results.items() if r['status'] != 'ok']
+
+    logger.info(f"\n{'='*60}")
+    logger.info(title)
+    logger.info(f"{'='*60}")
+
+    for table, r in results.items():
+        rows = f"{r['rows']:,} rows" if r['rows'] is not None else '-'
+        if r['status'] == 'ok':
+            logger.info(f"  ✓ {table:<22} {rows:>16}  {r['seconds']:>8.1f}s")
+        else:
+            logger.error(f"  ✗ {table:<22} {'FAILED':>16}  {r['seconds']:>8.1f}s  {r['error']}")
+
+    logger.info(f"{'='*60}")
+    logger.info(f"{len(results) - len(failed)} succeeded, {len(failed)} failed")
+    logger.info(f"{'='*60}\n")
+
+    return failed
+
+
+def _close_quietly(db_connection):
+    if db_connection is None:
+        return
+    try:
+        db_connection.close()
+    except Exception:
+        pass
@@ -25,6 +25,13 @@ import pyarrow.parquet as pq
 import pyarrow as pa
 from io import BytesIO
 import logging
+import time
+import os
+
+if __package__:
+    from . import lake
+else:
+    import lake  # Running as a script (python parquet_pipeline.py ...)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -48,7 +55,7 @@ class ParquetPipeline:
         >>> data = pipeline.load_raw_data_for_analysis(sim_ids=[55, 57])
     """
 
-    def __init__(self, s3_bucket, customer, s3_client=None):
+    def __init__(self, s3_bucket, customer, s3_client=None, partitioned=False):
         """
         Initialize the Parquet Pipeline.
 
@@ -56,9 +63,12 @@ class ParquetPipeline:
             s3_bucket (str): S3 bucket name (e.g., 'etu-data-lake')
             customer (str): Customer identifier (e.g., 'mckinsey')
             s3_client (boto3.client, optional): Boto3 S3 client. Creates new if None.
+            partitioned (bool): Write event tables (lake.PARTITIONED_TABLES) in the
+                                hive-partitioned simid=/ym= layout.
         """
         self.s3_bucket = s3_bucket
         self.customer = customer
+        self.partitioned = partitioned
         self.s3 = s3_client or boto3.client('s3')
 
         # Define raw tables path
@@ -70,6 +80,12 @@ class ParquetPipeline:
         logger.info(f"  S3 Bucket: {s3_bucket}")
         logger.info(f"  Raw tables path: s3://{s3_bucket}/{self.raw_tables_prefix}")
 
+        # pyarrow filesystem used for dataset reads (predicate/column pushdown)
+        self.fs, self.lake_root = lake.get_filesystem(s3_bucket, s3_region=self.s3.meta.region_name)
+
+        # Manifests, delta part files and compaction of the raw tables
+        self.tables = lake.LakeTables(self.fs, self.lake_root, self.raw_tables_prefix, self.metadata_prefix)
+
     # ========================================================================
     # METADATA MANAGEMENT
     # ========================================================================
@@ -118,7 +134,7 @@ class ParquetPipeline:
         except Exception as e:
             logger.error(f"Error updating metadata for {table_name}: {e}")
 
-    def generate_and_save_schema(self, df, table_name, layer='raw'):
+    def generate_and_save_schema(self, df, table_name, layer='raw', nullable=None):
         """
         Generate a JSON schema from a DataFrame and save to S3.
 
@@ -126,6 +142,8 @@ class ParquetPipeline:
             df (pd.DataFrame): DataFrame to analyze
             table_name (str): Table name
             layer (str): 'raw' or 'gold' (default: 'raw')
+            nullable (dict, optional): column -> has nulls, when df is only a sample
+                (e.g. the empty frame of a streamed backfill)
         """
         try:
             schema_data = {
@@ -144,7 +162,7 @@ class ParquetPipeline:
                 col_info = {
                     "name": col,
                     "type": dtype,
-                    "nullable": bool(df[col].isna().any())
+                    "nullable": bool(nullable[col]) if nullable and col in nullable else bool(df[col].isna().any())
                 }
                 schema_data["columns"].append(col_info)
 
@@ -216,6 +234,12 @@ class ParquetPipeline:
         Returns:
             pd.DataFrame or None: DataFrame with table data, or None if file doesn't exist
         """
+        # Partitioned tables and tables with delta parts span several files - read them as a dataset
+        parts = lake.parts_path(self.lake_root, self.raw_tables_prefix, table_name)
+        if (self.is_partitioned_table(table_name) or lake.is_partitioned(self.fs, parts)
+                or self.read_manifest(table_name) is not None):
+            return self.read_parquet_dataset(table_name)
+
         s3_key = f'{self.raw_tables_prefix}{table_name}.parquet'
 
         try:
@@ -224,6 +248,7 @@ class ParquetPipeline:
             # Read directly from S3 using pandas
             s3_path = f's3://{self.s3_bucket}/{s3_key}'
             df = pd.read_parquet(s3_path, engine='pyarrow')
+            lake.decode_bit_frame(df)
 
             logger.info(f"✓ Loaded {len(df):,} rows from {table_name}")
             return df
@@ -235,6 +260,62 @@ class ParquetPipeline:
             logger.error(f"Error reading {table_name} from S3: {e}")
             return None
 
+    def read_parquet_dataset(self, table_name, columns=None, sim_ids=None, start_date=None,
+                             end_date=None, in_filters=None):
+        """
+        Read a Parquet table as a pyarrow dataset, pushing filters down to row-group statistics.
+
+        Only the row groups that can match simid IN (sim_ids) / the date range and only the
+        requested columns are read, from S3 or from local_data_dir.
+
+        Args:
+            table_name (str): Table name (e.g., 'user_sim_log')
+            columns (list, optional): Columns to read (None reads all columns)
+            sim_ids (list, optional): Filter by simulation IDs
+            start_date (str, optional): Filter start date (YYYY-MM-DD)
+            end_date (str, optional): Filter end date (YYYY-MM-DD)
+            in_filters (dict, optional): Extra column -> values IN filters (e.g. {'questionid': [1, 2]})
+
+        Returns:
+            pd.DataFrame or None: DataFrame with table data, or None if file doesn't exist
+        """
+        # The manifest lists the live files (base + delta parts); fall back to the layout on disk
+        manifest = self.read_manifest(table_name)
+        if manifest is not None:
+            path = lake.partitioned_path(self.lake_root, self.raw_tables_prefix, table_name)
+            files = [self.get_lake_path(f) for f in manifest['files']]
+            partitioned = manifest['partitioned']
+        else:
+            files, partitioned = self.discover_table_files(table_name)
+            if partitioned:
+                path = lake.partitioned_path(self.lake_root, self.raw_tables_prefix, table_name)
+            else:
+                path = lake.table_path(self.lake_root, self.raw_tables_prefix, table_name)
+
+        try:
+            logger.info(f"Reading {table_name} dataset: {path}")
+            df = lake.read_table(
+                self.fs, path,
+                columns=columns,
+                sim_ids=sim_ids,
+                start_date=start_date,
+                end_date=end_date,
+                in_filters=in_filters,
+                files=files,
+                partitioned=partitioned
+            )
+
+            if df is None:
+                logger.warning(f"File not found: {path} (first run?)")
+                return None
+
+            logger.info(f"✓ Loaded {len(df):,} rows from {table_name}")
+            return df
+
+        except Exception as e:
+            logger.error(f"Error reading {table_name} dataset: {e}")
+            return None
+
     def write_parquet_to_s3(self, df, table_name, compression='snappy'):
         """
         Write a DataFrame to S3 as Parquet.
@@ -244,6 +325,10 @@ class ParquetPipeline:
             table_name (str): Table name (e.g., 'user_sim_log')
             compression (str): Compression algorithm ('snappy', 'gzip', 'brotli')
         """
+        if self.is_partitioned_table(table_name, for_write=True):
+            self.write_partitioned_table(df, table_name, compression=compression)
+            return
+
         s3_key = f'{self.raw_tables_prefix}{table_name}.parquet'
         s3_path = f's3://{self.s3_bucket}/{s3_key}'
 
@@ -257,6 +342,8 @@ class ParquetPipeline:
                 compression=compression,
                 index=False
             )
+
+            self.reset_table_files(table_name, [lake.table_path(self.lake_root, self.raw_tables_prefix, table_name)], partitioned=False, df=df)
             
             # Generate and save schema
             self.generate_and_save_schema(df, table_name, layer='raw')
@@ -267,6 +354,183 @@ class ParquetPipeline:
             logger.error(f"Error writing {table_name} to S3: {e}")
             raise
 
+    def is_partitioned_table(self, table_name, for_write=False):
+        """
+        Check whether a table is stored (or, for writes, should be stored) in the partitioned layout.
+
+        Args:
+            table_name (str): Table name (e.g., 'user_sim_log')
+            for_write (bool): Also return True for event tables when the pipeline was
+                created with partitioned=True
+
+        Returns:
+            bool: True if the table uses the simid=/ym= layout
+        """
+        if table_name not in lake.PARTITIONED_TABLES:
+            return False
+        if for_write and self.partitioned:
+            return True
+        return lake.is_partitioned(self.fs, lake.partitioned_path(self.lake_root, self.raw_tables_prefix, table_name))
+
+    def write_partitioned_table(self, df, table_name, compression='snappy'):
+        """
+        Write a full table in the partitioned layout (simid=/ym=), replacing any previous version.
+
+        Args:
+            df (pd.DataFrame): DataFrame to save
+            table_name (str): Table name (e.g., 'user_sim_log')
+            compression (str): Compression algorithm ('snappy', 'gzip', 'brotli')
+        """
+        path = lake.partitioned_path(self.lake_root, self.raw_tables_prefix, table_name)
+        single_file = lake.table_path(self.lake_root, self.raw_tables_prefix, table_name)
+
+        try:
+            logger.info(f"Writing {len(df):,} rows to {table_name} (partitioned)...")
+
+            # Full rewrite - drop partitions that are no longer in df
+            if lake.is_partitioned(self.fs, path):
+                self.fs.delete_dir(path)
+
+            written = lake.write_partitioned(self.fs, path, df, compression=compression)
+
+            # The single file is superseded by the partitioned layout
+            if lake.is_file(self.fs, single_file):
+                self.fs.delete_file(single_file)
+            self.reset_table_files(table_name, written, partitioned=True, df=df)
+
+            # Generate and save schema
+            self.generate_and_save_schema(df, table_name, layer='raw')
+
+            logger.info(f"✓ Saved to {path}/")
+
+        except Exception as e:
+            logger.error(f"Error writing partitioned {table_name}: {e}")
+            raise
+
+    def migrate_to_partitioned(self, table_names=None, keep_source=False):
+        """
+        One-shot migration of existing single-file event tables to the partitioned layout.
+
+        Args:
+            table_names (list, optional): Tables to migrate. Defaults to lake.PARTITIONED_TABLES.
+            keep_source (bool): Keep the old {table}.parquet files (reads follow the manifest)
+
+        Returns:
+            dict: table_name -> rows migrated
+        """
+        table_names = table_names or lake.PARTITIONED_TABLES
+
+        logger.info(f"\n{'='*60}")
+        logger.info(f"MIGRATING TO PARTITIONED LAYOUT: {self.customer}")
+        logger.info(f"{'='*60}\n")
+
+        results = {}
+        for table_name in table_names:
+            if table_name not in lake.PARTITIONED_TABLES:
+                logger.warning(f"  ⚠ {table_name} has no simid partition key, skipping")
+                continue
+
+            manifest = self.get_table_files(table_name)
+            if manifest is None or manifest['partitioned']:
+                logger.info(f"  {table_name}: nothing to migrate")
+                results[table_name] = 0
+                continue
+
+            target = lake.partitioned_path(self.lake_root, self.raw_tables_prefix, table_name)
+            n_rows, written = lake.migrate_to_partitioned(
+                self.fs,
+                [self.get_lake_path(f) for f in manifest['files']],
+                target,
+                keep_source=keep_source
+            )
+            self.reset_table_files(table_name, written, partitioned=True, row_count=n_rows, delete_parts=not keep_source,
+                                   keep_max_id=True)
+
+            logger.info(f"✓ Migrated {table_name}: {n_rows:,} rows -> {target}/")
+            results[table_name] = n_rows
+
+        logger.info(f"{'='*60}")
+        logger.info(f"✓ MIGRATION COMPLETE: {sum(results.values()):,} rows")
+        logger.info(f"{'='*60}\n")
+
+        return results
+
+    # ========================================================================
+    # MANIFEST & DELTA PART FILES
+    # ========================================================================
+
+    def get_lake_path(self, relative_path):
+        """Full lake path (bucket or local_data_dir) of a path relative to the raw tables prefix."""
+        return self.tables.get_lake_path(relative_path)
+
+    def get_relative_path(self, lake_path):
+        """Path relative to the raw tables prefix, as stored in the manifest."""
+        return self.tables.get_relative_path(lake_path)
+
+    def get_manifest_path(self, table_name):
+        """Lake path of the table manifest (metadata/{customer}/{table}_manifest.json)."""
+        return self.tables.get_manifest_path(table_name)
+
+    def read_manifest(self, table_name):
+        """Table manifest listing the live Parquet files of a table, or None (lake.LakeTables.read_manifest)."""
+        return self.tables.read_manifest(table_name)
+
+    def write_manifest(self, table_name, files, partitioned, previous=None, **stats):
+        """Write the table manifest atomically (lake.LakeTables.write_manifest)."""
+        return self.tables.write_manifest(table_name, files, partitioned, previous=previous, **stats)
+
+    def get_table_files(self, table_name):
+        """Manifest of a table, created from the files on disk if missing (lake.LakeTables.get_table_files)."""
+        return self.tables.get_table_files(table_name)
+
+    def discover_table_files(self, table_name):
+        """(lake paths or None, partitioned flag) of a table from its layout on disk."""
+        return self.tables.discover_table_files(table_name)
+
+    def reset_table_files(self, table_name, files, partitioned, df=None, row_count=None, schema=None,
+                          delete_parts=True, keep_max_id=False):
+        """Point the manifest at a freshly (re)written table (lake.LakeTables.reset_table_files)."""
+        self.tables.reset_table_files(table_name, files, partitioned, df=df, row_count=row_count, schema=schema,
+                                      delete_parts=delete_parts, keep_max_id=keep_max_id)
+
+    def append_parquet_part(self, df, table_name, compression='snappy', id_column=None):
+        """
+        Append new rows as a new part file instead of rewriting the table (lake.LakeTables.append_part).
+
+        Args:
+            df (pd.DataFrame): New rows
+            table_name (str): Table name (e.g., 'user_sim_log')
+            compression (str): Compression algorithm ('snappy', 'gzip', 'brotli')
+            id_column (str, optional): Primary key column whose max is tracked in the manifest
+                (defaults to the manifest's id_column)
+
+        Returns:
+            list: Lake paths of the part files written
+        """
+        written = self.tables.append_part(df, table_name, compression=compression, id_column=id_column)
+        if written is None:
+            logger.warning(f"Existing parquet not found. Writing {table_name} from new data only.")
+            self.write_parquet_to_s3(df, table_name, compression=compression)
+            written = [self.get_lake_path(f) for f in self.read_manifest(table_name)['files']]
+        return written
+
+    def compact_table(self, table_name, compression='snappy', row_group_size=lake.COMPACT_ROW_GROUP_SIZE,
+                      max_file_rows=lake.COMPACT_MAX_FILE_ROWS):
+        """
+        Merge the small part files of a table into large row groups (lake.LakeTables.compact).
+
+        Args:
+            table_name (str): Table name (e.g., 'user_sim_log')
+            compression (str): Compression algorithm ('snappy', 'gzip', 'brotli')
+            row_group_size (int): Rows per row group in the merged files
+            max_file_rows (int): Files with at least this many rows (and the base {table}.parquet) are not merged
+
+        Returns:
+            int: Number of files merged away (0 if nothing to compact)
+        """
+        return self.tables.compact(table_name, compression=compression, row_group_size=row_group_size,
+                                   max_file_rows=max_file_rows)
+
     # ========================================================================
     # INITIAL BACKFILL (ONE-TIME)
     # ========================================================================
@@ -275,14 +539,18 @@ class ParquetPipeline:
         """
         One-time backfill: Extract entire table from MySQL and save to Parquet.
 
+        Rows are streamed from a server-side (unbuffered) cursor straight into the
+        Parquet writer, chunk by chunk, so memory stays flat regardless of table size.
+        The Parquet schema is fixed from the first chunk.
+
         Args:
             table_name (str): Table name (e.g., 'user_sim_log')
             db_connection: PyMySQL connection object
             where_clause (str, optional): SQL WHERE clause to filter data (e.g., "WHERE simid IN (55, 57)")
-            chunksize (int): Number of rows to process at a time (for large tables)
+            chunksize (int): Number of rows fetched from MySQL at a time
 
         Returns:
-            pd.DataFrame: The backfilled data
+            int: Number of rows backfilled
 
         Example:
             pipeline.backfill_table('user_sim_log', db_connection, where_clause="WHERE simid IN (55, 57)")
@@ -300,32 +568,110 @@ class ParquetPipeline:
 
             logger.info(f"Query: {query}")
 
-            # Extract data in chunks (for large tables)
-            chunks = []
-            for chunk in pd.read_sql_query(query, db_connection, chunksize=chunksize):
-                chunks.append(chunk)
-                logger.info(f"  Loaded chunk: {len(chunk):,} rows")
+            partitioned = self.is_partitioned_table(table_name, for_write=True)
+            if partitioned:
+                path = lake.partitioned_path(self.lake_root, self.raw_tables_prefix, table_name)
+                # Full rewrite - drop partitions from a previous backfill
+                if lake.is_partitioned(self.fs, path):
+                    self.fs.delete_dir(path)
+            else:
+                path = lake.table_path(self.lake_root, self.raw_tables_prefix, table_name)
+
+            progress = {'rows': 0, 'schema': None, 'null_counts': {}}
+            start_time = time.time()
+
+            def chunks():
+                for table in lake.stream_query(db_connection, query, chunksize=chunksize):
+                    progress['rows'] += table.num_rows
+                    progress['schema'] = progress['schema'] or table.schema
+                    for name, column in zip(table.column_names, table.columns):
+                        progress['null_counts'][name] = progress['null_counts'].get(name, 0) + column.null_count
+
+                    elapsed = max(time.time() - start_time, 1e-9)
+                    logger.info(f"  Streamed {progress['rows']:,} rows ({progress['rows'] / elapsed:,.0f} rows/s)")
+                    yield table
+
+            # Stream chunks straight to S3 Parquet
+            written = lake.write_table_stream(self.fs, path, chunks(), partitioned=partitioned)
+
+            elapsed = max(time.time() - start_time, 1e-9)
+            logger.info(f"✓ Extracted {progress['rows']:,} total rows from MySQL in {elapsed:,.1f}s "
+                        f"({progress['rows'] / elapsed:,.0f} rows/s)")
+
+            # The single file is superseded by the partitioned layout
+            single_file = lake.table_path(self.lake_root, self.raw_tables_prefix, table_name)
+            if partitioned and lake.is_file(self.fs, single_file):
+                self.fs.delete_file(single_file)
+            self.reset_table_files(table_name, written, partitioned=partitioned,
+                                   row_count=progress['rows'], schema=progress['schema'])
+
+            # Generate and save schema (nullability tracked across all chunks)
+            self.generate_and_save_schema(
+                progress['schema'].empty_table().to_pandas(), table_name, layer='raw',
+                nullable={name: n > 0 for name, n in progress['null_counts'].items()}
+            )
+
+            # Update metadata with current date
+            current_date = datetime.now().strftime('%Y-%m-%d')
+            self.update_last_update_date(table_name, current_date)
+
+            logger.info(f"✓ Backfill complete for {table_name}\n")
 
-            # Combine chunks
-            df = pd.concat(chunks, ignore_index=True)
+            return progress['rows']
+
+        except Exception as e:
+            logger.error(f"Error during backfill of {table_name}: {e}")
+            raise
+
+    def backfill_table_keyset(self, table_name, db_connection, id_column, where_clause=None,
+                              page_size=500000, chunksize=10000):
+        """
+        Resumable backfill: copy a table in primary-key order, one page per part file.
+
+        Each page is `SELECT * ... WHERE pk > last ORDER BY pk LIMIT page_size`, streamed
+        into its own part file. After each part is written the manifest is updated with
+        the last committed key, so if the run dies (e.g. the SSH tunnel drops) calling
+        this again continues after that key instead of starting over (lake.LakeTables.backfill_keyset).
+
+        Args:
+            table_name (str): Table name (e.g., 'user_sim_log')
+            db_connection: PyMySQL connection object
+            id_column (str): Primary key column (see incremental_update.db_primary_keys)
+            where_clause (str, optional): SQL WHERE clause to filter data (e.g., "WHERE simid IN (55, 57)")
+            page_size (int): Rows per page / part file
+            chunksize (int): Rows fetched from MySQL at a time within a page
 
-            logger.info(f"✓ Extracted {len(df):,} total rows from MySQL")
+        Returns:
+            int: Number of rows in the table after the backfill
+        """
+        logger.info(f"\n{'='*60}")
+        logger.info(f"BACKFILLING TABLE (KEYSET): {table_name}")
+        logger.info(f"{'='*60}")
 
-            # Save to S3 Parquet
-            self.write_parquet_to_s3(df, table_name)
+        try:
+            manifest = self.tables.backfill_keyset(
+                table_name, db_connection, id_column,
+                partitioned=self.is_partitioned_table(table_name, for_write=True),
+                where_clause=where_clause, page_size=page_size, chunksize=chunksize
+            )
 
             # Update metadata with current date
             current_date = datetime.now().strftime('%Y-%m-%d')
             self.update_last_update_date(table_name, current_date)
 
-            logger.info(f"✓ Backfill complete for {table_name}\n")
+            logger.info(f"✓ Backfill complete for {table_name}: {manifest['row_count']:,} rows "
+                        f"in {len(manifest['files'])} part(s)\n")
 
-            return df
+            return manifest['row_count']
 
         except Exception as e:
-            logger.error(f"Error during backfill of {table_name}: {e}")
+            logger.error(f"Error during keyset backfill of {table_name}: {e}")
             raise
 
+    def get_backfill_checkpoint(self, table_name):
+        """Last committed key of an unfinished keyset backfill, or None (lake.LakeTables.get_backfill_checkpoint)."""
+        return self.tables.get_backfill_checkpoint(table_name)
+
     def backfill_all_tables(self, db_connection, sim_ids=None):
         """
         Backfill all standard ETU tables needed for dashboards.
@@ -335,7 +681,7 @@ class ParquetPipeline:
             sim_ids (list, optional): List of simulation IDs to filter (e.g., [55, 57])
 
         Returns:
-            dict: Dictionary of table_name -> dataframe
+            dict: Dictionary of table_name -> rows backfilled
 
         Example:
             pipeline.backfill_all_tables(db_connection, sim_ids=[55, 57])
@@ -381,9 +727,9 @@ class ParquetPipeline:
         # Backfill quiz tables (need special handling)
         if sim_ids:
             # First get question IDs for these sims
-            df_questions = self.backfill_table('quiz_question', db_connection, where_clause=where_sim)
-            results['quiz_question'] = df_questions
+            results['quiz_question'] = self.backfill_table('quiz_question', db_connection, where_clause=where_sim)
 
+            df_questions = self.read_parquet_dataset('quiz_question', columns=['questionid'])
             question_ids = df_questions['questionid'].unique()
 
             # Then get answers and options for those questions
@@ -410,7 +756,7 @@ class ParquetPipeline:
 
     def update_table_incremental(self, table_name, db_connection, date_column='start'):
         """
-        Daily incremental update: Append only new rows to existing Parquet file.
+        Daily incremental update: Append only new rows as a new part file.
 
         Args:
             table_name (str): Table name (e.g., 'user_sim_log')
@@ -462,19 +808,8 @@ class ParquetPipeline:
 
             logger.info(f"✓ Extracted {len(df_new):,} new rows from MySQL")
 
-            # Read existing Parquet from S3
-            df_existing = self.read_parquet_from_s3(table_name)
-
-            if df_existing is None:
-                logger.warning(f"Existing parquet not found. Using only new data.")
-                df_combined = df_new
-            else:
-                # Append new data
-                df_combined = pd.concat([df_existing, df_new], ignore_index=True)
-                logger.info(f"✓ Combined: {len(df_existing):,} existing + {len(df_new):,} new = {len(df_combined):,} total rows")
-
-            # Save updated Parquet to S3
-            self.write_parquet_to_s3(df_combined, table_name)
+            # Append new rows as a part file (existing data is not re-read or rewritten)
+            self.append_parquet_part(df_new, table_name)
 
             # Update metadata
             self.update_last_update_date(table_name, today_str)
@@ -530,6 +865,7 @@ class ParquetPipeline:
     def update_table_incremental_by_id(self, table_name, db_connection, id_column='id'):
         """
         Incremental update based on Primary Key ID (append new rows where id > max_existing_id).
+        Only the new rows are read from MySQL and written (as a part file), so the cost is O(new rows).
         Useful for tables without reliable date columns (e.g., sim_score_log).
 
         Args:
@@ -543,18 +879,26 @@ class ParquetPipeline:
         logger.info(f"\n--- Updating {table_name} incrementally (by ID: {id_column}) ---")
 
         try:
-            # 1. Read existing parquet to find Max ID
-            df_existing = self.read_parquet_from_s3(table_name)
+            # 1. Max ID watermark from the table manifest (no Parquet read)
+            manifest = self.get_table_files(table_name)
 
-            if df_existing is None or df_existing.empty:
+            if manifest is None or not manifest['files']:
                 logger.warning(f"No existing data for {table_name}. Cannot do incremental update by ID.")
                 return None
 
-            if id_column not in df_existing.columns:
-                 logger.error(f"Column {id_column} not found in existing parquet for {table_name}")
-                 return None
+            max_id = manifest.get('max_id') if manifest.get('id_column') == id_column else None
+
+            if max_id is None:
+                # No watermark yet - take it from the Parquet footers once and persist it
+                max_id = lake.column_max(self.fs, [self.get_lake_path(f) for f in manifest['files']], id_column)
+
+                if max_id is None:
+                     logger.error(f"Column {id_column} not found in existing parquet for {table_name}")
+                     return None
+
+                manifest = self.write_manifest(table_name, manifest['files'], manifest['partitioned'],
+                                               previous=manifest, id_column=id_column, max_id=max_id)
 
-            max_id = df_existing[id_column].max()
             logger.info(f"Current Max {id_column}: {max_id}")
 
             # 2. Query MySQL for rows > max_id
@@ -569,11 +913,8 @@ class ParquetPipeline:
 
             logger.info(f"✓ Extracted {len(df_new):,} new rows from MySQL")
 
-            # 3. Append and Write
-            df_combined = pd.concat([df_existing, df_new], ignore_index=True)
-            logger.info(f"✓ Combined: {len(df_existing):,} existing + {len(df_new):,} new = {len(df_combined):,} total rows")
-
-            self.write_parquet_to_s3(df_combined, table_name)
+            # 3. Append new rows as a part file (existing data is not rewritten)
+            self.append_parquet_part(df_new, table_name, id_column=id_column)
             
             # Update metadata date just for reference
             today_str = datetime.now().strftime('%Y-%m-%d')
@@ -586,19 +927,59 @@ class ParquetPipeline:
             logger.error(f"Error updating {table_name} by ID: {e}")
             raise
 
+    def compact_all_tables(self, table_names=None):
+        """
+        Periodic compaction: merge the delta part files of every table.
+
+        Args:
+            table_names (list, optional): Tables to compact. Defaults to every table with a manifest.
+
+        Returns:
+            dict: table_name -> number of files merged away
+        """
+        logger.info(f"\n{'='*60}")
+        logger.info(f"COMPACTING PART FILES: {self.customer}")
+        logger.info(f"{'='*60}\n")
+
+        if table_names is None:
+            manifests = lake.list_files(
+                self.fs, f'{self.lake_root}/{self.metadata_prefix}'.rstrip('/'), '_manifest.json', recursive=False
+            )
+            table_names = [os.path.basename(f)[:-len('_manifest.json')] for f in manifests]
+
+        results = {}
+        for table_name in table_names:
+            try:
+                results[table_name] = self.compact_table(table_name)
+            except Exception as e:
+                logger.error(f"Error compacting {table_name}: {e}")
+
+        logger.info(f"{'='*60}")
+        logger.info(f"✓ COMPACTION COMPLETE")
+        logger.info(f"{'='*60}\n")
+
+        return results
+
     # ========================================================================
     # DATA LOADING FOR TRANSFORMATIONS (REPLACES extract_data)
     # ========================================================================
 
-    def load_raw_data_for_analysis(self, sim_ids=None, start_date=None, end_date=None):
+    def load_raw_data_for_analysis(self, sim_ids=None, start_date=None, end_date=None,
+                                   columns=lake.ANALYSIS_COLUMNS):
         """
         Load raw data from Parquet files for transformation/analysis.
         This replaces the extract_data() function.
 
+        simid and date-range filters are pushed down to the Parquet row groups, and the
+        large tables are projected to the columns in `columns`, so only the data needed
+        for the requested sims is read.
+
         Args:
             sim_ids (list, optional): Filter by simulation IDs (e.g., [55, 57])
             start_date (str, optional): Filter start date (YYYY-MM-DD)
             end_date (str, optional): Filter end date (YYYY-MM-DD)
+            columns (dict, optional): table_name -> list of columns to read. Tables not listed
+                are read in full. Pass None to read every column of every table.
 
         Returns:
             dict: Dictionary of table_name -> filtered_df
@@ -635,14 +1016,27 @@ class ParquetPipeline:
 
         for table_name in tables_to_load:
             logger.info(f"Loading {table_name}...")
-            df = self.read_parquet_from_s3(table_name)
 
-            if df is None:
+            # quiz_answer/quiz_option have no simid - restrict them to the questions of the requested sims
+            in_filters = None
+            if sim_ids and table_name in ('quiz_answer', 'quiz_option') and 'quiz_question' in dict_data:
+                in_filters = {'questionid': dict_data['quiz_question']['questionid'].unique().tolist()}
+
+            df_filtered = self.read_parquet_dataset(
+                table_name,
+                columns=(columns or {}).get(table_name),
+                sim_ids=sim_ids,
+                start_date=start_date,
+                end_date=end_date,
+                in_filters=in_filters
+            )
+
+            if df_filtered is None:
                 logger.warning(f"  ⚠ {table_name} not found in S3. Run backfill first!")
                 continue
 
-            # Apply filters
-            df_filtered = df.copy()
+            # Filters below are no-ops when the pushdown already applied them,
+            # but keep string-typed date columns (not pushed down) behaving as before.
 
             # Filter by sim_id if applicable and provided
             if sim_ids and 'simid' in df_filtered.columns:
@@ -651,15 +1045,14 @@ class ParquetPipeline:
 
             # Filter by date range if applicable and provided
             if start_date and end_date:
-                for date_col in ['start', 'end', 'dt']:
-                    if date_col in df_filtered.columns:
-                        df_filtered[date_col] = pd.to_datetime(df_filtered[date_col])
-                        df_filtered = df_filtered[
-                            (df_filtered[date_col] >= start_date) &
-                            (df_filtered[date_col] <= end_date)
-                        ]
-                        logger.info(f"  Filtered by {date_col}: {len(df_filtered):,} rows")
-                        break
+                date_col = lake.get_date_column(df_filtered.columns)
+                if date_col is not None:
+                    df_filtered[date_col] = pd.to_datetime(df_filtered[date_col])
+                    df_filtered = df_filtered[
+                        (df_filtered[date_col] >= start_date) &
+                        (df_filtered[date_col] <= end_date)
+                    ]
+                    logger.info(f"  Filtered by {date_col}: {len(df_filtered):,} rows")
 
             dict_data[table_name] = df_filtered
             logger.info(f"  ✓ Loaded {len(df_filtered):,} rows\n")
@@ -716,11 +1109,13 @@ if __name__ == '__main__':
         python parquet_pipeline.py backfill
         python parquet_pipeline.py update
         python parquet_pipeline.py load
+        python parquet_pipeline.py migrate [--keep-source]
+        python parquet_pipeline.py compact
     """
     import sys
 
     if len(sys.argv) < 2:
-        print("Usage: python parquet_pipeline.py [backfill|update|load]")
+        print("Usage: python parquet_pipeline.py [backfill|update|load|migrate|compact]")
         sys.exit(1)
 
     command = sys.argv[1]
@@ -750,7 +1145,19 @@ if __name__ == '__main__':
         for table_name, df in data.items():
             print(f"  {table_name}: {len(df):,} rows")
 
+    elif command == 'migrate':
+        print("Migrating event tables to the partitioned layout...")
+        results = pipeline.migrate_to_partitioned(keep_source='--keep-source' in sys.argv)
+        for table_name, n_rows in results.items():
+            print(f"  {table_name}: {n_rows:,} rows")
+
+    elif command == 'compact':
+        print("Compacting delta part files...")
+        results = pipeline.compact_all_tables()
+        for table_name, n_merged in results.items():
+            print(f"  {table_name}: {n_merged} files merged")
+
     else:
         print(f"Unknown command: {command}")
-        print("Usage: python parquet_pipeline.py [backfill|update|load]")
+        print("Usage: python parquet_pipeline.py [backfill|update|load|migrate|compact]")
         sys.exit(1)
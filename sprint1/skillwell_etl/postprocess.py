@@ -0,0 +1,203 @@
+"""
+Report Data Post-Processing for ETU Applied Sciences
+====================================================
+
+Adjustments made to the transformed data (get_transformed_data_from_parquet) before the
+HTML report is written: the NPS question added to the survey responses and the Course
+Summary NPS, and the "Overall Performance" skill names. Shared by 1_process_data_poc.py
+and the batch runner (skillwell_etl.batch), so both give the same reports.
+
+Example:
+    >>> dict_df = get_transformed_data_from_parquet(pipeline, sim_ids, start_date, end_date)
+    >>> prepare_report_data(dict_df, sim_ids)
+
+Author: ETU Applied Sciences
+Date: 2025-11-20
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('Postprocess')
+
+
+def add_nps_scores(dict_df, sim_ids):
+    """
+    Add the NPS Score question (Promoter/Passive/Detractor) to the survey responses and
+    rebuild the Course Summary NPS (proj_nps) from it. Modifies dict_df in place.
+
+    Args:
+        dict_df (dict): Transformed report data
+        sim_ids (list): Sim IDs of the report, in report order
+    """
+    # Order of Sims
+    dict_sim_order = {}
+    for i, simid in enumerate(sim_ids):
+        dict_sim_order.update({simid: i})
+
+    # Check if survey_responses exists
+    if 'srv' in dict_df and 'survey_responses' in dict_df['srv'] and dict_df['srv']['survey_responses'] is not None and not dict_df['srv']['survey_responses'].empty:
+        # Create a temporary DataFrame for easier chaining
+        dict_df['srv']['survey_responses']['optionvalue'] = dict_df['srv']['survey_responses']['optionvalue'].fillna(0)
+        temp_df = dict_df['srv']['survey_responses'].copy()
+
+        # The .assign() block now uses np.select for conditional logic
+        processed_df = temp_df.assign(
+            orderid=0,
+            question='NPS Score',
+
+            answer_nps_num=lambda x: x.apply(
+                lambda y: int(y['optionvalue']) if pd.notnull(y['answer']) else None, axis=1
+            ),
+
+            answer=lambda x: x['answer_nps_num'].apply(
+                lambda y: 'Promoter [5-7]' if y in [7, 6, 5] else
+                            'Passive [3-4]' if y in [4, 3] else
+                            'Detractor [1-2]' if y in [2, 1] else
+                            None
+            ),
+
+            bar_color=lambda x: np.select(
+                [
+                    x['answer'].str.contains('Promoter', na=False),
+                    x['answer'].str.contains('Passive', na=False)
+                ],
+                [
+                    '#2aa22a',  # Choice for Promoter
+                    '#ffffff'   # Choice for Passive
+                ],
+                default='#c61110'  # Default for Detractor or any other case
+            ),
+
+            nps_score=lambda x: np.select(
+                [
+                    x['answer'].str.contains('Promoter', na=False),
+                    x['answer'].str.contains('Passive', na=False),
+                    x['answer'].str.contains('Detractor', na=False)
+                ],
+                [
+                    1 * (x['pct'] / 100),    # Promoter score
+                    0 * (x['pct'] / 100),    # Passive score
+                    -1 * (x['pct'] / 100)    # Detractor score
+                ],
+                default=None  # Default for any other case
+            ),
+
+            n=lambda x: x.groupby(['simid', 'orderid', 'answer'])['n'].transform('sum'),
+            pct=lambda x: x.groupby(['simid', 'orderid', 'answer'])['pct'].transform('sum'),
+
+            avg_nps_score=lambda x: x.groupby(['simid', 'orderid'])['nps_score'].transform('sum')
+        )
+
+        # Continue with the rest of the chain
+        final_df = processed_df.filter([
+            'project', 'simid', 'simname', 'orderid', 'question', 'typeid', 'total',
+            'answer', 'bar_color', 'n', 'pct', 'avg_nps_score'
+        ]).drop_duplicates().assign(
+            sim_order=lambda x: x['simid'].map(dict_sim_order) # .map is faster than .apply here
+        ).sort_values(
+            ['sim_order', 'simid', 'orderid', 'answer']
+        )
+
+        # Re-assign the processed data back into the dictionary
+        dict_df['srv']['survey_responses'] = pd.concat(
+            [dict_df['srv']['survey_responses'], final_df],
+            ignore_index=True
+        )
+
+        # Update the proj_nps DataFrame
+        #dict_df['srv']['survey_responses'].query('orderid == 0')
+
+        temp = pd.concat(
+            [dict_df['srv']['survey_responses'].query('orderid == 0'), final_df],
+            ignore_index=True
+        )
+        temp['topic_keywords'] = np.nan
+
+        # Ensure required columns exist before groupby with correct data types
+        if 'answerid' not in temp.columns:
+            temp['answerid'] = np.nan
+        if 'optionvalue' not in temp.columns:
+            temp['optionvalue'] = np.nan
+        if 'dt' not in temp.columns:
+            temp['dt'] = pd.NaT  # Use NaT for datetime64[ns] type
+        if 'scale_type' not in temp.columns:
+            temp['scale_type'] = None
+        if 'topic_analysis' not in temp.columns:
+            temp['topic_analysis'] = np.nan  # Use np.nan for float64 type
+
+        temp = temp.groupby(['simid', 'answer','project']).agg({
+            'simname': 'first',
+            'orderid': 'first',
+            'question': 'first',
+            'typeid': 'first',
+            'total': 'first',
+            'bar_color': 'first',
+            'n': 'sum',
+            'pct': 'sum',
+            'avg_nps_score': 'mean',
+            'sim_order': 'first',
+            'answerid': 'first',
+            'optionvalue': 'first',
+            'dt': 'first',
+            'scale_type': 'first',
+            'topic_keywords': 'first',
+            'topic_analysis': 'first'
+        }).reset_index()
+        temp = temp[['project', 'simid', 'simname', 'orderid', 'question', 'typeid', 'total','answer', 'bar_color', 'n', 'pct', 'avg_nps_score',
+                     'sim_order', 'answerid', 'optionvalue', 'dt', 'scale_type', 'topic_keywords', 'topic_analysis']]
+
+        # Fix data types to match original SQL output
+        temp['total'] = temp['total'].astype('float64')
+        temp['sim_order'] = temp['sim_order'].astype('float64')
+        # topic_analysis should be float64 (with np.nan for nulls)
+        temp['topic_analysis'] = temp['topic_analysis'].astype('float64')
+
+        dict_df['proj']['proj_nps'] = temp
+    else:
+        logger.info("No survey_responses data available for NPS calculation")
+
+
+
+def rename_overall_performance(dict_df):
+    """
+    Name every skill containing "overall performance" (any case) "Overall Performance" in the
+    skill baseline and improvement tables. Modifies dict_df in place.
+
+    Args:
+        dict_df (dict): Transformed report data
+    """
+    if 'sim' in dict_df and 'skill_baseline' in dict_df['sim'] and dict_df['sim']['skill_baseline'] is not None and not dict_df['sim']['skill_baseline'].empty:
+        dict_df['sim']['skill_baseline'] = dict_df['sim']['skill_baseline']\
+        .assign(
+            skillname = lambda x: x['skillname'].apply(lambda y: "Overall Performance" if 'overall performance' in str(y).lower() else y)
+        )
+
+
+    if 'sim' in dict_df and 'skill_improvement' in dict_df['sim'] and dict_df['sim']['skill_improvement'] is not None and not dict_df['sim']['skill_improvement'].empty:
+        dict_df['sim']['skill_improvement'] = dict_df['sim']['skill_improvement']\
+        .assign(
+            skillname = lambda x: x['skillname'].apply(lambda y: "Overall Performance" if 'overall performance' in str(y).lower() else y)
+        )
+
+
+    if 'dmg' in dict_df and 'dmg_skill_baseline' in dict_df['dmg'] and dict_df['dmg']['dmg_skill_baseline'] is not None and not dict_df['dmg']['dmg_skill_baseline'].empty:
+        dict_df['dmg']['dmg_skill_baseline'] = dict_df['dmg']['dmg_skill_baseline']\
+        .assign(
+            skillname = lambda x: x['skillname'].apply(lambda y: "Overall Performance" if 'overall performance' in str(y).lower() else y)
+        )
+
+
+
+def prepare_report_data(dict_df, sim_ids):
+    """
+    Apply all the report post-processing (add_nps_scores, rename_overall_performance) in place.
+
+    Args:
+        dict_df (dict): Transformed report data
+        sim_ids (list): Sim IDs of the report, in report order
+    """
+    add_nps_scores(dict_df, sim_ids)
+    rename_overall_performance(dict_df)
@@ -16,10 +16,12 @@ if __name__ == '__main__' and __package__ is None:
     parent_dir_poc = os.path.dirname(current_dir)
     sys.path.append(parent_dir_poc)
     from skillwell_etl.pipeline import ParquetPipeline
-    from skillwell_etl.transform import get_transformed_data_from_parquet, get_base_demographics_from_parquet
+    from skillwell_etl.transform import (get_transformed_data_from_parquet, get_base_demographics_from_parquet,
+                                         load_client_demographics, merge_client_demographics)
 else:
     from .pipeline import ParquetPipeline
-    from .transform import get_transformed_data_from_parquet, get_base_demographics_from_parquet
+    from .transform import (get_transformed_data_from_parquet, get_base_demographics_from_parquet,
+                            load_client_demographics, merge_client_demographics)
 
 # Add 'Our Code' directory to path to import skillwell_functions
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -302,36 +304,12 @@ def run_report_workflow(
         df_demog = get_base_demographics_from_parquet(pipeline, sim_ids)
         
         # 2. Load Client Demographics Excel
-        logger.info("Loading Client Demographics Excel...")
         script_dir_abs = os.path.dirname(os.path.abspath(__file__))
         file_path = os.path.join(os.path.dirname(script_dir_abs), 'code_simulation_3_demographic_data.xlsx')
-
-        list_client = []
-        df_client = pd.DataFrame()
-
-        try:
-            if os.path.exists(file_path):
-                logger.info(f"Found file at {file_path}. Loading...")
-                client_data = pd.read_excel(file_path, converters={'username': str, 'uid': str}, keep_default_na=False)
-                list_client.append(client_data)
-            else:
-                logger.error(f"File not found at {file_path}")
-        except Exception as e:
-            logger.error(f"Error reading file: {e}")
-
-        if list_client:
-            df_client = pd.concat(list_client, ignore_index=True)\
-            .assign(uid = lambda x: x.apply(lambda y: str(y['User ID']) if pd.notnull(y['User ID']) else None, axis=1))\
-            .filter(['uid', 'Region', 'Category', 'Band'])\
-            .rename(columns={'Band':'Impact Band'})
+        df_client = load_client_demographics(file_path)
 
         # 3. Merge Demographics
-        if not df_demog.empty and not df_client.empty:
-            if 'uid' in df_demog.columns: df_demog['uid'] = df_demog['uid'].astype(str)
-            if 'uid' in df_client.columns: df_client['uid'] = df_client['uid'].astype(str)
-            df_demog_merged = df_demog.merge(df_client, how='inner', on=['uid'])
-        else:
-            df_demog_merged = df_demog
+        df_demog_merged = merge_client_demographics(df_demog, df_client)
 
         # 4. Transform Data
         dict_project = {tuple(sim_ids): 'Our Code: We Respect One Another'}
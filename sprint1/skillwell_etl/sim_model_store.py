@@ -0,0 +1,114 @@
+"""
+Sim Model Store for ETU Applied Sciences
+========================================
+
+Persists the decision-level model of each sim (the df_sim_model_levels rows that
+get_decision_levels builds from the sim XML with xml_to_df + sim_levels) keyed by
+the sha256 of the XML, next to the raw tables:
+
+    {root}/sim_models/{customer}/simid={simid}/{sha256[:16]}-v{SIM_MODEL_VERSION}.parquet
+
+A report only re-parses a sim when its XML changed. Bump SIM_MODEL_VERSION when
+the model computation changes so old files are ignored.
+
+Example:
+    >>> store = SimModelStore.from_pipeline(pipeline)
+    >>> df_model = store.load(simid, sha256)
+    >>> if df_model is None:
+    ...     df_model = build_model(...)
+    ...     store.save(simid, sha256, df_model)
+
+Author: ETU Applied Sciences
+Date: 2025-11-20
+"""
+
+import json
+import logging
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+if __package__:
+    from . import lake
+else:
+    import lake  # Running as a script
+
+logger = logging.getLogger('SimModelStore')
+
+# Version of the model computation (part of the file name)
+SIM_MODEL_VERSION = 1
+
+# Parquet schema metadata key holding the pandas dtypes of the model
+DTYPES_METADATA_KEY = b'sim_model_dtypes'
+
+
+class SimModelStore:
+    """
+    Parquet store of per-sim decision-level models keyed by (simid, XML hash).
+    """
+
+    def __init__(self, filesystem, root, customer):
+        """
+        Args:
+            filesystem (pyarrow.fs.FileSystem): Filesystem from lake.get_filesystem()
+            root (str): Lake root (local directory or bucket)
+            customer (str): Customer name (same prefix as the raw tables)
+        """
+        self.fs = filesystem
+        self.root = f'{root}/sim_models/{customer}'
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """Store in the lake of a ParquetPipeline, next to its raw tables."""
+        return cls(pipeline.fs, pipeline.lake_root, pipeline.customer)
+
+    def model_path(self, simid, sha256):
+        return f'{self.root}/simid={simid}/{sha256[:16]}-v{SIM_MODEL_VERSION}.parquet'
+
+    def load(self, simid, sha256):
+        """
+        Load the model of a sim built from the XML with this hash.
+
+        Returns:
+            pd.DataFrame or None: df_sim_model_levels rows of the sim, or None on a miss
+        """
+        path = self.model_path(simid, sha256)
+        if not lake.is_file(self.fs, path):
+            return None
+        try:
+            table = pq.read_table(path, filesystem=self.fs)
+            df = table.to_pandas()
+        except Exception as e:
+            logger.warning(f"  ⚠ Unreadable sim model {path} ({e}), rebuilding it")
+            return None
+        # Text columns may come back as pandas' string dtype - restore the object columns
+        # of the build so cached and fresh models merge the same way
+        metadata = table.schema.metadata or {}
+        dtypes = json.loads(metadata.get(DTYPES_METADATA_KEY, b'{}'))
+        for name in df.columns:
+            if dtypes.get(name) == 'object' and df[name].dtype != object:
+                df[name] = df[name].astype(object).where(df[name].notna(), None)
+
+        logger.info(f"  ✓ Sim model cache hit: sim {simid} ({len(df)} rows)")
+        return df
+
+    def save(self, simid, sha256, df_model):
+        """
+        Save the model of a sim. Failures are logged, not raised - the store is a cache.
+
+        Returns:
+            bool: Whether the model was written
+        """
+        path = self.model_path(simid, sha256)
+        try:
+            table = pa.Table.from_pandas(df_model, preserve_index=False)
+            dtypes = json.dumps({name: str(dtype) for name, dtype in df_model.dtypes.items()})
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), DTYPES_METADATA_KEY: dtypes})
+            lake.ensure_parent_dir(self.fs, path)
+            pq.write_table(table, path, filesystem=self.fs, compression='snappy')
+        except Exception as e:
+            logger.warning(f"  ⚠ Could not save sim model for sim {simid} ({e})")
+            return False
+        logger.info(f"  ✓ Saved sim model: {path}")
+        return True
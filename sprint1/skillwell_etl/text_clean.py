@@ -0,0 +1,79 @@
+"""
+Text Cleaning for Sim XML Fields
+================================
+
+One precompiled, memoized cleaner for the text fields xml_to_df reads from a sim
+XML (statements, responses, coaching, feedback, behaviors, consequences, skill
+labels and section names). Used by both skillwell_etl.transform.xml_to_df and the
+legacy skillwell_functions.xml_to_df, so both give the same text.
+
+Labels, skill names, sections and feedback repeat across the elements of a sim
+(and across sims), so results are kept in an LRU cache keyed by the raw string.
+
+Example:
+    >>> clean_xml_text('<p>Well done&nbsp;<br>Next</p>\\r')
+    'Well done <br>Next'
+
+Author: ETU Applied Sciences
+Date: 2025-11-20
+"""
+
+import html
+import re
+from functools import lru_cache
+
+# HTML tags (anything between < and >)
+TAG_PATTERN = re.compile(r'<[^>]*>')
+
+# Distinct raw strings kept by clean_xml_text
+CLEAN_TEXT_CACHE_SIZE = 65536
+
+# Placeholder keeping <br> line breaks through the tag stripping
+BR_PLACEHOLDER = '?br?'
+
+
+def _strip(text):
+    """stringcleaner() without its UTF-8 round trip (a no-op on str from ElementTree/html.unescape)."""
+    return text.replace('\r', ' ').strip()
+
+
+def _unescape(text, drop_newlines=False):
+    """Decode HTML entities, turn non-breaking spaces into spaces and drop carriage returns."""
+    text = html.unescape(text).replace('\xa0', ' ').replace('\r', '')
+    return text.replace('\n', '') if drop_newlines else text
+
+
+@lru_cache(maxsize=CLEAN_TEXT_CACHE_SIZE)
+def clean_xml_text(text, kind='markup'):
+    """
+    Clean one text field of a sim XML.
+
+    Args:
+        text (str): Raw text of the node or attribute
+        kind (str): How the field is cleaned (matching the original xml_to_df chains):
+            'markup'   - statement, response and coach of a dialog: <br> and <br /> kept
+                         as <br>, other tags dropped, entities decoded, trimmed
+            'feedback' - coach text of a link: as 'markup', but only <br> is kept
+            'label'    - skill label: trimmed, zero-width spaces dropped, then as 'feedback'
+            'plain'    - behavior and consequence: trimmed, entities decoded, newlines dropped
+                         (no tag stripping)
+            'section'  - section name: as 'plain', trimmed again
+
+    Returns:
+        str: Cleaned text
+    """
+    if kind == 'plain' or kind == 'section':
+        text = _unescape(_strip(text), drop_newlines=True)
+        return _strip(text) if kind == 'section' else text
+
+    if kind == 'label':
+        text = text.strip().replace('\u200b', '')
+        kind = 'feedback'
+
+    if kind == 'markup':
+        text = text.replace('<br />', BR_PLACEHOLDER)
+    elif kind != 'feedback':
+        raise ValueError(f"Unknown kind of XML text: {kind}")
+
+    text = TAG_PATTERN.sub('', text.replace('<br>', BR_PLACEHOLDER)).replace(BR_PLACEHOLDER, '<br>')
+    return _strip(_unescape(text))
@@ -0,0 +1,283 @@
+"""
+Topic Analysis Helpers for ETU Applied Sciences
+===============================================
+
+get_survey_responses runs BERTopic on every free-text question with more than
+TOPIC_MIN_RESPONSES answers. Building a default BERTopic per question loads the
+sentence-transformer again and embeds that question on its own, so instead:
+
+- the embedding model is loaded once per process (get_embedding_model)
+- the answers of all those questions are embedded in one batched call
+  (embed_question_responses), each distinct text once
+- every BERTopic fit gets the shared model and its precomputed embeddings
+  (make_topic_model + fit_transform(docs, embeddings))
+- with an EmbeddingCache (skillwell_etl.embedding_cache), only answers not embedded
+  by an earlier run go through the model
+- the fits of independent questions run in a process pool (fit_topic_models), each
+  worker with its share of the CPU threads
+
+Example:
+    >>> list_embeddings = embed_question_responses(list_q_responses)
+    >>> topic_model = make_topic_model()
+    >>> topics, probs = topic_model.fit_transform(q_responses, embeddings=list_embeddings[i])
+
+Author: ETU Applied Sciences
+Date: 2025-11-20
+"""
+
+import logging
+import multiprocessing
+import os
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+# BERTopic for topic analysis of free-text survey responses
+try:
+    from bertopic import BERTopic
+    from bertopic.representation import KeyBERTInspired
+    BERTOPIC_AVAILABLE = True
+except ImportError:
+    BERTOPIC_AVAILABLE = False
+
+logger = logging.getLogger('Topics')
+
+# BERTopic's default (English) sentence-transformer
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Texts per forward pass of the sentence-transformer
+EMBEDDING_BATCH_SIZE = 64
+
+# Questions need more answers than this for topic analysis (matches original behavior)
+TOPIC_MIN_RESPONSES = 100
+
+# Thread-count variables of the numeric libraries BERTopic runs on (BLAS, OpenMP, numba)
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'NUMEXPR_NUM_THREADS', 'NUMBA_NUM_THREADS')
+
+# Sentence-transformers loaded in this process, by model name
+_EMBEDDING_MODELS = {}
+
+
+def get_embedding_model(model_name=EMBEDDING_MODEL_NAME):
+    """
+    Sentence-transformer of this process, loaded on first use.
+
+    Args:
+        model_name (str): sentence-transformers model name
+
+    Returns:
+        SentenceTransformer: The loaded model
+    """
+    if model_name not in _EMBEDDING_MODELS:
+        from sentence_transformers import SentenceTransformer
+
+        logger.info(f"Loading embedding model {model_name}...")
+        _EMBEDDING_MODELS[model_name] = SentenceTransformer(model_name)
+    return _EMBEDDING_MODELS[model_name]
+
+
+def embed_texts(texts, model_name=EMBEDDING_MODEL_NAME, batch_size=EMBEDDING_BATCH_SIZE, cache=None):
+    """
+    Embed texts in one batched call, encoding each distinct text once.
+
+    Args:
+        texts (list): Texts to embed
+        model_name (str): sentence-transformers model name
+        batch_size (int): Texts per forward pass
+        cache (EmbeddingCache, optional): Persistent cache of the same model; only
+            texts missing from it are encoded
+
+    Returns:
+        np.ndarray: (len(texts), dim) float32 embeddings, in the order of texts
+    """
+    texts = list(texts)
+    unique_texts = list(dict.fromkeys(texts))
+    if not unique_texts:
+        return np.empty((0, 0), dtype=np.float32)
+
+    if cache is not None:
+        return cache.embed(texts, lambda missing: embed_texts(missing, model_name=model_name, batch_size=batch_size))
+
+    model = get_embedding_model(model_name)
+    unique_embeddings = model.encode(unique_texts, batch_size=batch_size, show_progress_bar=False, convert_to_numpy=True)
+
+    index = {text: i for i, text in enumerate(unique_texts)}
+    return np.asarray(unique_embeddings, dtype=np.float32)[[index[text] for text in texts]]
+
+
+def embed_question_responses(list_responses, min_responses=TOPIC_MIN_RESPONSES, model_name=EMBEDDING_MODEL_NAME,
+                             cache=None):
+    """
+    Embed the answers of every question that gets topic analysis, all in one batch.
+
+    Args:
+        list_responses (list): Answers (list or pd.Series of str) of each question
+        min_responses (int): Questions need more answers than this
+        model_name (str): sentence-transformers model name
+        cache (EmbeddingCache, optional): Persistent embedding cache of the same model
+
+    Returns:
+        list: Embeddings (np.ndarray) of each question, None for the questions without
+            topic analysis - or all None if embedding failed (BERTopic then embeds itself)
+    """
+    list_selected = [i for i, responses in enumerate(list_responses) if len(responses) > min_responses]
+    list_embeddings = [None] * len(list_responses)
+    if not list_selected or not BERTOPIC_AVAILABLE:
+        return list_embeddings
+
+    texts = [text for i in list_selected for text in list_responses[i]]
+    logger.info(f"Embedding {len(texts):,} comments of {len(list_selected)} questions...")
+    try:
+        embeddings = embed_texts(texts, model_name=model_name, cache=cache)
+    except Exception as e:
+        logger.warning(f"⚠ Could not embed the comments in one batch ({e}); BERTopic will embed each question")
+        return list_embeddings
+
+    start = 0
+    for i in list_selected:
+        end = start + len(list_responses[i])
+        list_embeddings[i] = embeddings[start:end]
+        start = end
+    return list_embeddings
+
+
+def make_topic_model(model_name=EMBEDDING_MODEL_NAME):
+    """
+    BERTopic with KeyBERT-inspired topic representations (matches original) that reuses
+    this process's embedding model.
+
+    Returns:
+        BERTopic: Unfitted topic model
+    """
+    # Fine-tune topic representations (matches original)
+    representation_model = KeyBERTInspired()
+    return BERTopic(embedding_model=get_embedding_model(model_name), representation_model=representation_model)
+
+
+# ============================================================================
+# Parallel Topic Fits
+# ============================================================================
+
+def fit_topics(responses, embeddings=None, model_name=EMBEDDING_MODEL_NAME):
+    """
+    Fit BERTopic on the answers of one question.
+
+    Args:
+        responses (list): Answers (list or pd.Series of str)
+        embeddings (np.ndarray, optional): Precomputed embeddings of responses
+        model_name (str): sentence-transformers model name
+
+    Returns:
+        tuple: (doc_info, topic_info) DataFrames of the fitted model
+    """
+    topic_model = make_topic_model(model_name)
+    topic_model.fit_transform(responses, embeddings=embeddings)
+    return topic_model.get_document_info(responses), topic_model.get_topic_info()
+
+
+def _fit_topics_job(job):
+    """Worker of fit_topic_models: (responses, embeddings, model_name) -> (doc_info, topic_info)."""
+    return fit_topics(*job)
+
+
+@contextmanager
+def worker_thread_env(n_threads):
+    """
+    Set the thread-count variables (THREAD_ENV_VARS) to n_threads in this process's environment
+    while a pool of spawned workers is created, restoring them afterwards.
+
+    BLAS, OpenMP and numba size their thread pools when they are first imported, which in a spawned
+    worker happens while it unpickles its initializer - before the initializer runs. The variables
+    only take effect if the worker inherits them when it starts, so they are set here, in the parent.
+    """
+    previous = {var: os.environ.get(var) for var in THREAD_ENV_VARS + ('TOKENIZERS_PARALLELISM',)}
+    os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(n_threads)
+    try:
+        yield
+    finally:
+        for var, value in previous.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+
+def init_worker_threads(n_threads):
+    """
+    Initializer of the spawned workers (topic fits, batch jobs): limits torch, and the BLAS/OpenMP
+    pools already loaded (threadpoolctl, if installed), to n_threads. Use with worker_thread_env,
+    which sets the thread variables the libraries read at import.
+    """
+    try:
+        import torch
+        torch.set_num_threads(n_threads)
+    except ImportError:
+        pass
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(n_threads)
+    except ImportError:
+        pass
+
+
+def fit_topic_models(jobs, max_workers=None):
+    """
+    Fit BERTopic for several questions, in a process pool when there is more than one.
+
+    Fits are independent, so each runs in its own process (with the CPU threads split
+    between the workers). Workers are spawned rather than forked, as the parent may
+    already hold a loaded torch model. Falls back to fitting in this process if the
+    pool can't be used.
+
+    Args:
+        jobs (list): (responses, embeddings, model_name) tuples
+        max_workers (int, optional): Worker processes (default: one per CPU, at most one per question)
+
+    Returns:
+        list: (doc_info, topic_info) of each job, in the order of jobs - or the exception
+            the fit raised
+    """
+    if not jobs:
+        return []
+
+    n_cpus = os.cpu_count() or 1
+    max_workers = min(max_workers or n_cpus, len(jobs))
+
+    results = {}
+
+    def run_serial(indices):
+        for i in indices:
+            try:
+                results[i] = _fit_topics_job(jobs[i])
+            except Exception as e:
+                results[i] = e
+
+    if max_workers <= 1:
+        run_serial(range(len(jobs)))
+        return [results[i] for i in range(len(jobs))]
+
+    n_threads = max(1, n_cpus // max_workers)
+    logger.info(f"Fitting {len(jobs)} topic models with {max_workers} processes ({n_threads} threads each)...")
+    try:
+        with worker_thread_env(n_threads), \
+                ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                                    initializer=init_worker_threads, initargs=(n_threads,)) as executor:
+            futures = {executor.submit(_fit_topics_job, job): i for i, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    results[i] = e
+    except (BrokenProcessPool, OSError) as e:
+        remaining = [i for i in range(len(jobs)) if i not in results]
+        logger.warning(f"⚠ Topic process pool unavailable ({e}); fitting {len(remaining)} questions in this process")
+        run_serial(remaining)
+
+    return [results[i] for i in range(len(jobs))]
@@ -7,7 +7,11 @@ import boto3
 import time
 import re
 import html
+import io
+import multiprocessing
 import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 
 # Suppress HuggingFace tokenizer parallelism warnings
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
@@ -15,17 +19,17 @@ os.environ["TOKENIZERS_PARALLELISM"] = "false"
 # Reduce verbosity of sentence-transformers
 logging.getLogger("sentence_transformers").setLevel(logging.WARNING)
 
-# BERTopic for topic analysis of free-text survey responses
-try:
-    from bertopic import BERTopic
-    from bertopic.representation import KeyBERTInspired
-    BERTOPIC_AVAILABLE = True
-except ImportError:
-    BERTOPIC_AVAILABLE = False
-
 logger = logging.getLogger('TransformData')
 
-from .filters import filter_logs_and_users
+from .filters import filter_logs_and_users, get_filtered_logs, rank_attempts, AnalysisContext
+from . import lake
+from .xml_cache import XmlCache, get_sim_xmls, content_hash, DEFAULT_MAX_AGE_HOURS
+from .sim_model_store import SimModelStore
+from .text_clean import clean_xml_text
+from .embedding_cache import EmbeddingCache
+# BERTopic for topic analysis of free-text survey responses
+from .topics import (BERTOPIC_AVAILABLE, EMBEDDING_MODEL_NAME, TOPIC_MIN_RESPONSES, embed_question_responses,
+                     fit_topic_models)
 
 def get_skill_baseline(pipeline, raw_data, sim_ids, start_dt, end_dt):
     """
@@ -104,10 +108,66 @@ def get_learner_engagement(df_logs_filtered, df_sims):
 
     return df_eng
 
-def get_skill_baseline(pipeline, raw_data, sim_ids, start_dt, end_dt):
+# Stat buckets of the overall pass rates: first passing attempt 1, 2, 3, 4+, then
+# completed without passing (users with no completed attempt are left out)
+PASS_RATE_STATS = [
+    (1, 'Passed Attempt 1'),
+    (2, 'Passed Attempt 2'),
+    (3, 'Passed Attempt 3'),
+    (4, 'Passed Attempt 4+'),
+    (5, 'Completed, not yet Passed'),
+]
+
+def get_overall_pass_rates(df_logs):
+    """
+    Calculate overall pass rates: how many learners first passed on attempt 1, 2, 3
+    or 4+, and how many completed without passing yet.
+
+    Vectorized - one groupby for the first passing attempt per sim/user instead
+    of a Python loop over every user.
+
+    Args:
+        df_logs (pd.DataFrame): user_sim_log with simid, userid, complete, pass and
+            attempt_calc (attempt number by start, 1-based)
+
+    Returns:
+        pd.DataFrame: simid, stat_order, stat, n, total - 5 rows per sim
+    """
+    if df_logs.empty:
+        return pd.DataFrame()
+
+    keys = ['simid', 'userid']
+
+    # First passing attempt per sim/user (attempt_calc increases with start)
+    df_passed = df_logs.loc[df_logs['pass'] == 1, keys + ['attempt_calc']]
+    first_pass = df_passed.groupby(keys)['attempt_calc'].min().clip(upper=4)
+
+    # Completed but never passed
+    df_completed = df_logs.loc[df_logs['complete'] == 1, keys].drop_duplicates()
+    not_passed = ~df_completed.set_index(keys).index.isin(first_pass.index)
+    df_status = pd.concat([
+        first_pass.rename('stat_order').reset_index(),
+        df_completed[not_passed].assign(stat_order=5),
+    ], ignore_index=True)
+
+    # Count per bucket, keeping every sim of the logs and every bucket
+    sims = np.sort(df_logs['simid'].dropna().unique())
+    counts = (
+        df_status.groupby(['simid', 'stat_order']).size()
+        .reindex(pd.MultiIndex.from_product([sims, [o for o, _ in PASS_RATE_STATS]],
+                                            names=['simid', 'stat_order']), fill_value=0)
+        .rename('n')
+        .reset_index()
+    )
+    counts['stat'] = counts['stat_order'].map(dict(PASS_RATE_STATS))
+    counts['total'] = counts.groupby('simid')['n'].transform('sum')
+
+    return counts[['simid', 'stat_order', 'stat', 'n', 'total']].astype({'stat_order': 'int64', 'n': 'int64', 'total': 'int64'})
+
+def get_skill_baseline(pipeline, raw_data, sim_ids, start_dt, end_dt, context=None):
     """
     Calculate skill baseline (First Attempt Scores) from Parquet.
-    Uses filter_logs_and_users for consistent filtering.
+    Uses filter_logs_and_users (or the shared AnalysisContext) for consistent filtering.
     """
     logger.info("Calculating Skill Baseline...")
     df_scores = raw_data.get('score')
@@ -118,7 +178,7 @@ def get_skill_baseline(pipeline, raw_data, sim_ids, start_dt, end_dt):
         return pd.DataFrame()
         
     # 1. Filter Logs & Users (Role=1, First Attempt, Date Range)
-    df_logs_filtered, valid_uids = filter_logs_and_users(raw_data, sim_ids, start_dt, end_dt)
+    df_logs_filtered, valid_uids = get_filtered_logs(raw_data, sim_ids, start_dt, end_dt, context)
     
     if df_logs_filtered.empty:
         return pd.DataFrame()
@@ -130,7 +190,7 @@ def get_skill_baseline(pipeline, raw_data, sim_ids, start_dt, end_dt):
     # And we filtered out logs > end date.
     
     # Sort to ensure we pick the true first attempt
-    df_logs_filtered.sort_values(by=['simid', 'userid', 'end'], ascending=True, inplace=True)
+    df_logs_filtered = df_logs_filtered.sort_values(by=['simid', 'userid', 'end'], ascending=True)
     df_first = df_logs_filtered.drop_duplicates(subset=['simid', 'userid'], keep='first')
     
     # 3. Join with Sim Scores to get values
@@ -215,7 +275,8 @@ def get_survey_responses(pipeline, raw_data, sim_ids):
     pass 
 
 # RE-WRITING properly with date args.
-def get_survey_responses(pipeline, raw_data, sim_ids, start_dt, end_dt):
+def get_survey_responses(pipeline, raw_data, sim_ids, start_dt, end_dt, context=None, embedding_cache=None,
+                         topic_workers=None):
     logger.info("Calculating Survey Responses...")
     df_questions = raw_data.get('quiz_question')
     df_answers = raw_data.get('quiz_answer')
@@ -226,7 +287,7 @@ def get_survey_responses(pipeline, raw_data, sim_ids, start_dt, end_dt):
         return pd.DataFrame()
 
     # 1. Filter Logs & Users
-    df_logs_filtered, valid_uids = filter_logs_and_users(raw_data, sim_ids, start_dt, end_dt)
+    df_logs_filtered, valid_uids = get_filtered_logs(raw_data, sim_ids, start_dt, end_dt, context)
     
     if df_logs_filtered.empty:
         return pd.DataFrame()
@@ -239,11 +300,7 @@ def get_survey_responses(pipeline, raw_data, sim_ids, start_dt, end_dt):
 
     # Ensure we only include COMPLETED logs (SQL: AND complete = 1)
     if 'complete' in df_logs_filtered.columns:
-        if df_logs_filtered['complete'].dtype == object:
-             # handle bytes or mixed
-             df_logs_filtered = df_logs_filtered[df_logs_filtered['complete'].apply(lambda x: int.from_bytes(x, "big") if isinstance(x, bytes) else int(x)) == 1].copy()
-        else:
-             df_logs_filtered = df_logs_filtered[df_logs_filtered['complete'] == 1].copy()
+        df_logs_filtered = df_logs_filtered[df_logs_filtered['complete'] == 1].copy()
         
     valid_log_ids = df_logs_filtered['logid'].unique()
     
@@ -330,25 +387,38 @@ def get_survey_responses(pipeline, raw_data, sim_ids, start_dt, end_dt):
             list_topic = []
             list_no_topic = []
 
-            for _, q_row in question_meta.iterrows():
-                # Get responses for this question
-                q_responses = df_ft[(df_ft['simid'] == q_row['simid']) &
-                                   (df_ft['orderid'] == q_row['orderid'])]['answer_clean']
-
-                # Only run BERTopic if > 100 responses (matches original behavior)
-                if len(q_responses) > 100 and BERTOPIC_AVAILABLE:
-                    logger.info(f"Topic Analysis for {len(q_responses):,} comments (simid={q_row['simid']}, orderid={q_row['orderid']})")
+            # Get responses for each question
+            list_q_responses = [
+                df_ft[(df_ft['simid'] == q_row['simid']) & (df_ft['orderid'] == q_row['orderid'])]['answer_clean']
+                for _, q_row in question_meta.iterrows()
+            ]
+
+            # Embed the comments of all questions getting topic analysis in one batch
+            # (only comments not in the embedding cache go through the model)
+            list_q_embeddings = embed_question_responses(list_q_responses, cache=embedding_cache)
+
+            # Only run BERTopic if > 100 responses (matches original behavior)
+            list_selected = [i for i, q_responses in enumerate(list_q_responses)
+                             if len(q_responses) > TOPIC_MIN_RESPONSES and BERTOPIC_AVAILABLE]
+            for i in list_selected:
+                q_row = question_meta.iloc[i]
+                logger.info(f"Topic Analysis for {len(list_q_responses[i]):,} comments (simid={q_row['simid']}, orderid={q_row['orderid']})")
+
+            # Fit the questions in a process pool - (doc_info, topic_info) or the exception of each fit
+            list_fits = fit_topic_models(
+                [(list_q_responses[i], list_q_embeddings[i], EMBEDDING_MODEL_NAME) for i in list_selected],
+                max_workers=topic_workers
+            )
+            dict_fits = dict(zip(list_selected, list_fits))
 
+            for i, (_, q_row) in enumerate(question_meta.iterrows()):
+                if i in dict_fits:
                     try:
-                        # Fine-tune topic representations (matches original)
-                        representation_model = KeyBERTInspired()
-                        topic_model = BERTopic(representation_model=representation_model)
-
-                        topics, probs = topic_model.fit_transform(q_responses)
+                        if isinstance(dict_fits[i], Exception):
+                            raise dict_fits[i]
 
                         # Get document info and topic info
-                        doc_info = topic_model.get_document_info(q_responses)
-                        topic_info = topic_model.get_topic_info()
+                        doc_info, topic_info = dict_fits[i]
 
                         # Filter to valid topics (0-49, matches original .query('Topic >= 0 and Topic <= 49'))
                         # This excludes Topic -1 (outliers that don't fit any topic)
@@ -518,7 +588,7 @@ def get_survey_responses(pipeline, raw_data, sim_ids, start_dt, end_dt):
     return df_final
 
 
-def get_time_spent(pipeline, raw_data, sim_ids, start_dt, end_dt):
+def get_time_spent(pipeline, raw_data, sim_ids, start_dt, end_dt, context=None):
     """
     Calculate time spent distribution by attempt number.
     Converts SQL from skillwell_functions.py lines 3518-3686.
@@ -539,25 +609,13 @@ def get_time_spent(pipeline, raw_data, sim_ids, start_dt, end_dt):
     logger.info("Calculating Time Spent...")
 
     # 1. Get filtered logs and valid users
-    df_logs_filtered, valid_uids = filter_logs_and_users(raw_data, sim_ids, start_dt, end_dt)
+    df_logs_filtered, valid_uids = get_filtered_logs(raw_data, sim_ids, start_dt, end_dt, context)
 
     if df_logs_filtered.empty:
         return pd.DataFrame()
 
-    # Helper to convert bytes to int (for complete column)
-    def convert_bit(x):
-        if isinstance(x, bytes):
-            return int.from_bytes(x, "big")
-        try:
-            return int(x)
-        except:
-            return 0
-
-    # 2. Apply complete conversion if needed (bytes vs int)
-    if df_logs_filtered['complete'].dtype == object:
-        complete_mask = df_logs_filtered['complete'].apply(convert_bit) == 1
-    else:
-        complete_mask = df_logs_filtered['complete'] == 1
+    # 2. Completed attempts (BIT columns are decoded to int8 on load)
+    complete_mask = df_logs_filtered['complete'] == 1
 
     # 3. Filter completed attempts only
     df_completed = df_logs_filtered[complete_mask].copy()
@@ -678,7 +736,7 @@ def get_time_spent(pipeline, raw_data, sim_ids, start_dt, end_dt):
     return df_time_spent
 
 
-def get_practice_mode(pipeline, raw_data, sim_ids, start_dt, end_dt):
+def get_practice_mode(pipeline, raw_data, sim_ids, start_dt, end_dt, context=None):
     """
     Calculate practice mode usage statistics.
     Converts SQL from skillwell_functions.py lines 3699-3867.
@@ -696,25 +754,13 @@ def get_practice_mode(pipeline, raw_data, sim_ids, start_dt, end_dt):
     logger.info("Calculating Practice Mode...")
 
     # 1. Get filtered logs and valid users
-    df_logs_filtered, valid_uids = filter_logs_and_users(raw_data, sim_ids, start_dt, end_dt)
+    df_logs_filtered, valid_uids = get_filtered_logs(raw_data, sim_ids, start_dt, end_dt, context)
 
     if df_logs_filtered.empty:
         return pd.DataFrame()
 
-    # Helper to convert bytes to int
-    def convert_bit(x):
-        if isinstance(x, bytes):
-            return int.from_bytes(x, "big")
-        try:
-            return int(x)
-        except:
-            return 0
-
-    # 2. Apply complete conversion if needed (bytes vs int)
-    if df_logs_filtered['complete'].dtype == object:
-        complete_mask = df_logs_filtered['complete'].apply(convert_bit) == 1
-    else:
-        complete_mask = df_logs_filtered['complete'] == 1
+    # 2. Completed attempts (BIT columns are decoded to int8 on load)
+    complete_mask = df_logs_filtered['complete'] == 1
 
     # 3. Filter completed attempts
     df_completed = df_logs_filtered[complete_mask].copy()
@@ -825,7 +871,7 @@ def get_practice_mode(pipeline, raw_data, sim_ids, start_dt, end_dt):
     return df_practice
 
 
-def get_skill_improvement(pipeline, raw_data, sim_ids, start_dt, end_dt, show_hidden_skills=True):
+def get_skill_improvement(pipeline, raw_data, sim_ids, start_dt, end_dt, show_hidden_skills=True, context=None):
     """
     Calculate skill improvement between first and last attempt.
     Converts SQL from skillwell_functions.py lines 2623-2743.
@@ -851,7 +897,7 @@ def get_skill_improvement(pipeline, raw_data, sim_ids, start_dt, end_dt, show_hi
         return pd.DataFrame()
 
     # 1. Get filtered logs and valid users
-    df_logs_filtered, valid_uids = filter_logs_and_users(raw_data, sim_ids, start_dt, end_dt)
+    df_logs_filtered, valid_uids = get_filtered_logs(raw_data, sim_ids, start_dt, end_dt, context)
 
     if df_logs_filtered.empty:
         return pd.DataFrame()
@@ -936,7 +982,7 @@ def get_skill_improvement(pipeline, raw_data, sim_ids, start_dt, end_dt, show_hi
     return df_agg
 
 
-def get_learner_engagement_over_time(pipeline, raw_data, sim_ids, start_dt, end_dt):
+def get_learner_engagement_over_time(pipeline, raw_data, sim_ids, start_dt, end_dt, context=None):
     """
     Calculate learner engagement over time (separate from proj version).
     Converts SQL from skillwell_functions.py lines 2036-2161.
@@ -946,19 +992,13 @@ def get_learner_engagement_over_time(pipeline, raw_data, sim_ids, start_dt, end_
     logger.info("Calculating Learner Engagement Over Time...")
 
     # 1. Get filtered logs and valid users
-    df_logs_filtered, valid_uids = filter_logs_and_users(raw_data, sim_ids, start_dt, end_dt)
+    df_logs_filtered, valid_uids = get_filtered_logs(raw_data, sim_ids, start_dt, end_dt, context)
 
     if df_logs_filtered.empty:
         return pd.DataFrame()
 
-    # 2. Filter completed attempts
-    # Handle bytes type for complete column (stored as b'\x01' or b'\x00' in parquet)
-    if df_logs_filtered['complete'].dtype == object:
-        complete_mask = df_logs_filtered['complete'].apply(
-            lambda x: int.from_bytes(x, "big") if isinstance(x, bytes) else int(x) if pd.notnull(x) else 0
-        ) == 1
-    else:
-        complete_mask = df_logs_filtered['complete'] == 1
+    # 2. Filter completed attempts (BIT columns are decoded to int8 on load)
+    complete_mask = df_logs_filtered['complete'] == 1
     df_completed = df_logs_filtered[complete_mask].copy()
 
     if df_completed.empty:
@@ -1052,31 +1092,32 @@ def stringcleaner(x):
     return clean
 
 
-def xml_to_df(file, split_score=False):
-    """
-    Converts an XML file (simulation structure) into a pandas DataFrame.
+# Columns of xml_to_df (before performancebranch), in output order
+XML_COLUMNS = [
+    'simname', 'id', 'x', 'y', 'startingpoint', 'choice', 'result', 'sectionid', 'section',
+    'coaching', 'feedback', 'behaviorid', 'behavior', 'consequence', 'qtype',
+    'skillid', 'skillname', 'skillscore', 'file'
+]
 
-    Args:
-        file (str): XML content as string
-        split_score (bool): Whether to split scores into separate rows
 
-    Returns:
-        pd.DataFrame: Parsed XML data with simulation structure
+def _xml_description(description):
     """
-    performancebranch_ids = []
-    list_xml = []
+    Read the sim name and sections from <scenario><info><description>.
 
-    root = ET.fromstring(file)
-    if root.find('./scenario/info/description/simulation/name') is not None:
-        simname = root.find('./scenario/info/description/simulation/name').text
-    if root.find('./scenario/info/description/name') is not None:
-        simname = root.find('./scenario/info/description/name').text
+    Returns:
+        tuple: (simname, dictSection, dictSectionInverse, attrib_name)
+    """
+    simname = None
+    if description.find('./simulation/name') is not None:
+        simname = description.find('./simulation/name').text
+    if description.find('./name') is not None:
+        simname = description.find('./name').text
 
     # Sections
     attrib_name = 'refId'
     dictSection = {}
     dictSectionInverse = {}
-    for sec in root.find('./scenario/info/description/sections'):
+    for sec in description.find('./sections'):
         if sec.find("./refId") is not None:
             dictSection[int(sec.find("./refId").text)] = sec.find("./name").text
             dictSectionInverse[sec.find("./name").text] = int(sec.find("./refId").text)
@@ -1085,156 +1126,266 @@ def xml_to_df(file, split_score=False):
             dictSection[sec.find("./id").text] = int(sec.find("./ref").text)
             dictSectionInverse[int(sec.find("./ref").text)] = sec.find("./id").text
 
-    for element in root.findall(".//element"):
-        id = element.attrib["id"]
-        x_loc = int(element.attrib["x"])
-        y_loc = int(element.attrib["y"])
+    return simname, dictSection, dictSectionInverse, attrib_name
 
-        choice = re.sub(r'<[^>]*>', '', element.find("./dialog/statement").text.replace('<br />', '?br?').replace('<br>', '?br?')).replace('?br?', '<br>') if element.find("./dialog/statement").text is not None else None
-        choice = html.unescape(choice).replace(u'\xa0', u' ').replace(u'\r', '') if choice is not None else None
-        choice = stringcleaner(choice) if choice is not None else None
 
-        result = re.sub(r'<[^>]*>', '', element.find("./dialog/response").text.replace('<br />', '?br?').replace('<br>', '?br?')).replace('?br?', '<br>') if element.find("./dialog/response").text is not None else None
-        result = html.unescape(result).replace(u'\xa0', u' ').replace(u'\r', '') if result is not None else None
-        result = stringcleaner(result) if result is not None else None
+def _xml_element_fields(element, dictSection, dictSectionInverse, attrib_name):
+    """
+    Read the dialog of one <element>.
 
-        practice_coach = element.find("./dialog/coach")
-        if practice_coach is not None:
-            coaching = re.sub(r'<[^>]*>', '', practice_coach.text.replace('<br />', '?br?').replace('<br>', '?br?')).replace('?br?', '<br>') if practice_coach.text is not None else None
-            coaching = html.unescape(coaching).replace(u'\xa0', u' ').replace(u'\r', '') if coaching is not None else None
-            coaching = stringcleaner(coaching) if coaching is not None else None
-        else:
-            coaching = None
-
-        sectionid = None
-        if len(dictSection) == 0 or attrib_name == 'ref':
-            if 'refId' in element.find("./dialog/sections/section").attrib.keys():
-                section = element.find("./dialog/sections/section").attrib['refId']
-                if section:
-                    sectionid = int(section)
-                    section = stringcleaner( dictSectionInverse.get(int(section)) )
-            else:
-                section = element.find("./dialog/sections/section").text
-                if section:
-                    sectionid = dictSection.get(section)
-                    section = stringcleaner(section)
-        else:
+    Returns:
+        tuple: (id, x, y, choice, result, sectionid, section, coaching, has_performancebranch)
+    """
+    id = element.attrib["id"]
+    x_loc = int(element.attrib["x"])
+    y_loc = int(element.attrib["y"])
+
+    choice = element.find("./dialog/statement").text
+    choice = clean_xml_text(choice) if choice is not None else None
+
+    result = element.find("./dialog/response").text
+    result = clean_xml_text(result) if result is not None else None
+
+    practice_coach = element.find("./dialog/coach")
+    if practice_coach is not None and practice_coach.text is not None:
+        coaching = clean_xml_text(practice_coach.text)
+    else:
+        coaching = None
+
+    sectionid = None
+    if len(dictSection) == 0 or attrib_name == 'ref':
+        if 'refId' in element.find("./dialog/sections/section").attrib.keys():
             section = element.find("./dialog/sections/section").attrib['refId']
             if section:
                 sectionid = int(section)
-                section = stringcleaner(dictSection.get(int(section)))
-
-        section = html.unescape(section).replace(u'\xa0', u' ').replace(u'\r', '').replace(u'\n', '') if section is not None else None
-        section = stringcleaner(section) if section is not None else None
-
-        performancebranch = element.find("./adaptivity/triggers/performancebranch")
-        if performancebranch is not None:
-            performancebranch_ids.append(id)
-
-        scoring = root.findall(".//*[@ref='{}']".format(id))
-        for score_ in scoring:
-            startingpoint = None
-            qtype = None
-            feedback = None
-            behaviorid = None
-            behavior = None
-            consequence = None
-            skillid = []
-            skillname = []
-            skillscore = []
-
-            if score_ != None:
-                try:
-                    startingpoint = score_.attrib["id"].split("-")[0]
-                    qtype = score_.find("./type").text
-                    feedback = score_.find("./coach").text
-                    feedback = re.sub(r'<[^>]*>', '', feedback.replace('<br>', '?br?')).replace('?br?', '<br>') if feedback is not None else None
-                    feedback = html.unescape(feedback).replace(u'\xa0', u' ').replace(u'\r', '') if feedback is not None else None
-                    feedback = stringcleaner(feedback) if feedback is not None else None
-
-                    behavior = score_.find("./behavior")
-                    if behavior is not None:
-                        behaviorid = behavior.attrib['refId']
-                        behavior = stringcleaner(behavior.text)
-                        behavior = html.unescape(behavior).replace(u'\xa0', u' ').replace(u'\r', '').replace(u'\n', '') if behavior is not None else None
-
-                    consequence = score_.find("./consequence")
-                    if consequence is not None:
-                        consequence = stringcleaner(consequence.text)
-                        consequence = html.unescape(consequence).replace(u'\xa0', u' ').replace(u'\r', '').replace(u'\n', '') if consequence is not None else None
-
-                    for score in score_.findall("./skill/score"):
-                        if score.attrib["refId"] is not None:
-                            skillid.append(int(score.attrib["refId"]))
-                        else:
-                            skillid.append(score.attrib["refId"])
-
-                        this_skillname = score.attrib["label"].strip().replace('\u200b', '')
-                        this_skillname = re.sub(r'<[^>]*>', '', this_skillname.replace('<br>', '?br?')).replace('?br?', '<br>') if this_skillname is not None else None
-                        this_skillname = html.unescape(this_skillname).replace(u'\xa0', u' ').replace(u'\r', '') if this_skillname is not None else None
-                        this_skillname = stringcleaner(this_skillname) if this_skillname is not None else None
-                        skillname.append(this_skillname)
-                        skillscore.append(score.attrib["value"])
-                except:
-                    pass
-
-            entry = pd.DataFrame({
-                "simname": [simname],
-                "id": [id],
-                "x": [x_loc],
-                "y": [y_loc],
-                "startingpoint": [startingpoint],
-                "choice": [choice],
-                "result": [result],
-                "sectionid": [sectionid],
-                "section": [section],
-                "coaching": [coaching],
-                "feedback": [feedback],
-                "behaviorid": [behaviorid],
-                "behavior": [behavior],
-                "consequence": [consequence],
-                "qtype": [qtype],
-                "skillid": [skillid],
-                "skillname": [skillname],
-                "skillscore": [skillscore],
-                "file": [file],
-            })
-            list_xml.append(entry)
+                section = stringcleaner( dictSectionInverse.get(int(section)) )
+        else:
+            section = element.find("./dialog/sections/section").text
+            if section:
+                sectionid = dictSection.get(section)
+                section = stringcleaner(section)
+    else:
+        section = element.find("./dialog/sections/section").attrib['refId']
+        if section:
+            sectionid = int(section)
+            section = stringcleaner(dictSection.get(int(section)))
 
-    if len(list_xml) > 0:
-        xml = pd.concat(list_xml, ignore_index=True)
-        del list_xml
+    section = clean_xml_text(section, 'section') if section is not None else None
 
-        if len(performancebranch_ids) > 0:
-            xml = xml.assign(performancebranch = lambda x: x['startingpoint'].apply(lambda y: 1 if y in performancebranch_ids else 0))
-        else:
-            xml = xml.assign(performancebranch = 0)
+    has_performancebranch = element.find("./adaptivity/triggers/performancebranch") is not None
 
-        # Alter dataframe to have 1 row for each skillid
-        if split_score:
-            lst_col = ['skillid', 'skillname', 'skillscore']
+    return id, x_loc, y_loc, choice, result, sectionid, section, coaching, has_performancebranch
 
-            xml = pd.concat([
-                pd.DataFrame(
-                    {col: np.repeat(xml[col].values, xml['skillid'].str.len()) for col in xml.columns.drop(lst_col)}
-                )\
-                .assign(
-                    **{lst_col[0]:np.concatenate(xml[lst_col[0]].values)},
-                    **{lst_col[1]:np.concatenate(xml[lst_col[1]].values)},
-                    **{lst_col[2]:np.concatenate(xml[lst_col[2]].values)}
-                ),
 
-                pd.DataFrame(
-                    {col: np.repeat(xml[col].values, [0 if x > 0 else 1 for x in xml['skillid'].str.len()] ) for col in xml.columns.drop(lst_col)}
-                )
-            ], ignore_index=True)[xml.columns]
+def _xml_score_fields(score_):
+    """
+    Read one scoring node (a node whose ref attribute points at an <element>).
 
-        return xml
-    else:
+    Returns:
+        tuple: (startingpoint, qtype, feedback, behaviorid, behavior, consequence,
+            skillid, skillname, skillscore)
+    """
+    startingpoint = None
+    qtype = None
+    feedback = None
+    behaviorid = None
+    behavior = None
+    consequence = None
+    skillid = []
+    skillname = []
+    skillscore = []
+
+    try:
+        startingpoint = score_.attrib["id"].split("-")[0]
+        qtype = score_.find("./type").text
+        feedback = score_.find("./coach").text
+        feedback = clean_xml_text(feedback, 'feedback') if feedback is not None else None
+
+        behavior = score_.find("./behavior")
+        if behavior is not None:
+            behaviorid = behavior.attrib['refId']
+            behavior = clean_xml_text(behavior.text, 'plain')
+
+        consequence = score_.find("./consequence")
+        if consequence is not None:
+            consequence = clean_xml_text(consequence.text, 'plain')
+
+        for score in score_.findall("./skill/score"):
+            if score.attrib["refId"] is not None:
+                skillid.append(int(score.attrib["refId"]))
+            else:
+                skillid.append(score.attrib["refId"])
+
+            skillname.append(clean_xml_text(score.attrib["label"], 'label'))
+            skillscore.append(score.attrib["value"])
+    except:
+        pass
+
+    return startingpoint, qtype, feedback, behaviorid, behavior, consequence, skillid, skillname, skillscore
+
+
+def _xml_rows_to_df(columns, performancebranch_ids, split_score):
+    """
+    Build the xml_to_df DataFrame from its column lists (one row per scoring node).
+    """
+    if len(columns['id']) == 0:
         return pd.DataFrame()
 
+    # A column holding any None stays object (as when rows were concatenated one by one).
+    # 'file' repeats the whole XML on every row: object keeps references, not copies
+    xml = pd.DataFrame({
+        col: pd.Series(values, dtype=object) if col == 'file' or None in values else pd.Series(values)
+        for col, values in columns.items()
+    })
+
+    xml = xml.assign(performancebranch = xml['startingpoint'].isin(performancebranch_ids).astype('int64'))
+
+    # Alter dataframe to have 1 row for each skillid
+    if split_score:
+        lst_col = ['skillid', 'skillname', 'skillscore']
+
+        def repeat(col, counts):
+            values = np.repeat(xml[col].values, counts)
+            return pd.Series(values, dtype=object) if col == 'file' else values
+
+        n_scores = xml['skillid'].str.len()
+        xml = pd.concat([
+            pd.DataFrame(
+                {col: repeat(col, n_scores) for col in xml.columns.drop(lst_col)}
+            )\
+            .assign(
+                **{lst_col[0]:np.concatenate(xml[lst_col[0]].values)},
+                **{lst_col[1]:np.concatenate(xml[lst_col[1]].values)},
+                **{lst_col[2]:np.concatenate(xml[lst_col[2]].values)}
+            ),
+
+            pd.DataFrame(
+                {col: repeat(col, [0 if x > 0 else 1 for x in n_scores]) for col in xml.columns.drop(lst_col)}
+            )
+        ], ignore_index=True)[xml.columns]
+
+    return xml
+
+
+def _append_xml_row(columns, simname, element_fields, score_fields, file):
+    """Append one scoring node of an element to the xml_to_df column lists."""
+    id, x_loc, y_loc, choice, result, sectionid, section, coaching, _ = element_fields
+    startingpoint, qtype, feedback, behaviorid, behavior, consequence, skillid, skillname, skillscore = score_fields
+    for col, value in zip(XML_COLUMNS, (
+        simname, id, x_loc, y_loc, startingpoint, choice, result, sectionid, section,
+        coaching, feedback, behaviorid, behavior, consequence, qtype,
+        skillid, skillname, skillscore, file
+    )):
+        columns[col].append(value)
+
+
+def xml_to_df(file, split_score=False, stream=False):
+    """
+    Converts an XML file (simulation structure) into a pandas DataFrame.
+
+    Scoring nodes (links) are found through a ref -> nodes index built in one pass
+    over the tree, so parsing is linear in the size of the sim.
+
+    Args:
+        file (str): XML content as string (or, with stream=True, a binary file object)
+        split_score (bool): Whether to split scores into separate rows
+        stream (bool): Parse with ET.iterparse, releasing each <element> once read,
+            instead of building the whole tree (for very large sims)
+
+    Returns:
+        pd.DataFrame: Parsed XML data with simulation structure
+    """
+    if stream:
+        return _xml_to_df_stream(file, split_score=split_score)
+
+    performancebranch_ids = set()
+    columns = {col: [] for col in XML_COLUMNS}
+
+    root = ET.fromstring(file)
+    simname, dictSection, dictSectionInverse, attrib_name = _xml_description(root.find('./scenario/info/description'))
+
+    # Scoring nodes of every element id, in document order
+    dict_ref_nodes = {}
+    for node in root.iter():
+        if node is not root and 'ref' in node.attrib:
+            dict_ref_nodes.setdefault(node.attrib['ref'], []).append(node)
+
+    for element in root.iter('element'):
+        if element is root:
+            continue
+        element_fields = _xml_element_fields(element, dictSection, dictSectionInverse, attrib_name)
+        if element_fields[-1]:
+            performancebranch_ids.add(element_fields[0])
+
+        for score_ in dict_ref_nodes.get(element_fields[0], []):
+            _append_xml_row(columns, simname, element_fields, _xml_score_fields(score_), file)
+
+    return _xml_rows_to_df(columns, performancebranch_ids, split_score)
+
+
+def _xml_to_df_stream(file, split_score=False):
+    """
+    xml_to_df() with ET.iterparse: elements and scoring nodes are read as they close
+    and then cleared, so only their extracted fields stay in memory.
+    """
+    source = io.BytesIO(file.encode('utf-8')) if isinstance(file, str) else file
+    file_column = file if isinstance(file, str) else None
+
+    description = None
+    list_elements = []     # (order, fields) of each <element>
+    dict_ref_scores = {}   # ref -> [(order, fields)] of its scoring nodes
+    list_pending = []      # <element>s that closed before the sim description
+    stack = []             # (node, order) of the open nodes
+    n_nodes = 0
+
+    for event, node in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            # Document (pre-)order, as root.findall() would return the nodes
+            stack.append((node, n_nodes))
+            n_nodes += 1
+            continue
+
+        _, n = stack.pop()
+        if node.tag == 'description' and [x[0].tag for x in stack[1:]] == ['scenario', 'info']:
+            description = _xml_description(node)
+            for n_element, element in list_pending:
+                list_elements.append((n_element, _xml_element_fields(element, *description[1:])))
+                element.clear()
+            list_pending = []
+
+        if not stack:
+            continue
+
+        if 'ref' in node.attrib:
+            dict_ref_scores.setdefault(node.attrib['ref'], []).append((n, _xml_score_fields(node)))
+
+        if node.tag == 'element':
+            if description is None:
+                list_pending.append((n, node))
+            else:
+                list_elements.append((n, _xml_element_fields(node, *description[1:])))
+                # Children (scoring nodes included) are all read by now
+                node.clear()
+
+    if description is None:
+        raise ValueError("Sim XML has no ./scenario/info/description")
+
+    performancebranch_ids = set()
+    columns = {col: [] for col in XML_COLUMNS}
+    for _, element_fields in sorted(list_elements, key=lambda x: x[0]):
+        if element_fields[-1]:
+            performancebranch_ids.add(element_fields[0])
+        for _, score_fields in sorted(dict_ref_scores.get(element_fields[0], []), key=lambda x: x[0]):
+            _append_xml_row(columns, description[0], element_fields, score_fields, file_column)
+
+    return _xml_rows_to_df(columns, performancebranch_ids, split_score)
+
+
+# Engines of sim_levels(): 'graph' (adjacency lists) and 'merge' (the original chained merges)
+SIM_LEVELS_ENGINES = ('graph', 'merge')
+
 
-def sim_levels(df):
+def sim_levels(df, engine='graph'):
     """
     Processes a DataFrame of dialogue logs to determine the hierarchical levels of decisions within a simulation.
 
@@ -1246,6 +1397,8 @@ def sim_levels(df):
         df (pandas.DataFrame): A DataFrame containing dialogue logs. It must contain at least the following columns:
             - 'relationid': The unique identifier for each dialogue relationship.
             - 'relationtype': The type of the relationship (used to determine decision points).
+        engine (str): 'graph' (default) computes the levels on adjacency lists of the dialogue graph;
+            'merge' runs the original chained DataFrame merges. Both return the same frame.
 
     Returns:
         pandas.DataFrame: A DataFrame with columns for 'dialogueid', 'decision_level', 'decision_level_num', and 'performancebranch',
@@ -1256,6 +1409,123 @@ def sim_levels(df):
         print('**ERROR: Data frame does not contain relationid and relationtype')
         return pd.DataFrame()
 
+    if engine == 'graph':
+        return _sim_levels_graph(df)
+    if engine == 'merge':
+        return _sim_levels_merge(df)
+    raise ValueError(f"Unknown sim_levels engine '{engine}' (expected one of {SIM_LEVELS_ENGINES})")
+
+
+def _format_decision_level(items, endpoints):
+    """'[1, 2] --> [5, 6]' label of a decision level (the format of the merge engine)."""
+    return '[' + ', '.join(str(x) for x in items) + '] --> [' + ', '.join(str(x) for x in endpoints) + ']'
+
+
+def _sim_levels_graph(df):
+    """
+    sim_levels() on the dialogue graph: relationid 'a-b' is an edge a -> b.
+
+    A decision point d (start of an optimal/suboptimal/critical link) is grouped with
+    the decision points that share a successor with it and, when d has a parent,
+    a parent too. Levels sharing the same successors are merged, and levels are
+    numbered by breadth-first layers from the sim's starting points.
+    """
+    # Step 1: Edges and adjacency lists (in first-seen order, like drop_duplicates)
+    relations = df[~df['relationid'].str.contains("None")]
+    dict_succ = {}
+    dict_pred = {}
+    list_edges = []
+    for relationid in dict.fromkeys(relations['relationid']):
+        start, end = (int(x) for x in relationid.split('-'))
+        list_edges.append((start, end))
+        dict_succ.setdefault(start, [])
+        dict_pred.setdefault(end, [])
+        if end not in dict_succ[start]:
+            dict_succ[start].append(end)
+        if start not in dict_pred[end]:
+            dict_pred[end].append(start)
+
+    # Step 2: Decision points
+    decisions = {int(relationid.split('-')[0]) for relationid in relations.loc[relations['relationtype'] <= 3, 'relationid']}
+
+    # Steps 3-6: Decision points sharing a successor (and a parent, when there is one)
+    dict_items = {}
+    for d in sorted(decisions):
+        items = {c for g in dict_succ[d] for c in dict_pred[g] if c in decisions}
+        if dict_pred.get(d):
+            items &= {c for p in dict_pred[d] for c in dict_succ[p]}
+        dict_items[d] = tuple(sorted(items))
+
+    if not dict_items or not any(dict_pred.get(d) for d in decisions):
+        return pd.DataFrame()
+
+    # Step 7: One level per set of successors, holding the decision points of all its groups
+    dict_end = {d: tuple(sorted(dict_succ[d])) for d in dict_items}
+    dict_end_items = {}
+    for d in dict_items:
+        dict_end_items.setdefault(dict_end[d], {}).setdefault(dict_items[d], None)
+    dict_level = {
+        d: _format_decision_level(sorted(x for items in dict_end_items[dict_end[d]] for x in items), dict_end[d])
+        for d in dict_items
+    }
+
+    # Step 8: Performance branches (flag of the dialogue's links, NaN when it has none)
+    dict_branches = {}
+    if 'performancebranch' in df.columns:
+        branches = df[df['performancebranch'] == 1]
+        dict_branches = dict(zip(branches['relationid'].map(lambda x: int(x.split('-')[0])), branches['performancebranch']))
+
+    # Step 9: Order Sim Levels - breadth-first layers from the starting points
+    ends = {end for _, end in list_edges}
+    layer = list(dict.fromkeys(start for start, _ in list_edges if start not in ends))
+    visited = set(layer)
+    list_assigned = []   # (decision_level, decision_level_num)
+    level_num = 0
+
+    levels_in_layer = list(dict.fromkeys(dict_level[d] for d in layer if d in dict_level))
+    if levels_in_layer:
+        level_num += 1
+        list_assigned.extend((level, level_num) for level in levels_in_layer)
+
+    # As in the merge engine, levels of the first layer are only set aside once a later
+    # layer assigns one, so a first-layer level can be numbered again (two rows) below
+    set_removed = set()
+    while layer:
+        layer = [end for start in layer for end in dict_succ.get(start, [])]
+        layer = [d for d in dict.fromkeys(layer) if d not in visited]
+        visited.update(layer)
+
+        levels_in_layer = list(dict.fromkeys(
+            dict_level[d] for d in layer if d in dict_level and dict_level[d] not in set_removed
+        ))
+        if levels_in_layer:
+            level_num += 1
+            list_assigned.extend((level, level_num) for level in levels_in_layer)
+            set_removed = {level for level, _ in list_assigned}
+
+    dict_level_nums = {}
+    for level, num in list_assigned:
+        dict_level_nums.setdefault(level, []).append(num)
+
+    rows = [
+        (d, dict_level[d], num)
+        for d in dict_items
+        for num in dict_level_nums.get(dict_level[d], [np.nan])
+    ]
+    levels = pd.DataFrame({
+        'dialogueid': pd.Series([row[0] for row in rows], dtype='int64'),
+        'decision_level': pd.Series([row[1] for row in rows], dtype=object),
+        'decision_level_num': pd.Series([row[2] for row in rows], dtype=object),
+    })
+    levels['performancebranch'] = levels['dialogueid'].map(dict_branches) if dict_branches else 0
+
+    return levels.sort_values(['decision_level_num', 'decision_level', 'dialogueid'])
+
+
+def _sim_levels_merge(df):
+    """
+    sim_levels() with chained DataFrame merges (the original implementation, kept as the reference engine).
+    """
     ### Step 1: Get unique Dialogue IDs
     levels0 = df\
     .query('not relationid.str.contains("None")')\
@@ -1587,15 +1857,254 @@ def sim_levels(df):
         return(pd.DataFrame())
 
 
+def parse_sim_xml(xml_content, simid):
+    """
+    Parse one sim XML into the element rows used by get_decision_levels.
+
+    Args:
+        xml_content (str): Sim XML
+        simid (int): Simulation ID
+
+    Returns:
+        pd.DataFrame: xml_to_df(split_score=True) rows plus relationid, relationtype,
+            decisiontype and simid (empty if the XML has no elements)
+    """
+    # Parse XML to DataFrame
+    this_xml_as_df = xml_to_df(xml_content, split_score=True)
+
+    if isinstance(this_xml_as_df, pd.DataFrame) and not this_xml_as_df.empty:
+        # Add relationid, relationtype, decisiontype
+        this_xml_as_df = this_xml_as_df.assign(
+            relationid=lambda x: x.apply(lambda y: str(y['startingpoint']) + '-' + str(y['id']), axis=1),
+            relationtype=lambda x: x['qtype'].apply(
+                lambda y: 1 if y == 'critical' else 2 if y == 'suboptimal' else 3 if y == 'optimal' else 4
+            ),
+            decisiontype=lambda x: x['qtype'].apply(
+                lambda y: y.capitalize() if pd.notnull(y) else None
+            ),
+            simid=simid
+        )
+        return this_xml_as_df
+
+    return pd.DataFrame()
+
+
+def build_sim_model_levels(df_xml, simid):
+    """
+    Build the decision-level model of one sim from its parsed XML.
+
+    Calculates the decision levels with sim_levels(), adds sections, scenarios and
+    the choice/feedback/coaching of every decision (STEPS 3-4 of get_decision_levels).
+    Depends only on the sim's XML, so the result can be cached per XML hash
+    (see SimModelStore).
+
+    Args:
+        df_xml (pd.DataFrame): parse_sim_xml() rows of the sim
+        simid (int): Simulation ID
+
+    Returns:
+        pd.DataFrame: df_sim_model_levels rows of the sim (empty if it has no
+            multi-decision levels)
+    """
+    logger.info(f"Calculating decision levels for sim {simid}...")
+
+    df_this_sim = df_xml.query('not relationid.str.contains("None")', engine='python')
+
+    if df_this_sim.empty:
+        return pd.DataFrame()
+
+    # Get decision levels
+    df_this_sim_levels = sim_levels(
+        df_this_sim[['relationid', 'relationtype', 'performancebranch']].drop_duplicates()
+    )
+
+    if isinstance(df_this_sim_levels, pd.DataFrame) and not df_this_sim_levels.empty:
+        df_this_sim_levels = df_this_sim_levels.assign(simid=simid)
+
+        # Filter to only levels with commas (multiple decisions)
+        df_this_sim_levels = df_this_sim_levels.query('decision_level.str.contains(",")', engine='python')
+
+        if not df_this_sim_levels.empty:
+            # Add section information
+            df_this_sim_levels = df_this_sim_levels.merge(
+                df_xml.assign(
+                    dialogueid=lambda x: x['startingpoint'].apply(lambda y: int(y) if pd.notnull(y) else None),
+                    sectionid_min=lambda x: x.groupby(['simid', 'sectionid', 'section'])['y'].transform('min')
+                )[['simid', 'dialogueid', 'sectionid', 'section']].drop_duplicates(),
+                how='left',
+                on=['simid', 'dialogueid']
+            )\
+            .sort_values(['simid', 'decision_level_num', 'decision_level', 'dialogueid', 'sectionid'])\
+            .groupby(['simid', 'decision_level_num', 'decision_level', 'dialogueid']).first().reset_index()\
+            .sort_values(['simid', 'sectionid', 'section', 'decision_level_num', 'decision_level', 'dialogueid'])
+
+            # Get unique Decision Level Number (based on sort order)
+            df_this_sim_levels = df_this_sim_levels.drop(columns=['decision_level_num']).merge(
+                df_this_sim_levels[['simid', 'sectionid', 'section', 'decision_level']]\
+                .drop_duplicates()\
+                .assign(decision_level_num=lambda x: x.groupby(['simid'])['decision_level'].cumcount() + 1),
+                how='left',
+                on=['simid', 'sectionid', 'section', 'decision_level']
+            )
+
+            # Add scenario text
+            df_this_sim_levels = df_this_sim_levels.merge(
+                df_xml.assign(
+                    dialogueid=lambda x: x['relationid'].apply(lambda y: int(y.split('-')[1]) if pd.notnull(y) else None),
+                    decision_type=lambda x: x['qtype'].apply(
+                        lambda y: 1 if y == 'optimal' else 2 if y == 'suboptimal' else 3 if y == 'critical' else 4
+                    )
+                )[['simid', 'dialogueid', 'result', 'decision_type']]\
+                .drop_duplicates()\
+                .rename(columns={'result': 'scenario'})\
+                .merge(
+                    df_this_sim_levels[['simid', 'dialogueid', 'decision_level_num', 'decision_level']],
+                    how='inner',
+                    on=['simid', 'dialogueid']
+                )\
+                .sort_values(['simid', 'decision_level_num', 'decision_level', 'decision_type', 'dialogueid'])\
+                .groupby(['simid', 'decision_level_num', 'decision_level']).first().reset_index()\
+                [['simid', 'decision_level_num', 'decision_level', 'scenario']].drop_duplicates(),
+                how='left',
+                on=['simid', 'decision_level_num', 'decision_level']
+            ).assign(
+                scenario=lambda x: x.apply(
+                    lambda y: 'Decision Level #' + str(int(y['decision_level_num'])) if pd.isnull(y['scenario']) else y['scenario'],
+                    axis=1
+                )
+            )
+
+            # Handle duplicate scenarios across levels
+            df_this_sim_levels = df_this_sim_levels.drop(columns=['scenario']).merge(
+                df_this_sim_levels[['simid', 'scenario', 'decision_level_num', 'decision_level']]\
+                .drop_duplicates()\
+                .assign(
+                    scenario_dec_num=lambda x: x.groupby(['simid', 'scenario'])['decision_level'].cumcount(),
+                    scenario=lambda x: x.apply(
+                        lambda y: y['scenario'] + ' ' * int(y['scenario_dec_num']) if pd.notnull(y['scenario_dec_num']) else y['scenario'],
+                        axis=1
+                    )
+                ).drop(columns=['scenario_dec_num']),
+                how='left',
+                on=['simid', 'decision_level_num', 'decision_level']
+            )
+
+            logger.info(f"  ✓ Calculated {len(df_this_sim_levels)} decision levels")
+
+    if not isinstance(df_this_sim_levels, pd.DataFrame) or df_this_sim_levels.empty:
+        return pd.DataFrame()
+
+    # =========================================================================
+    # Model Levels with Choice/Feedback/Coaching
+    # =========================================================================
+    df_sim_model_levels = df_this_sim_levels.merge(
+        df_xml.query('relationid.notnull() and not relationid.str.contains("None")', engine='python')\
+        [['simid', 'relationid', 'decisiontype', 'choice', 'feedback', 'coaching']].drop_duplicates()\
+        .assign(dialogueid=lambda x: x['relationid'].apply(lambda y: int(y.split('-')[0]))),
+        how='left',
+        on=['simid', 'dialogueid']
+    )
+
+    # Add choice_num
+    df_sim_model_levels = df_sim_model_levels.merge(
+        df_sim_model_levels[['simid', 'sectionid', 'section', 'decision_level_num', 'decision_level', 'scenario', 'decisiontype', 'choice']]\
+        .drop_duplicates()\
+        .assign(choice_num=lambda x: x.groupby(['simid', 'sectionid', 'decision_level', 'decisiontype'])['choice'].cumcount() + 1),
+        how='left',
+        on=['simid', 'sectionid', 'section', 'decision_level_num', 'decision_level', 'scenario', 'decisiontype', 'choice']
+    )
+
+    return df_sim_model_levels
+
+
+def _build_sim_model_job(job):
+    """
+    Parse the XML of one sim and build its model (worker of build_sim_models).
+
+    Args:
+        job (tuple): (simid, xml_hash, xml_content)
+
+    Returns:
+        tuple: (simid, xml_hash, df_sim_model_levels rows of the sim)
+    """
+    simid, xml_hash, xml_content = job
+
+    df_xml = parse_sim_xml(xml_content, simid)
+    if df_xml.empty:
+        logger.warning(f"  ⚠ No elements parsed from XML for sim {simid}")
+        return simid, xml_hash, pd.DataFrame()
+    logger.info(f"  ✓ Parsed XML for sim {simid}: {len(df_xml)} elements")
+
+    return simid, xml_hash, build_sim_model_levels(df_xml, simid)
+
+
+def build_sim_models(jobs, max_workers=None):
+    """
+    Parse and model several sims, in a process pool when there is more than one.
+
+    Parsing and sim_levels() are pure Python (GIL-bound), so sims are spread over
+    processes rather than threads. Workers are spawned, not forked: the caller may
+    hold threads (S3 reads, torch) that a forked child would inherit mid-operation.
+    Falls back to running in this process if the pool can't be used.
+
+    Args:
+        jobs (list): (simid, xml_hash, xml_content) tuples
+        max_workers (int, optional): Worker processes (default: one per CPU, at most one per sim)
+
+    Returns:
+        list: (simid, xml_hash, df_sim_model_levels) tuples in the order of jobs;
+            sims that failed are logged and left out
+    """
+    if not jobs:
+        return []
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+
+    results = {}
+
+    def run_serial(indices):
+        for i in indices:
+            try:
+                results[i] = _build_sim_model_job(jobs[i])
+            except Exception as e:
+                logger.error(f"  ❌ Error processing XML for sim {jobs[i][0]}: {e}")
+
+    if max_workers <= 1:
+        run_serial(range(len(jobs)))
+        return [results[i] for i in sorted(results)]
+
+    logger.info(f"Building {len(jobs)} sim models with {max_workers} processes...")
+    finished = set()
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = {executor.submit(_build_sim_model_job, job): i for i, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    logger.error(f"  ❌ Error processing XML for sim {jobs[i][0]}: {e}")
+                finished.add(i)
+    except (BrokenProcessPool, OSError) as e:
+        logger.warning(f"  ⚠ Process pool unavailable ({e}), building the remaining sim models serially")
+        run_serial([i for i in range(len(jobs)) if i not in finished])
+
+    return [results[i] for i in sorted(results)]
+
+
 def get_decision_levels(pipeline, raw_data, sim_ids, start_dt, end_dt, dict_manual_levels=None,
-                       ec2_id=None, ec2_region='us-east-1', s3_bucket_name='etu.appsciences', s3_region='us-east-1'):
+                       ec2_id=None, ec2_region='us-east-1', s3_bucket_name='etu.appsciences', s3_region='us-east-1',
+                       context=None, xml_cache=None, xml_max_age_hours=DEFAULT_MAX_AGE_HOURS, sim_model_store=None,
+                       xml_workers=None):
     """
     Calculate decision-level performance analytics from XML files and user dialogue logs.
 
     Implementation:
-    1. Fetch XML files from S3 (using EC2 SSM to copy from EC2 instance if needed)
-    2. Parse XML files using xml_to_df()
-    3. Calculate decision levels using sim_levels()
+    1. Fetch XML files from the XML cache, or from S3 (using batched EC2 SSM commands to copy from EC2 instance) on a miss
+    2. Parse XML files using xml_to_df() in a process pool (skipped when the sim model store has this XML's model)
+    3. Calculate decision levels using sim_levels() (build_sim_model_levels)
     4. Join with user_dialogue_log data
     5. Generate decision-level statistics and summaries
 
@@ -1610,6 +2119,12 @@ def get_decision_levels(pipeline, raw_data, sim_ids, start_dt, end_dt, dict_manu
         ec2_region: EC2 region
         s3_bucket_name: S3 bucket name
         s3_region: S3 region
+        context: Shared AnalysisContext (filtered + ranked logs) to reuse (optional)
+        xml_cache: XmlCache of sim XML files (optional; None fetches every file from EC2)
+        xml_max_age_hours: Hours a cached XML is trusted before checking the EC2 file again
+        sim_model_store: SimModelStore of built sim models keyed by XML hash (optional)
+        xml_workers: Processes parsing the XML of the sims not in the sim model store
+            (default: one per CPU)
 
     Returns:
         pd.DataFrame: Decision levels data with performance metrics
@@ -1637,221 +2152,55 @@ def get_decision_levels(pipeline, raw_data, sim_ids, start_dt, end_dt, dict_manu
     logger.info(f"Found {len(df_xml_files)} XML files to process")
 
     # =========================================================================
-    # STEP 2: Fetch and Parse XML Files
+    # STEP 2-4: Fetch XML, Parse and Build the Sim Models
     # =========================================================================
-    list_xml = []
+    # --- Get all XML files at once: from the cache, or copied from the EC2 Instance
+    # via batched SSM commands --->
+    # (Matching legacy extract_data process from skillwell_functions.py lines 2763-2828)
+    dict_xml_content, dict_xml_errors = get_sim_xmls(
+        xml_cache, df_xml_files['fileUrl'].tolist(), ec2_id, ec2_region, s3_bucket_name, s3_region,
+        max_age_hours=xml_max_age_hours
+    )
+
+    # The model of a sim depends only on its XML, so it's taken from the sim model
+    # store when this exact XML (by sha256) was modelled before
+    dict_sim_models = {}
+    list_jobs = []
 
     for i, row in df_xml_files.iterrows():
         simid = row['simid']
         file_url = row['fileUrl']
 
-        logger.info(f"Processing XML for sim {simid}: {file_url}")
-
-        try:
-            # --- Copy the XML file from EC2 Instance to S3 Bucket --->
-            # (Matching legacy extract_data process from skillwell_functions.py lines 2763-2828)
-
-            ec2_xml_source_file = '/usr/local/etu_sims/' + file_url
-            s3_xml_destination_file = 'appsciences/xml/' + '/'.join(file_url.split('/')[1:])
-
-            # Connect to S3
-            s3 = boto3.client('s3', region_name=s3_region)
-
-            # Open SSM connection
-            ssm_client = boto3.client('ssm', region_name=ec2_region)
-
-            # Copy file from EC2 to S3 via SSM
-            response = ssm_client.send_command(
-                InstanceIds=[ec2_id],
-                DocumentName="AWS-RunShellScript",
-                Parameters={'commands': [
-                    f'aws s3 cp {ec2_xml_source_file} s3://{s3_bucket_name}/{s3_xml_destination_file}',
-                ]}
-            )
-
-            time.sleep(2)
-
-            command_id = response['Command']['CommandId']
-
-            output = ssm_client.get_command_invocation(
-                CommandId=command_id,
-                InstanceId=ec2_id,
-            )
-
-            waiter = ssm_client.get_waiter('command_executed')
-            waiter.wait(
-                CommandId=command_id,
-                InstanceId=ec2_id,
-                PluginName='aws:RunShellScript',
-            )
-
-            # --- Read contents of XML File from S3 Bucket --->
-            response = s3.get_object(
-                Bucket=s3_bucket_name,
-                Key=s3_xml_destination_file
-            )
-
-            xml_content = response['Body'].read().decode('utf-8')
-            logger.info(f"  ✓ Copied from EC2 and read from S3: {s3_xml_destination_file}")
-
-            # Delete XML file from S3 Bucket (cleanup)
-            session = boto3.Session(region_name=s3_region)
-            s3_session = session.resource('s3')
-
-            s3_session.Object(
-                s3_bucket_name,
-                'appsciences/xml/' + '/'.join(file_url.split('/')[1:])
-            ).delete()
-            logger.info(f"  ✓ {file_url} copied and deleted from S3 Bucket successfully.")
-
-            # Parse XML to DataFrame
-            this_xml_as_df = xml_to_df(xml_content, split_score=True)
-
-            if isinstance(this_xml_as_df, pd.DataFrame) and not this_xml_as_df.empty:
-                # Add relationid, relationtype, decisiontype
-                this_xml_as_df = this_xml_as_df.assign(
-                    relationid=lambda x: x.apply(lambda y: str(y['startingpoint']) + '-' + str(y['id']), axis=1),
-                    relationtype=lambda x: x['qtype'].apply(
-                        lambda y: 1 if y == 'critical' else 2 if y == 'suboptimal' else 3 if y == 'optimal' else 4
-                    ),
-                    decisiontype=lambda x: x['qtype'].apply(
-                        lambda y: y.capitalize() if pd.notnull(y) else None
-                    ),
-                    simid=simid
-                )
-
-                list_xml.append(this_xml_as_df)
-                logger.info(f"  ✓ Parsed XML: {len(this_xml_as_df)} elements")
-
-        except Exception as e:
-            logger.error(f"  ❌ Error processing XML for sim {simid}: {e}")
+        if file_url not in dict_xml_content:
+            logger.error(f"  ❌ Error processing XML for sim {simid}: {dict_xml_errors.get(file_url)}")
             continue
 
-    if not list_xml:
-        logger.warning("No XML files successfully parsed")
-        return pd.DataFrame()
-
-    # Combine all XML data
-    df_xml = pd.concat(list_xml, ignore_index=True)
-    logger.info(f"Total XML elements parsed: {len(df_xml)}")
-
-    # =========================================================================
-    # STEP 3: Calculate Decision Levels using sim_levels()
-    # =========================================================================
-    list_sim_levels = []
-
-    for simid in df_xml['simid'].unique():
-        logger.info(f"Calculating decision levels for sim {simid}...")
-
-        df_this_sim = df_xml.query('simid == @simid and not relationid.str.contains("None")', engine='python')
-
-        if df_this_sim.empty:
-            continue
-
-        # Get decision levels
-        df_this_sim_levels = sim_levels(
-            df_this_sim[['relationid', 'relationtype', 'performancebranch']].drop_duplicates()
-        )
-
-        if isinstance(df_this_sim_levels, pd.DataFrame) and not df_this_sim_levels.empty:
-            df_this_sim_levels = df_this_sim_levels.assign(simid=simid)
-
-            # Filter to only levels with commas (multiple decisions)
-            df_this_sim_levels = df_this_sim_levels.query('decision_level.str.contains(",")', engine='python')
-
-            if not df_this_sim_levels.empty:
-                # Add section information
-                df_this_sim_levels = df_this_sim_levels.merge(
-                    df_xml.assign(
-                        dialogueid=lambda x: x['startingpoint'].apply(lambda y: int(y) if pd.notnull(y) else None),
-                        sectionid_min=lambda x: x.groupby(['simid', 'sectionid', 'section'])['y'].transform('min')
-                    )[['simid', 'dialogueid', 'sectionid', 'section']].drop_duplicates(),
-                    how='left',
-                    on=['simid', 'dialogueid']
-                )\
-                .sort_values(['simid', 'decision_level_num', 'decision_level', 'dialogueid', 'sectionid'])\
-                .groupby(['simid', 'decision_level_num', 'decision_level', 'dialogueid']).first().reset_index()\
-                .sort_values(['simid', 'sectionid', 'section', 'decision_level_num', 'decision_level', 'dialogueid'])
-
-                # Get unique Decision Level Number (based on sort order)
-                df_this_sim_levels = df_this_sim_levels.drop(columns=['decision_level_num']).merge(
-                    df_this_sim_levels[['simid', 'sectionid', 'section', 'decision_level']]\
-                    .drop_duplicates()\
-                    .assign(decision_level_num=lambda x: x.groupby(['simid'])['decision_level'].cumcount() + 1),
-                    how='left',
-                    on=['simid', 'sectionid', 'section', 'decision_level']
-                )
-
-                # Add scenario text
-                df_this_sim_levels = df_this_sim_levels.merge(
-                    df_xml.assign(
-                        dialogueid=lambda x: x['relationid'].apply(lambda y: int(y.split('-')[1]) if pd.notnull(y) else None),
-                        decision_type=lambda x: x['qtype'].apply(
-                            lambda y: 1 if y == 'optimal' else 2 if y == 'suboptimal' else 3 if y == 'critical' else 4
-                        )
-                    )[['simid', 'dialogueid', 'result', 'decision_type']]\
-                    .drop_duplicates()\
-                    .rename(columns={'result': 'scenario'})\
-                    .merge(
-                        df_this_sim_levels[['simid', 'dialogueid', 'decision_level_num', 'decision_level']],
-                        how='inner',
-                        on=['simid', 'dialogueid']
-                    )\
-                    .sort_values(['simid', 'decision_level_num', 'decision_level', 'decision_type', 'dialogueid'])\
-                    .groupby(['simid', 'decision_level_num', 'decision_level']).first().reset_index()\
-                    [['simid', 'decision_level_num', 'decision_level', 'scenario']].drop_duplicates(),
-                    how='left',
-                    on=['simid', 'decision_level_num', 'decision_level']
-                ).assign(
-                    scenario=lambda x: x.apply(
-                        lambda y: 'Decision Level #' + str(int(y['decision_level_num'])) if pd.isnull(y['scenario']) else y['scenario'],
-                        axis=1
-                    )
-                )
-
-                # Handle duplicate scenarios across levels
-                df_this_sim_levels = df_this_sim_levels.drop(columns=['scenario']).merge(
-                    df_this_sim_levels[['simid', 'scenario', 'decision_level_num', 'decision_level']]\
-                    .drop_duplicates()\
-                    .assign(
-                        scenario_dec_num=lambda x: x.groupby(['simid', 'scenario'])['decision_level'].cumcount(),
-                        scenario=lambda x: x.apply(
-                            lambda y: y['scenario'] + ' ' * int(y['scenario_dec_num']) if pd.notnull(y['scenario_dec_num']) else y['scenario'],
-                            axis=1
-                        )
-                    ).drop(columns=['scenario_dec_num']),
-                    how='left',
-                    on=['simid', 'decision_level_num', 'decision_level']
-                )
+        xml_content = dict_xml_content[file_url]
+        xml_hash = content_hash(xml_content)
+        df_this_model = sim_model_store.load(simid, xml_hash) if sim_model_store is not None else None
 
-                list_sim_levels.append(df_this_sim_levels)
-                logger.info(f"  ✓ Calculated {len(df_this_sim_levels)} decision levels")
+        if df_this_model is None:
+            list_jobs.append((simid, xml_hash, xml_content))
+        else:
+            dict_sim_models[simid] = df_this_model
+
+    # Parse and model the remaining sims in parallel (one process per sim)
+    for simid, xml_hash, df_this_model in build_sim_models(list_jobs, max_workers=xml_workers):
+        if sim_model_store is not None and not df_this_model.empty:
+            sim_model_store.save(simid, xml_hash, df_this_model)
+        dict_sim_models[simid] = df_this_model
+
+    # Keep the order of the simulation table
+    list_sim_model_levels = [
+        dict_sim_models[simid] for simid in df_xml_files['simid']
+        if simid in dict_sim_models and not dict_sim_models[simid].empty
+    ]
 
-    if not list_sim_levels:
+    if not list_sim_model_levels:
         logger.warning("No decision levels calculated")
         return pd.DataFrame()
 
-    df_sim_levels = pd.concat(list_sim_levels, ignore_index=True)
-
-    # =========================================================================
-    # STEP 4: Create Model Levels with Choice/Feedback/Coaching
-    # =========================================================================
-    df_sim_model_levels = df_sim_levels.merge(
-        df_xml.query('relationid.notnull() and not relationid.str.contains("None")', engine='python')\
-        [['simid', 'relationid', 'decisiontype', 'choice', 'feedback', 'coaching']].drop_duplicates()\
-        .assign(dialogueid=lambda x: x['relationid'].apply(lambda y: int(y.split('-')[0]))),
-        how='left',
-        on=['simid', 'dialogueid']
-    )
-
-    # Add choice_num
-    df_sim_model_levels = df_sim_model_levels.merge(
-        df_sim_model_levels[['simid', 'sectionid', 'section', 'decision_level_num', 'decision_level', 'scenario', 'decisiontype', 'choice']]\
-        .drop_duplicates()\
-        .assign(choice_num=lambda x: x.groupby(['simid', 'sectionid', 'decision_level', 'decisiontype'])['choice'].cumcount() + 1),
-        how='left',
-        on=['simid', 'sectionid', 'section', 'decision_level_num', 'decision_level', 'scenario', 'decisiontype', 'choice']
-    )
+    df_sim_model_levels = pd.concat(list_sim_model_levels, ignore_index=True)
 
     # =========================================================================
     # STEP 5: Apply Manual Level Overrides (if provided)
@@ -1863,13 +2212,6 @@ def get_decision_levels(pipeline, raw_data, sim_ids, start_dt, end_dt, dict_manu
 
             for simid_manual in list_simid_manual:
                 for key_level, val_level in val_manual.items():
-                    df_sim_levels = df_sim_levels.assign(
-                        decision_level=lambda x: x.apply(
-                            lambda y: val_level if y['simid'] == simid_manual and y['decision_level'] in key_level else y['decision_level'],
-                            axis=1
-                        )
-                    )
-
                     df_sim_model_levels = df_sim_model_levels.assign(
                         decision_level=lambda x: x.apply(
                             lambda y: val_level if y['simid'] == simid_manual and y['decision_level'] in key_level else y['decision_level'],
@@ -1885,7 +2227,7 @@ def get_decision_levels(pipeline, raw_data, sim_ids, start_dt, end_dt, dict_manu
     logger.info("Calculating user statistics for decision levels...")
 
     # Get filtered logs and valid users
-    df_logs_filtered, valid_uids = filter_logs_and_users(raw_data, sim_ids, start_dt, end_dt)
+    df_logs_filtered, valid_uids = get_filtered_logs(raw_data, sim_ids, start_dt, end_dt, context)
 
     if df_logs_filtered.empty:
         logger.warning("No valid user logs found")
@@ -1918,9 +2260,10 @@ def get_decision_levels(pipeline, raw_data, sim_ids, start_dt, end_dt, dict_manu
     )
 
     # Mark first and last attempts
-    df_logs_with_attempts = df_logs_filtered.copy()
-    df_logs_with_attempts['first_attempt'] = df_logs_with_attempts.groupby(['simid', 'userid'])['start'].rank(method='first')
-    df_logs_with_attempts['last_attempt'] = df_logs_with_attempts.groupby(['simid', 'userid'])['start'].rank(method='first', ascending=False)
+    # (the shared AnalysisContext has already ranked them)
+    df_logs_with_attempts = df_logs_filtered
+    if 'first_attempt' not in df_logs_with_attempts.columns:
+        df_logs_with_attempts = rank_attempts(df_logs_filtered.copy())
 
     df_logs_first_last = df_logs_with_attempts[
         (df_logs_with_attempts['first_attempt'] == 1) |
@@ -2109,11 +2452,8 @@ def get_proj_engagement(df_learner_engagement, df_sims, dict_project, dict_sim_o
         df_logs = raw_data.get('user_sim_log')
         df_users = raw_data.get('user')
         if df_logs is not None and not df_logs.empty:
-            # Handle bytes vs int for complete column
-            if df_logs['complete'].dtype == object:
-                complete_mask = df_logs['complete'] == b'\x01'
-            else:
-                complete_mask = df_logs['complete'] == 1
+            # BIT columns are decoded to int8 on load
+            complete_mask = df_logs['complete'] == 1
 
             # Get completed logs
             df_log_complete = df_logs[complete_mask].copy()
@@ -2144,11 +2484,8 @@ def get_proj_engagement(df_learner_engagement, df_sims, dict_project, dict_sim_o
         df_logs = raw_data.get('user_sim_log')
         df_users = raw_data.get('user')
         if df_logs is not None and not df_logs.empty:
-            # Handle bytes vs int for complete column
-            if df_logs['complete'].dtype == object:
-                complete_mask = df_logs['complete'] == b'\x01'
-            else:
-                complete_mask = df_logs['complete'] == 1
+            # BIT columns are decoded to int8 on load
+            complete_mask = df_logs['complete'] == 1
 
             # Get all completed logs for project sims
             all_project_sims = list(dict_project_alt.keys())
@@ -2324,15 +2661,8 @@ def get_dmg_engagement(raw_data, df_demog, sim_ids, start_dt, end_dt, dict_proje
     # Filter logs by sim and date
     df_logs = df_logs[df_logs['simid'].isin(sim_ids)].copy()
 
-    # Convert BIT columns to integers
-    def convert_bit(x):
-        if isinstance(x, bytes): return int.from_bytes(x, "big")
-        try: return int(x)
-        except: return 0
-
-    for col in ['complete', 'pass', 'assess']:
-        if col in df_logs.columns:
-            df_logs[col] = df_logs[col].apply(convert_bit)
+    # Convert BIT columns to integers (no-op when they were decoded on load)
+    lake.decode_bit_frame(df_logs)
 
     # Ensure date columns
     if 'start' in df_logs.columns:
@@ -2551,13 +2881,8 @@ def get_dmg_decision_levels(df_decision_levels, df_demog, raw_data, sim_ids, dic
     # Filter completed logs for relevant sims
     df_logs_sim = df_logs[df_logs['simid'].isin(sim_ids)].copy()
 
-    # Handle complete column (may be bytes or int)
-    if df_logs_sim['complete'].dtype == object:
-        complete_mask = df_logs_sim['complete'].apply(
-            lambda x: int.from_bytes(x, "big") if isinstance(x, bytes) else int(x) if pd.notnull(x) else 0
-        ) == 1
-    else:
-        complete_mask = df_logs_sim['complete'] == 1
+    # BIT columns are decoded to int8 on load
+    complete_mask = df_logs_sim['complete'] == 1
 
     df_logs_complete = df_logs_sim[complete_mask].copy()
 
@@ -2815,27 +3140,116 @@ def get_dmg_decision_levels(df_decision_levels, df_demog, raw_data, sim_ids, dic
     return df_grouped
 
 
-def get_base_demographics_from_parquet(pipeline, sim_ids):
+def subset_raw_data(raw_data, sim_ids):
+    """
+    Tables of the given sims, from tables loaded (load_raw_data_for_analysis) for a superset of them.
+
+    Gives the same tables as loading the sims directly: tables with a simid column are filtered
+    on it, quiz_answer/quiz_option on the questions of the sims' quiz_question rows, and the
+    other tables are kept whole. Every table is a new DataFrame, so the transformations can
+    modify them in place without touching the shared tables.
+
+    Args:
+        raw_data (dict): table_name -> DataFrame loaded for a superset of sim_ids
+        sim_ids (list): Simulation IDs
+
+    Returns:
+        dict: table_name -> DataFrame of sim_ids
+    """
+    subset = {}
+    for table_name, df in raw_data.items():
+        if 'simid' in df.columns:
+            df = df[df['simid'].isin(sim_ids)]
+        subset[table_name] = df
+
+    if 'quiz_question' in subset:
+        question_ids = subset['quiz_question']['questionid'].unique()
+        for table_name in ('quiz_answer', 'quiz_option'):
+            df = subset.get(table_name)
+            if df is not None and 'questionid' in df.columns:
+                subset[table_name] = df[df['questionid'].isin(question_ids)]
+
+    # Fresh copies, indexed from 0 like freshly loaded tables
+    return {table_name: df.reset_index(drop=True).copy() for table_name, df in subset.items()}
+
+
+def load_client_demographics(file_path):
+    """
+    Load a client's demographics Excel (User ID, Region, Category, Band) for the report filters.
+
+    Args:
+        file_path (str): Path of the Excel file
+
+    Returns:
+        pd.DataFrame: uid, Region, Category and Impact Band of each user (empty if the file
+            is missing or unreadable)
+    """
+    logger.info("Loading Client Demographics Excel...")
+
+    list_client = []
+    df_client = pd.DataFrame()
+
+    try:
+        if os.path.exists(file_path):
+            logger.info(f"Found file at {file_path}. Loading...")
+            client_data = pd.read_excel(file_path, converters={'username': str, 'uid': str}, keep_default_na=False)
+            list_client.append(client_data)
+        else:
+            logger.error(f"File not found at {file_path}")
+    except Exception as e:
+        logger.error(f"Error reading file: {e}")
+
+    if list_client:
+        df_client = pd.concat(list_client, ignore_index=True)\
+        .assign(uid = lambda x: x.apply(lambda y: str(y['User ID']) if pd.notnull(y['User ID']) else None, axis=1))\
+        .filter(['uid', 'Region', 'Category', 'Band'])\
+        .rename(columns={'Band':'Impact Band'})
+
+    return df_client
+
+
+def merge_client_demographics(df_demog, df_client):
+    """
+    Merge the base demographics (get_base_demographics_from_parquet) with the client's
+    (load_client_demographics); only users in both are kept.
+
+    Args:
+        df_demog (pd.DataFrame): Base demographics (uid, Language, Language_ord)
+        df_client (pd.DataFrame): Client demographics
+
+    Returns:
+        pd.DataFrame: Merged demographics (df_demog if either is empty)
+    """
+    if df_demog.empty or df_client.empty:
+        return df_demog
+
+    df_demog = df_demog.copy()
+    df_client = df_client.copy()
+    if 'uid' in df_demog.columns: df_demog['uid'] = df_demog['uid'].astype(str)
+    if 'uid' in df_client.columns: df_client['uid'] = df_client['uid'].astype(str)
+    return df_demog.merge(df_client, how='inner', on=['uid'])
+
+
+def get_base_demographics_from_parquet(pipeline, sim_ids, raw_data=None):
     """
     Extract base demographic data (uid, Language) from Parquet files.
     Equivalent to the SQL query for 'First Completed Attempt'.
+
+    raw_data (dict, optional): Tables of sim_ids already loaded (load_raw_data_for_analysis or
+    subset_raw_data), only read here; loaded from the pipeline if None.
     """
     logger.info("Extracting base demographics from Parquet...")
     
     # 1. Load Raw Data needed
-    raw_data = pipeline.load_raw_data_for_analysis(sim_ids=sim_ids)
+    if raw_data is None:
+        raw_data = pipeline.load_raw_data_for_analysis(sim_ids=sim_ids)
     df_logs = raw_data.get('user_sim_log')
     if df_logs is None or df_logs.empty:
         return pd.DataFrame()
 
     # 2. Filter Completed & Relevant Sims
-    # Handle bytes vs int comparison for 'complete' column (Parquet stores as bytes)
-    if df_logs['complete'].dtype == object:
-        # Bytes comparison (b'\x01' for True)
-        complete_mask = df_logs['complete'] == b'\x01'
-    else:
-        # Integer comparison
-        complete_mask = df_logs['complete'] == 1
+    # BIT columns are decoded to int8 on load (lake.decode_bit_columns)
+    complete_mask = df_logs['complete'] == 1
 
     df_logs_complete = df_logs[
         complete_mask &
@@ -2903,7 +3317,9 @@ def get_base_demographics_from_parquet(pipeline, sim_ids):
 def get_transformed_data_from_parquet(pipeline, sim_ids, start_date, end_date, df_demog=None,
                                        dict_project=None,
                                        ec2_id=None, ec2_region='us-east-1',
-                                       s3_bucket_name='etu.appsciences', s3_region='us-east-1'):
+                                       s3_bucket_name='etu.appsciences', s3_region='us-east-1',
+                                       use_xml_cache=True, xml_max_age_hours=DEFAULT_MAX_AGE_HOURS, xml_workers=None,
+                                       use_embedding_cache=True, topic_workers=None, raw_data=None):
     """
     Load raw data from Parquet and transform it into the format expected by the report.
 
@@ -2919,15 +3335,28 @@ def get_transformed_data_from_parquet(pipeline, sim_ids, start_date, end_date, d
         ec2_region (str, optional): AWS region for EC2 instance (default: 'us-east-1')
         s3_bucket_name (str, optional): S3 bucket name for XML files (default: 'etu.appsciences')
         s3_region (str, optional): AWS region for S3 bucket (default: 'us-east-1')
+        use_xml_cache (bool, optional): Cache sim XML files and the sim models built from them
+            in the pipeline's lake (default: True)
+        xml_max_age_hours (float, optional): Hours a cached XML is trusted before re-checking EC2
+            (None = until the cache is cleared)
+        xml_workers (int, optional): Processes parsing sim XML files (default: one per CPU)
+        use_embedding_cache (bool, optional): Keep the embeddings of free-text answers on local
+            disk so later runs only embed new answers (default: True)
+        topic_workers (int, optional): Processes fitting BERTopic for free-text questions
+            (default: one per CPU)
+        raw_data (dict, optional): Tables of sim_ids already loaded (load_raw_data_for_analysis,
+            or subset_raw_data of tables shared by a batch); modified in place. Loaded from the
+            pipeline if None.
     """
     logger.info(f"Transforming data for sims: {sim_ids}")
     
     # 1. Load Raw Data
     # NOTE: Do NOT pass date filters here - let filter_logs_and_users handle date filtering
     # to match original SQL behavior (which calculates first_start_dt before filtering)
-    raw_data = pipeline.load_raw_data_for_analysis(
-        sim_ids=sim_ids
-    )
+    if raw_data is None:
+        raw_data = pipeline.load_raw_data_for_analysis(
+            sim_ids=sim_ids
+        )
     
     df_logs = raw_data.get('user_sim_log')
     df_sims = raw_data.get('simulation')
@@ -2936,21 +3365,6 @@ def get_transformed_data_from_parquet(pipeline, sim_ids, start_date, end_date, d
         logger.warning("No user_sim_log data found.")
         return {}
         
-    # [Rest of casting and date logic...]
-    if 'start' in df_logs.columns:
-        df_logs['start'] = pd.to_datetime(df_logs['start'])
-    if 'end' in df_logs.columns:
-        df_logs['end'] = pd.to_datetime(df_logs['end'])
-
-    # Ensure BIT columns are integers
-    for col in ['complete', 'pass', 'assess']:
-        if col in df_logs.columns:
-            def convert_bit(x):
-                if isinstance(x, bytes): return int.from_bytes(x, "big")
-                try: return int(x)
-                except: return 0
-            df_logs[col] = df_logs[col].apply(convert_bit)
-        
     start_dt = pd.to_datetime(start_date)
     end_dt = pd.to_datetime(end_date)
     
@@ -2966,7 +3380,10 @@ def get_transformed_data_from_parquet(pipeline, sim_ids, start_date, end_date, d
     # -------------------------------------------------------------------------
     # This creates the "valid population" for most downstream stats.
     # Note: df_logs_filtered contains only Role=1, First Attempt >= Start Date, etc.
-    df_logs_filtered, valid_uids = filter_logs_and_users(raw_data, sim_ids, start_dt, end_dt)
+    # The context casts start/end and the BIT columns of user_sim_log (in place),
+    # filters once and ranks first/last attempts; every transformation below reuses it.
+    context = AnalysisContext(raw_data, sim_ids, start_dt, end_dt)
+    df_logs_filtered, valid_uids = context.logs_filtered, context.valid_uids
 
     # -------------------------------------------------------------------------
     # TRANSFORMATION 1: Learner Engagement
@@ -3015,38 +3432,8 @@ def get_transformed_data_from_parquet(pipeline, sim_ids, start_date, end_date, d
     df_logs.sort_values(['userid', 'simid', 'start'], inplace=True)
     df_logs['attempt_calc'] = df_logs.groupby(['userid', 'simid']).cumcount() + 1
     if 'pass' not in df_logs.columns: df_logs['pass'] = 0 
-    
-    pass_results = []
-    
-    for simid, group in df_logs.groupby('simid'):
-        user_status = []
-        for userid, user_logs in group.groupby('userid'):
-            passed_logs = user_logs[user_logs['pass'] == 1]
-            if not passed_logs.empty:
-                first_pass = passed_logs.iloc[0]
-                status = f"Passed Attempt {min(first_pass['attempt_calc'], 4)}" 
-                if first_pass['attempt_calc'] >= 4:
-                    status = "Passed Attempt 4+"
-                else:
-                    status = f"Passed Attempt {first_pass['attempt_calc']}"
-            else:
-                completed_logs = user_logs[user_logs['complete'] == 1]
-                status = "Completed, not yet Passed" if not completed_logs.empty else "Incomplete"
-            
-            if status != "Incomplete": user_status.append(status)
-                
-        from collections import Counter
-        counts = Counter(user_status)
-        total = sum(counts.values())
-        rows = [
-            {'simid': simid, 'stat_order': 1, 'stat': 'Passed Attempt 1', 'n': counts.get('Passed Attempt 1', 0), 'total': total},
-            {'simid': simid, 'stat_order': 2, 'stat': 'Passed Attempt 2', 'n': counts.get('Passed Attempt 2', 0), 'total': total},
-            {'simid': simid, 'stat_order': 3, 'stat': 'Passed Attempt 3', 'n': counts.get('Passed Attempt 3', 0), 'total': total},
-            {'simid': simid, 'stat_order': 4, 'stat': 'Passed Attempt 4+', 'n': counts.get('Passed Attempt 4+', 0), 'total': total},
-            {'simid': simid, 'stat_order': 5, 'stat': 'Completed, not yet Passed', 'n': counts.get('Completed, not yet Passed', 0), 'total': total}
-        ]
-        pass_results.extend(rows)
-    df_pass_rates = pd.DataFrame(pass_results)
+
+    df_pass_rates = get_overall_pass_rates(df_logs)
     if not df_pass_rates.empty and not df_sims.empty:
         df_pass_rates = df_pass_rates.merge(df_sims[['simid', 'name']], on='simid', how='left')
         df_pass_rates.rename(columns={'name': 'simname'}, inplace=True)
@@ -3068,17 +3455,19 @@ def get_transformed_data_from_parquet(pipeline, sim_ids, start_date, end_date, d
     # -------------------------------------------------------------------------
     # TRANSFORMATION 5: Skill Baseline & Survey Responses
     # -------------------------------------------------------------------------
-    df_skill_baseline = get_skill_baseline(pipeline, raw_data, sim_ids, start_dt, end_dt)
-    df_survey_responses = get_survey_responses(pipeline, raw_data, sim_ids, start_dt, end_dt)
+    df_skill_baseline = get_skill_baseline(pipeline, raw_data, sim_ids, start_dt, end_dt, context=context)
+    embedding_cache = EmbeddingCache.from_pipeline(pipeline) if use_embedding_cache and BERTOPIC_AVAILABLE else None
+    df_survey_responses = get_survey_responses(pipeline, raw_data, sim_ids, start_dt, end_dt, context=context,
+                                               embedding_cache=embedding_cache, topic_workers=topic_workers)
 
     # -------------------------------------------------------------------------
     # TRANSFORMATION 6: Additional Sim-Level Metrics (NEWLY IMPLEMENTED)
     # -------------------------------------------------------------------------
     logger.info("Calculating additional sim-level metrics...")
-    df_skill_improvement = get_skill_improvement(pipeline, raw_data, sim_ids, start_dt, end_dt, show_hidden_skills=True)
-    df_time_spent = get_time_spent(pipeline, raw_data, sim_ids, start_dt, end_dt)
-    df_practice_mode = get_practice_mode(pipeline, raw_data, sim_ids, start_dt, end_dt)
-    df_learner_engagement_over_time = get_learner_engagement_over_time(pipeline, raw_data, sim_ids, start_dt, end_dt)
+    df_skill_improvement = get_skill_improvement(pipeline, raw_data, sim_ids, start_dt, end_dt, show_hidden_skills=True, context=context)
+    df_time_spent = get_time_spent(pipeline, raw_data, sim_ids, start_dt, end_dt, context=context)
+    df_practice_mode = get_practice_mode(pipeline, raw_data, sim_ids, start_dt, end_dt, context=context)
+    df_learner_engagement_over_time = get_learner_engagement_over_time(pipeline, raw_data, sim_ids, start_dt, end_dt, context=context)
 
     # Decision levels (full implementation with EC2 SSM support)
     # Returns tuple: (df_decision_levels, df_sim_model_levels)
@@ -3086,7 +3475,12 @@ def get_transformed_data_from_parquet(pipeline, sim_ids, start_date, end_date, d
     df_decision_levels, df_sim_model_levels = get_decision_levels(
         pipeline, raw_data, sim_ids, start_dt, end_dt,
         ec2_id=ec2_id, ec2_region=ec2_region,
-        s3_bucket_name=s3_bucket_name, s3_region=s3_region
+        s3_bucket_name=s3_bucket_name, s3_region=s3_region,
+        context=context,
+        xml_cache=XmlCache.from_pipeline(pipeline) if use_xml_cache else None,
+        xml_max_age_hours=xml_max_age_hours,
+        sim_model_store=SimModelStore.from_pipeline(pipeline) if use_xml_cache else None,
+        xml_workers=xml_workers
     )
 
     # -------------------------------------------------------------------------
@@ -0,0 +1,428 @@
+"""
+Sim XML Cache for ETU Applied Sciences
+======================================
+
+Sim XML files live on the EC2 app server (/usr/local/etu_sims/{fileUrl}) and are
+only reachable through SSM: copy to S3, wait for the command, read, delete. They
+almost never change, so get_decision_levels keeps a content-addressed copy:
+
+    {root}/xml_cache/refs/{sha1(fileUrl)}.json      fileUrl -> sha256, EC2 fingerprint, timestamps
+    {root}/xml_cache/objects/{sha256[:2]}/{sha256}.xml
+
+The root is the pipeline's lake root, so the cache sits in local_data_dir in local
+mode and under a stable prefix of the data bucket otherwise.
+
+An entry verified less than `max_age_hours` ago is used without contacting EC2.
+Older entries are checked against the file's EC2 mtime/size (`stat`, no copy) and
+only re-fetched when it changed. All files of a report are stat'ed and copied in
+batched SSM commands rather than one command per sim.
+
+Example:
+    >>> cache = XmlCache.from_pipeline(pipeline)
+    >>> contents, errors = get_sim_xmls(cache, file_urls, ec2_id, ec2_region, 'etu.appsciences', 'us-east-1')
+
+Author: ETU Applied Sciences
+Date: 2025-11-20
+"""
+
+import hashlib
+import logging
+import shlex
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import boto3
+
+if __package__:
+    from . import lake
+else:
+    import lake  # Running as a script
+
+logger = logging.getLogger('XmlCache')
+
+# Where the sim XML files live on the EC2 app server
+EC2_SIMS_DIR = '/usr/local/etu_sims/'
+
+# Transient S3 prefix used to copy a file off EC2 (deleted after reading)
+S3_XML_PREFIX = 'appsciences/xml/'
+
+# SSM keeps only the first 24,000 characters of a command's output; stay well below
+SSM_MAX_OUTPUT_CHARS = 20000
+
+# Concurrent `aws s3 cp` processes on the EC2 instance
+EC2_MAX_COPIES = 8
+
+# Trust a cache entry this long before re-checking the EC2 file (None = never re-check)
+DEFAULT_MAX_AGE_HOURS = 24
+
+
+def content_hash(xml_content):
+    """sha256 of the XML text."""
+    return hashlib.sha256(xml_content.encode('utf-8')).hexdigest()
+
+
+class XmlCache:
+    """
+    Content-addressed store of sim XML files keyed by fileUrl.
+    """
+
+    def __init__(self, filesystem, root):
+        """
+        Args:
+            filesystem (pyarrow.fs.FileSystem): Filesystem from lake.get_filesystem()
+            root (str): Lake root (local directory or bucket)
+        """
+        self.fs = filesystem
+        self.root = f'{root}/xml_cache'
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """Cache in the lake of a ParquetPipeline (local_data_dir or its S3 bucket)."""
+        return cls(pipeline.fs, pipeline.lake_root)
+
+    def ref_path(self, file_url):
+        key = hashlib.sha1(file_url.encode('utf-8')).hexdigest()
+        return f'{self.root}/refs/{key}.json'
+
+    def object_path(self, sha256):
+        return f'{self.root}/objects/{sha256[:2]}/{sha256}.xml'
+
+    def lookup(self, file_url):
+        """
+        Get the cache entry of a fileUrl.
+
+        Returns:
+            dict or None: file_url, sha256, fingerprint, size, fetched_at, verified_at
+        """
+        try:
+            return lake.read_json(self.fs, self.ref_path(file_url))
+        except Exception as e:
+            logger.warning(f"Unreadable XML cache entry for {file_url} ({e})")
+            return None
+
+    def is_fresh(self, entry, max_age_hours=DEFAULT_MAX_AGE_HOURS):
+        """Check whether an entry was verified recently enough to skip EC2."""
+        if entry is None:
+            return False
+        if max_age_hours is None:
+            return True
+        verified_at = datetime.strptime(entry['verified_at'], '%Y-%m-%d %H:%M:%S')
+        return (datetime.now() - verified_at).total_seconds() < max_age_hours * 3600
+
+    def read(self, entry):
+        """
+        Read the XML of an entry.
+
+        Returns:
+            str or None: XML text, or None if the object is missing or corrupt
+        """
+        path = self.object_path(entry['sha256'])
+        if not lake.is_file(self.fs, path):
+            return None
+        with self.fs.open_input_stream(path) as f:
+            xml_content = f.read().decode('utf-8')
+        if content_hash(xml_content) != entry['sha256']:
+            logger.warning(f"XML cache object {path} doesn't match its hash, ignoring it")
+            return None
+        return xml_content
+
+    def put(self, file_url, xml_content, fingerprint=None):
+        """
+        Store the XML of a fileUrl (the object is only written if it's new).
+
+        Args:
+            file_url (str): simulation.fileUrl
+            xml_content (str): XML text
+            fingerprint (str, optional): EC2 file fingerprint (see ec2_fingerprints)
+
+        Returns:
+            dict: The new entry
+        """
+        sha256 = content_hash(xml_content)
+        path = self.object_path(sha256)
+        if not lake.is_file(self.fs, path):
+            lake.ensure_parent_dir(self.fs, path)
+            with self.fs.open_output_stream(path) as f:
+                f.write(xml_content.encode('utf-8'))
+
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        entry = {
+            'file_url': file_url,
+            'sha256': sha256,
+            'fingerprint': fingerprint,
+            'size': len(xml_content),
+            'fetched_at': now,
+            'verified_at': now,
+        }
+        lake.write_json(self.fs, self.ref_path(file_url), entry, atomic=True)
+        return entry
+
+    def touch(self, entry):
+        """Mark an entry as verified now (the EC2 file is unchanged)."""
+        entry = dict(entry, verified_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        lake.write_json(self.fs, self.ref_path(entry['file_url']), entry, atomic=True)
+        return entry
+
+
+# ============================================================================
+# EC2 ACCESS (SSM)
+# ============================================================================
+
+def run_ssm_command(ssm_client, ec2_id, commands, delay=1, max_attempts=120):
+    """
+    Run shell commands on the EC2 instance and wait for them to finish.
+
+    Args:
+        ssm_client: boto3 SSM client
+        ec2_id (str): EC2 instance ID
+        commands (list): Shell commands
+        delay (int): Seconds between status polls
+        max_attempts (int): Polls before giving up
+
+    Returns:
+        str: Standard output of the commands
+    """
+    response = ssm_client.send_command(
+        InstanceIds=[ec2_id],
+        DocumentName="AWS-RunShellScript",
+        Parameters={'commands': commands}
+    )
+    command_id = response['Command']['CommandId']
+
+    # The invocation isn't registered immediately after send_command
+    time.sleep(delay)
+
+    waiter = ssm_client.get_waiter('command_executed')
+    waiter.wait(
+        CommandId=command_id,
+        InstanceId=ec2_id,
+        PluginName='aws:RunShellScript',
+        WaiterConfig={'Delay': delay, 'MaxAttempts': max_attempts},
+    )
+
+    output = ssm_client.get_command_invocation(
+        CommandId=command_id,
+        InstanceId=ec2_id,
+    )
+    return output.get('StandardOutputContent', '')
+
+
+def ec2_fingerprints(ssm_client, ec2_id, file_urls):
+    """
+    Get the mtime/size of sim XML files on EC2 without copying them.
+
+    The files are stat'ed in as few SSM commands as fit their output under the
+    SSM output limit (SSM_MAX_OUTPUT_CHARS).
+
+    Args:
+        ssm_client: boto3 SSM client
+        ec2_id (str): EC2 instance ID
+        file_urls (list): simulation.fileUrl values
+
+    Returns:
+        dict: file_url -> '<mtime> <size>' (None if the file can't be stat'ed)
+    """
+    fingerprints = {file_url: None for file_url in file_urls}
+
+    # One output line per file: "{file_url}|{mtime} {size}"
+    chunks, chunk, chunk_chars = [], [], 0
+    for file_url in fingerprints:
+        line_chars = len(file_url) + 32
+        if chunk and chunk_chars + line_chars > SSM_MAX_OUTPUT_CHARS:
+            chunks.append(chunk)
+            chunk, chunk_chars = [], 0
+        chunk.append(file_url)
+        chunk_chars += line_chars
+    if chunk:
+        chunks.append(chunk)
+
+    for chunk in chunks:
+        commands = [
+            f"printf '%s|%s\\n' {shlex.quote(file_url)} "
+            f"\"$(stat -c '%Y %s' {shlex.quote(EC2_SIMS_DIR + file_url)} 2>/dev/null)\""
+            for file_url in chunk
+        ]
+        output = run_ssm_command(ssm_client, ec2_id, commands)
+        for line in output.splitlines():
+            file_url, _, fingerprint = line.rpartition('|')
+            if file_url in fingerprints:
+                fingerprints[file_url] = fingerprint.strip() or None
+    return fingerprints
+
+
+def s3_xml_key(file_url):
+    """Transient S3 key of a sim XML copied off EC2."""
+    return S3_XML_PREFIX + '/'.join(file_url.split('/')[1:])
+
+
+def fetch_xmls_from_ec2(file_urls, ec2_id, ec2_region, s3_bucket_name, s3_region, max_workers=8,
+                        max_copies=EC2_MAX_COPIES):
+    """
+    Copy sim XML files from EC2 to S3 via SSM, read them and delete the S3 copies.
+
+    All files are copied by one SSM command (at most max_copies copies at a time on
+    the instance), read back concurrently and deleted with one request.
+    (Legacy extract_data process from skillwell_functions.py lines 2763-2828)
+
+    Args:
+        file_urls (list): simulation.fileUrl values
+        ec2_id (str): EC2 instance ID
+        ec2_region (str): EC2 region
+        s3_bucket_name (str): Bucket for the transient copies
+        s3_region (str): Region of that bucket
+        max_workers (int): Concurrent S3 reads
+        max_copies (int): Concurrent `aws s3 cp` on the EC2 instance
+
+    Returns:
+        tuple: (dict file_url -> XML text, dict file_url -> Exception for the files that failed)
+    """
+    file_urls = list(dict.fromkeys(file_urls))
+    if not file_urls:
+        return {}, {}
+
+    s3 = boto3.client('s3', region_name=s3_region)
+    ssm_client = boto3.client('ssm', region_name=ec2_region)
+
+    # Copy all files from EC2 to S3 via one SSM command: xargs runs the copies, max_copies at a
+    # time, from (fileUrl, source, destination) triples; only the failures are printed
+    copy_args = ' '.join(
+        shlex.quote(arg)
+        for file_url in file_urls
+        for arg in (file_url, EC2_SIMS_DIR + file_url, f's3://{s3_bucket_name}/{s3_xml_key(file_url)}')
+    )
+    copy_script = 'aws s3 cp "$2" "$3" > /dev/null || echo "FAILED $1"'
+    commands = [
+        f"printf '%s\\0' {copy_args} | xargs -0 -n 3 -P {max(1, max_copies)} sh -c {shlex.quote(copy_script)} sh"
+    ]
+    output = run_ssm_command(ssm_client, ec2_id, commands)
+    failed_copies = {line[len('FAILED '):].strip() for line in output.splitlines() if line.startswith('FAILED ')}
+
+    def read_xml(file_url):
+        response = s3.get_object(Bucket=s3_bucket_name, Key=s3_xml_key(file_url))
+        return response['Body'].read().decode('utf-8')
+
+    contents, errors = {}, {}
+    to_read = [file_url for file_url in file_urls if file_url not in failed_copies]
+    for file_url in failed_copies:
+        errors[file_url] = RuntimeError(f"aws s3 cp failed on EC2 for {file_url}")
+
+    # Read contents of XML Files from S3 Bucket
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(to_read) or 1))) as executor:
+        futures = {executor.submit(read_xml, file_url): file_url for file_url in to_read}
+        for future in as_completed(futures):
+            file_url = futures[future]
+            try:
+                contents[file_url] = future.result()
+                logger.info(f"  ✓ Copied from EC2 and read from S3: {s3_xml_key(file_url)}")
+            except Exception as e:
+                errors[file_url] = e
+
+    # Delete XML files from S3 Bucket (cleanup)
+    if contents:
+        s3.delete_objects(
+            Bucket=s3_bucket_name,
+            Delete={'Objects': [{'Key': s3_xml_key(file_url)} for file_url in contents], 'Quiet': True}
+        )
+        logger.info(f"  ✓ {len(contents)} XML file(s) copied and deleted from S3 Bucket successfully.")
+
+    return contents, errors
+
+
+def get_sim_xmls(cache, file_urls, ec2_id, ec2_region, s3_bucket_name, s3_region,
+                 max_age_hours=DEFAULT_MAX_AGE_HOURS):
+    """
+    Get the XML of several sims, going to EC2 only for what the cache can't answer.
+
+    1. Entries verified within max_age_hours -> cached XML, no SSM call
+    2. Older entries -> one batched stat on EC2; unchanged files -> cached XML
+    3. The rest -> one batched copy from EC2 (fetch_xmls_from_ec2), then cached
+
+    So a project costs at most two SSM round trips, however many sims it has.
+
+    Args:
+        cache (XmlCache or None): XML cache (None = always fetch)
+        file_urls (list): simulation.fileUrl values
+        ec2_id (str): EC2 instance ID
+        ec2_region (str): EC2 region
+        s3_bucket_name (str): Bucket for the transient copies
+        s3_region (str): Region of that bucket
+        max_age_hours (float, optional): Trust window of cache entries
+
+    Returns:
+        tuple: (dict file_url -> XML text, dict file_url -> Exception for the files that failed)
+    """
+    file_urls = list(dict.fromkeys(file_urls))
+    contents = {}
+    entries = {}
+
+    if cache is not None:
+        for file_url in file_urls:
+            entries[file_url] = cache.lookup(file_url)
+            if cache.is_fresh(entries[file_url], max_age_hours):
+                xml_content = cache.read(entries[file_url])
+                if xml_content is not None:
+                    logger.info(f"  ✓ XML cache hit: {file_url}")
+                    contents[file_url] = xml_content
+
+    pending = [file_url for file_url in file_urls if file_url not in contents]
+    if not pending:
+        return contents, {}
+
+    fingerprints = {}
+    if cache is not None and ec2_id:
+        try:
+            ssm_client = boto3.client('ssm', region_name=ec2_region)
+            fingerprints = ec2_fingerprints(ssm_client, ec2_id, pending)
+        except Exception as e:
+            logger.warning(f"  ⚠ Could not stat the XML files on EC2 ({e})")
+
+        for file_url in pending:
+            entry = entries.get(file_url)
+            fingerprint = fingerprints.get(file_url)
+            if entry is not None and fingerprint is not None and entry.get('fingerprint') == fingerprint:
+                xml_content = cache.read(entry)
+                if xml_content is not None:
+                    cache.touch(entry)
+                    logger.info(f"  ✓ XML cache hit (unchanged on EC2): {file_url}")
+                    contents[file_url] = xml_content
+
+        pending = [file_url for file_url in pending if file_url not in contents]
+        if not pending:
+            return contents, {}
+
+    try:
+        fetched, errors = fetch_xmls_from_ec2(pending, ec2_id, ec2_region, s3_bucket_name, s3_region)
+    except Exception as e:
+        fetched, errors = {}, {file_url: e for file_url in pending}
+
+    for file_url, xml_content in fetched.items():
+        if cache is not None:
+            cache.put(file_url, xml_content, fingerprints.get(file_url))
+        contents[file_url] = xml_content
+
+    # EC2 unreachable - a stale copy is better than no decision levels
+    for file_url in list(errors):
+        entry = entries.get(file_url)
+        xml_content = cache.read(entry) if cache is not None and entry is not None else None
+        if xml_content is not None:
+            logger.warning(f"  ⚠ Could not fetch {file_url} ({errors[file_url]}); using cached copy from {entry['fetched_at']}")
+            contents[file_url] = xml_content
+            del errors[file_url]
+
+    return contents, errors
+
+
+def get_sim_xml(cache, file_url, ec2_id, ec2_region, s3_bucket_name, s3_region,
+                max_age_hours=DEFAULT_MAX_AGE_HOURS):
+    """
+    Get the XML of one sim (see get_sim_xmls).
+
+    Returns:
+        str: XML text
+    """
+    contents, errors = get_sim_xmls(cache, [file_url], ec2_id, ec2_region, s3_bucket_name, s3_region,
+                                    max_age_hours=max_age_hours)
+    if file_url in errors:
+        raise errors[file_url]
+    return contents[file_url]
@@ -27,6 +27,10 @@
 #
 #              report:         Takes results from extract_data and creates a Dashboard HTML file
 #
+#              write_report:   Streams the Dashboard HTML to an open file/stream, section by section
+#
+#              report_to_file: Writes the Dashboard HTML straight to a file (no full-page string in memory)
+#
 # Programmer:    Martin McSharry
 # Creation Date: 18-Feb-2024
 # ---------------------------------------------------------------------------
@@ -41,9 +45,13 @@
 import numpy as np
 import pandas as pd
 import json
+import boto3
 from datetime import date, timedelta, datetime
 import time
 import html
+import io
+import base64
+import gzip
 import re
 import xml.etree.ElementTree as ET
 import unicodedata
@@ -53,6 +61,9 @@ import shutil
 from subprocess import call
 import json
 
+# Precompiled, memoized cleaner of sim XML text (shared with skillwell_etl.transform.xml_to_df)
+from skillwell_etl.text_clean import clean_xml_text
+
 
 port = 7737
 
@@ -682,22 +693,17 @@ def xml_to_df(file, split_score=False):
 		x_loc = int(element.attrib["x"])
 		y_loc = int(element.attrib["y"])
 
-		choice = re.sub(r'<[^>]*>', '', element.find("./dialog/statement").text.replace('<br />', '?br?').replace('<br>', '?br?')).replace('?br?', '<br>') if element.find("./dialog/statement").text is not None else None
-		choice = html.unescape(choice).replace(u'\xa0', u' ').replace(u'\r', '') if choice is not None else None
-		choice = stringcleaner(choice) if choice is not None else None
+		choice = element.find("./dialog/statement").text
+		choice = clean_xml_text(choice) if choice is not None else None
 
 
-		result = re.sub(r'<[^>]*>', '', element.find("./dialog/response").text.replace('<br />', '?br?').replace('<br>', '?br?')).replace('?br?', '<br>') if element.find("./dialog/response").text is not None else None
-		result = html.unescape(result).replace(u'\xa0', u' ').replace(u'\r', '') if result is not None else None
-		result = stringcleaner(result) if result is not None else None
-		#result = element.find("./dialog/response").text
+		result = element.find("./dialog/response").text
+		result = clean_xml_text(result) if result is not None else None
 
 
 		practice_coach = element.find("./dialog/coach")
-		if practice_coach is not None:
-			coaching = re.sub(r'<[^>]*>', '', practice_coach.text.replace('<br />', '?br?').replace('<br>', '?br?')).replace('?br?', '<br>') if practice_coach.text is not None else None
-			coaching = html.unescape(coaching).replace(u'\xa0', u' ').replace(u'\r', '') if coaching is not None else None
-			coaching = stringcleaner(coaching) if coaching is not None else None
+		if practice_coach is not None and practice_coach.text is not None:
+			coaching = clean_xml_text(practice_coach.text)
 		else:
 			coaching = None
 
@@ -721,8 +727,7 @@ def xml_to_df(file, split_score=False):
 				sectionid = int(section)
 				section = stringcleaner(dictSection.get(int(section)))
 
-		section = html.unescape(section).replace(u'\xa0', u' ').replace(u'\r', '').replace(u'\n', '') if section is not None else None
-		section = stringcleaner(section) if section is not None else None
+		section = clean_xml_text(section, 'section') if section is not None else None
 
 		performancebranch = element.find("./adaptivity/triggers/performancebranch")
 		if performancebranch is not None:
@@ -746,20 +751,16 @@ def xml_to_df(file, split_score=False):
 					startingpoint = score_.attrib["id"].split("-")[0]
 					qtype = score_.find("./type").text
 					feedback = score_.find("./coach").text
-					feedback = re.sub(r'<[^>]*>', '', feedback.replace('<br>', '?br?')).replace('?br?', '<br>') if feedback is not None else None
-					feedback = html.unescape(feedback).replace(u'\xa0', u' ').replace(u'\r', '') if feedback is not None else None
-					feedback = stringcleaner(feedback) if feedback is not None else None
+					feedback = clean_xml_text(feedback, 'feedback') if feedback is not None else None
 
 					behavior = score_.find("./behavior")
 					if behavior is not None:
 						behaviorid = behavior.attrib['refId']
-						behavior = stringcleaner(behavior.text)
-						behavior = html.unescape(behavior).replace(u'\xa0', u' ').replace(u'\r', '').replace(u'\n', '') if behavior is not None else None
+						behavior = clean_xml_text(behavior.text, 'plain')
 
 					consequence = score_.find("./consequence")
 					if consequence is not None:
-						consequence = stringcleaner(consequence.text)
-						consequence = html.unescape(consequence).replace(u'\xa0', u' ').replace(u'\r', '').replace(u'\n', '') if consequence is not None else None
+						consequence = clean_xml_text(consequence.text, 'plain')
 
 					for score in score_.findall("./skill/score"):
 						if score.attrib["refId"] is not None:
@@ -767,11 +768,7 @@ def xml_to_df(file, split_score=False):
 						else:
 							skillid.append(score.attrib["refId"])
 
-						this_skillname = score.attrib["label"].strip().replace('\u200b', '')
-						this_skillname = re.sub(r'<[^>]*>', '', this_skillname.replace('<br>', '?br?')).replace('?br?', '<br>') if this_skillname is not None else None
-						this_skillname = html.unescape(this_skillname).replace(u'\xa0', u' ').replace(u'\r', '') if this_skillname is not None else None
-						this_skillname = stringcleaner(this_skillname) if this_skillname is not None else None
-						skillname.append(this_skillname)
+						skillname.append(clean_xml_text(score.attrib["label"], 'label'))
 						skillscore.append(score.attrib["value"])
 				except:
 					pass
@@ -5708,11 +5705,154 @@ def extract_data(
 	return dict_df
 
 
+# ------------------------------------------------------------>
+# ----- Functions to embed DataFrames in the HTML Report ----->
+# ------------------------------------------------------------>
+
+def _json_float(value):
+	"""A float as to_json writes it (10 decimals, or 10 significant digits when very large or small; NaN/inf -> None)."""
+	if not math.isfinite(value):
+		return None
+	magnitude = abs(value)
+	if magnitude >= 1e16 or 0 < magnitude < 1e-15:
+		return float('{0:.10g}'.format(value))
+	return round(value, 10)
+
+
+
+def _json_column(series):
+	"""The values of a column as to_json(orient='records') writes them, as Python objects."""
+	dtype = series.dtype
+	if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_float_dtype(dtype):
+		is_float = pd.api.types.is_float_dtype(dtype)
+		mask = series.isna().tolist()
+		values = series.astype(object).tolist()
+		return [None if missing else (_json_float(float(v)) if is_float else v) for v, missing in zip(values, mask)]
+	if pd.api.types.is_datetime64_any_dtype(dtype) or pd.api.types.is_timedelta64_dtype(dtype):
+		# Epoch milliseconds (UTC for time zone aware dates)
+		mask = series.isna().tolist()
+		values = series.dt.as_unit('ms').array.asi8.tolist()
+		return [None if missing else v for v, missing in zip(values, mask)]
+	if pd.api.types.is_string_dtype(dtype):
+		values = series.astype(object).tolist()
+		if all(v is None or isinstance(v, str) or (isinstance(v, float) and v != v) or v is pd.NA for v in values):
+			return [v if isinstance(v, str) else None for v in values]
+	# Other values (lists, dicts, mixed types...): converted by to_json, one column at a time
+	return json.loads(series.to_json(orient='values'))
+
+
+
+def columnar_table(df):
+	"""
+	Converts a DataFrame into the compact, column-oriented table the HTML report embeds
+	(decoded back into records by decodeTable() in decodeData.js).
+
+	Values are converted as by to_json(orient='records') (NaN -> null, dates -> epoch ms), column by
+	column, so the table is never held as a whole in another form.
+	String columns where each value repeats on average at least twice are dictionary-encoded.
+
+	Args:
+		df (pandas.DataFrame): The table to convert.
+
+	Returns:
+		dict: {"n": number of rows, "c": column names, "v": values of each column - a list, or
+			{"d": distinct values, "i": index in "d" of each row's value}}
+	"""
+	n_rows = len(df)
+	list_values = []
+	for j in range(df.shape[1]):
+		values = _json_column(df.iloc[:, j])
+		if n_rows > 0 and all(v is None or isinstance(v, str) for v in values):
+			dict_codes = {}
+			codes = [dict_codes.setdefault(v, len(dict_codes)) for v in values]
+			if len(dict_codes) <= n_rows // 2:
+				list_values.append({'d': list(dict_codes), 'i': codes})
+				continue
+		list_values.append(values)
+
+	return {'n': n_rows, 'c': [c.item() if isinstance(c, np.generic) else c for c in df.columns], 'v': list_values}
+
+
+
+def write_table_json(out, df, compact=False):
+	"""
+	Writes a DataFrame to the HTML report as a JavaScript expression evaluating to its records.
+
+	Args:
+		out (file-like): Text stream the HTML is written to.
+		df (pandas.DataFrame): The table to write.
+		compact (bool, optional): Write decodeTable({...}) of columnar_table(df) (no whitespace, no repeated
+			column names) instead of to_json(orient='records', indent=1). Defaults to False.
+	"""
+	if compact:
+		out.write('decodeTable(')
+		# "</" would close the <script> block (to_json escapes every "/" instead)
+		out.write(json.dumps(columnar_table(df), separators=(',', ':'), ensure_ascii=False).replace('</', '<\\/'))
+		out.write(')')
+	else:
+		df.to_json(out, orient='records', indent=1)
+
+
+
+# Tab (openTab name) showing each part of dict_df
+TAB_NAMES = {'proj': 'multisim_data', 'sim': 'sim_data', 'srv': 'srv_data', 'dmg': 'dmg_data'}
+
+# Tables the selectors and filters use at page load (never moved to tab data files or compressed)
+TAB_DATA_INLINE = ['sims', 'proj_sims', 'dmg_vars']
+
+
+
+def write_tab_data(out, entries, compact=False):
+	"""
+	Writes the tables of one dashboard tab as the JSON loaded by loadTabData (decodeData.js): the content
+	of a tab data file, or of a compressed data block.
+
+	Args:
+		out (file-like): Text stream the JSON is written to.
+		entries (list): (variable name, keys under the variable, DataFrame) of each table,
+			e.g. ("data_component_dmg", ["dmg_engagement", "dataSemi"], df).
+		compact (bool, optional): Write the tables in compact columnar form. Defaults to False.
+	"""
+	out.write('{{"compact":{0},"entries":['.format('true' if compact else 'false'))
+	for i, (name, keys, df) in enumerate(entries):
+		out.write('{0}{{"name":{1},"keys":{2},"table":'.format(',' if i > 0 else '', json.dumps(name), json.dumps(keys)))
+		if compact:
+			out.write(json.dumps(columnar_table(df), separators=(',', ':'), ensure_ascii=False))
+		else:
+			df.to_json(out, orient='records')
+		out.write('}')
+	out.write(']}')
+
+
+
+def write_data_var(out, name, df, compact=False):
+	"""
+	Writes the JavaScript variable holding a table's records to the HTML report.
+
+	Args:
+		out (file-like): Text stream the HTML is written to.
+		name (str): Name of the variable (e.g. "data_component_survey_responses").
+		df (pandas.DataFrame): The table to write.
+		compact (bool, optional): Embed the table in compact form, decoded the first time the variable is used
+			(defineLazyData in decodeData.js). Defaults to False.
+	"""
+	if compact:
+		out.write('defineLazyData("{0}", function(){{ return '.format(name))
+		write_table_json(out, df, compact=True)
+		out.write('; });')
+	else:
+		out.write('var {0} = '.format(name))
+		write_table_json(out, df)
+		out.write(';')
+
+
+
 # ------------------------------------------------->
 # ----- Function for creating the HTML Report ----->
 # ------------------------------------------------->
 
-def report(
+def write_report(
+	out,
 	dict_df,
 	start_date,
 	end_date,
@@ -5720,11 +5860,16 @@ def report(
 	survey_comment_limit=None,
 	demog_filters=None,
 	mckinsey=False,
+	compact_data=False,
+	compress_data=False,
+	tab_data_path=None,
 	):
 	"""
-	Generates an HTML report from the extracted and summarized data.
+	Writes the HTML report of the extracted and summarized data to a text stream, one section
+	(and one table's JSON) at a time, so the page is never held as one string.
 
 	Args:
+		out (file-like): Text stream the HTML is written to (e.g. an open file or io.StringIO).
 		dict_df (dict): A dictionary containing the extracted and summarized data.
 		start_date (str): The start date for the data included in the report.
 		end_date (str): The end date for the data included in the report.
@@ -5732,13 +5877,17 @@ def report(
 		survey_comment_limit (int, optional): Integer to limit the number of comments from each free-text question. Defaults to None.
 		demog_filters (pandas.DataFrame, optional): DataFrame containing demographic filters. Defaults to None.
 		mckinsey (bool, optional): Flag to indicate if the report is for McKinsey. Defaults to False.
-
-	Returns:
-		str: The generated HTML report as a string.
+		compact_data (bool, optional): Embed the tables as compact column arrays, decoded in the browser on first use
+			(decodeData.js), instead of indented records (smaller, for single-file reports). Defaults to False.
+		compress_data (bool, optional): Embed the data of each tab gzipped and base64-encoded, decompressed when the page
+			loads (DecompressionStream, or a JavaScript inflate in older browsers). Defaults to False.
+		tab_data_path (str, optional): Path prefix of per-tab data files. The data of every tab but the first goes to
+			'{tab_data_path}_data_{tab}.json' (next to the HTML file), fetched when the tab is first opened; the page
+			then has to be served over HTTP(S). Defaults to None (all data in the page, e.g. for email).
 	"""
   
 	if mckinsey:
-		html_page = '''
+		out.write('''
 			<!DOCTYPE html>
 			<html xmlns="http://www.w3.org/1999/xhtml">
 
@@ -5762,11 +5911,12 @@ def report(
 					<script type = "text/javascript" src="createFilterData.js"></script>
 					<script type = "text/javascript" src="chart_drag_drop.js"></script>
 					<script type = "text/javascript" src="createSummaryData.js"></script>
+					<script type = "text/javascript" src="decodeData.js"></script>
 				</head>
 
-			'''
+			''')
 	else:
-			html_page = '''
+			out.write('''
 		<!DOCTYPE html>
 		<html xmlns="http://www.w3.org/1999/xhtml">
 
@@ -5790,11 +5940,12 @@ def report(
 				<script type = "text/javascript" src="createFilterData.js"></script>
 				<script type = "text/javascript" src="chart_drag_drop.js"></script>
 				<script type = "text/javascript" src="createSummaryData.js"></script>
+				<script type = "text/javascript" src="decodeData.js"></script>
 			</head>
 
-		'''
+		''')
 
-	html_page += '''
+	out.write('''
 	<body class="main">
 
 		<div class="main-container">
@@ -5851,7 +6002,7 @@ def report(
 												Survey Results
 											</a>
 										</li>
-	'''
+	''')
 
 	# Add demographics tab conditionally - create it here before adding to HTML
 	demog_tab_html_early = '''
@@ -5861,15 +6012,15 @@ def report(
 											</a>
 										</li>''' if len(dict_df.get('dmg', [])) > 0 else ''
 
-	html_page += demog_tab_html_early
+	out.write(demog_tab_html_early)
 
-	html_page += '''
+	out.write('''
 									</ul>
 								</div>
 							</div>
 						</nav>
 
-	'''
+	''')
 
 	# Top Menu Items
 	hovered_num = 0
@@ -5987,7 +6138,7 @@ def report(
 	for item in sim_list:
 		sim_list_html += f"<li>{item}</li>"
 
-	html_page += '''
+	out.write('''
 
 		<!-- TOP MENU -->
 		<div class="selectsubmenu sim_data srv_data dmg_data">
@@ -6403,7 +6554,7 @@ def report(
 		date.today().strftime("%b %-d, %Y"),
 		datetime.strptime(start_date, "%Y-%m-%d").strftime("%b %-d, %Y") + ' - ' + datetime.strptime(end_date, "%Y-%m-%d").strftime("%b %-d, %Y"),
 		sim_list_html,
-	)
+	))
 
 
 	# Add DIVs to page
@@ -6454,7 +6605,7 @@ def report(
 
 					#top = '''.style("margin-top", "60px");''' if key2 in ("learner_engagement", "proj_engagement", "survey", "dmg_learner_counts") else ';'
 
-					html_page += '''
+					out.write('''
 					// Append div to html page to render chart in
 					d3.select("#component_content_{1}")
 					  .append("div")
@@ -6490,65 +6641,91 @@ def report(
 						key1,
 						dict_component_title.get(key2),
 						";", #top
-					)
+					))
 
 
 
 
 
-	# Add data to page
+	# Add data to page (with tab data files, the tables of every tab but the first go to the tab's file;
+	# with compressed data, the tables of the other tabs go to one compressed block per tab)
+	list_tabs = [key for key in dict_df if len(dict_df[key]) > 0]
+	list_file_tabs = list_tabs[1:] if tab_data_path is not None else []
+	list_compressed_tabs = [key for key in list_tabs if key not in list_file_tabs] if compress_data else []
+	dict_tab_entries = {}
 	for key1 in dict_df:
 		if key1 == "dmg":
 			if len(dict_df[key1]) > 0:
 				for i_key2, key2 in enumerate(dict_df[key1]):
 
 					if key2 == "dmg_vars":
-						html_page += '''
-							var data_component_{0} = {1};
+						out.write('''
+							''')
+						write_data_var(out, 'data_component_' + key2, dict_df[key1][key2], compact=compact_data)
+						out.write('''
 
-						'''.format(
-							key2,
-							dict_df[key1][key2].to_json(orient='records', indent=1)
-						)
+						''')
+
+					elif key1 in list_file_tabs or key1 in list_compressed_tabs:
+						dict_tab_entries.setdefault(key1, []).append(('data_component_dmg', [key2, 'dataSemi'], dict_df[key1][key2]))
 
 					else:
 
 						if i_key2 == 1:
-							html_page += '''
-								var data_component_dmg = {
-							'''
+							out.write('''
+								{0} {{
+							'''.format(
+								'defineLazyData("data_component_dmg", function(){ return' if compact_data else 'var data_component_dmg ='
+							))
 
-						html_page += '''
-							"{0}": {{ "dataSemi":{1} }},
-						'''.format(
-							key2,
-							dict_df[key1][key2].to_json(orient='records', indent=1)
-						)
+						out.write('''
+							"{0}": {{ "dataSemi":'''.format(key2))
+						write_table_json(out, dict_df[key1][key2], compact=compact_data)
+						out.write(''' },
+						''')
 
 						if i_key2 == (len(dict_df[key1])-1):
-							html_page += '''
-								};
+							out.write('''
+								{0}
 
-							'''
+							'''.format('}; });' if compact_data else '};'))
 
 		else:
 			if len(dict_df[key1]) > 0:
 				for key2 in dict_df[key1]:
 
-					html_page += '''
-						var data_component_{0} = {1};
-
-					'''.format(
-						key2,
-						dict_df[key1][key2].to_json(orient='records', indent=1)
-					)
+					if (key1 in list_file_tabs or key1 in list_compressed_tabs) and key2 not in TAB_DATA_INLINE:
+						dict_tab_entries.setdefault(key1, []).append(('data_component_' + key2, [], dict_df[key1][key2]))
+						continue
+
+					out.write('''
+						''')
+					write_data_var(out, 'data_component_' + key2, dict_df[key1][key2], compact=compact_data)
+					out.write('''
+
+					''')
+
+	for key1 in dict_tab_entries:
+		if key1 in list_file_tabs:
+			file_path = '{0}_data_{1}.json'.format(tab_data_path, key1)
+			with open(file_path, 'w', encoding='utf-8') as outfile:
+				write_tab_data(outfile, dict_tab_entries[key1], compact=compact_data)
+			out.write('''
+		registerTabData("{0}", "{1}");
+		'''.format(key1, os.path.basename(file_path)))
+		else:
+			tab_data = io.StringIO()
+			write_tab_data(tab_data, dict_tab_entries[key1], compact=compact_data)
+			out.write('''
+		registerTabData("{0}", null, "{1}");
+		'''.format(key1, base64.b64encode(gzip.compress(tab_data.getvalue().encode('utf-8'), mtime=0)).decode('ascii')))
 
 
 
 	# Add Project Selector (if required)
 	if len(dict_df['proj']) > 0:
 
-		html_page += '''
+		out.write('''
 
 		// ----- List of all Projects ----->
 		var projs = Array.from(new Set(data_component_proj_sims.map(d => d['project'])));
@@ -6559,23 +6736,23 @@ def report(
 			projSelector.appendChild(currentOption);
 		}
 
-		'''
+		''')
 
 	# Fill in Sim Selector
-	html_page += '''
+	out.write('''
 
 	// ----- List of all Sims ----->
 	var sims = Array.from(new Set(data_component_sims.map(d => d['simname'])));
 	simSelector = document.querySelector('.sim_filter');
 
-	'''
+	''')
 
 
 
 	# Add Demographic Selector (if required)
 	if demog_filters is not None:
 
-		html_page += '''
+		out.write('''
 
 		// ----- Add options to Demographic Variable Selector ----->
 		var demogs = {0};
@@ -6610,7 +6787,7 @@ def report(
 		}}
 		*/
 
-		'''.format(demog_filters.filter(['demog_var', 'demog_val']).drop_duplicates().to_json(orient='records', indent=1))
+		'''.format(demog_filters.filter(['demog_var', 'demog_val']).drop_duplicates().to_json(orient='records', indent=1)))
 
 
 
@@ -6618,7 +6795,7 @@ def report(
 	# Add Demographic code (if required)
 	if len(dict_df['dmg']) > 0:
 
-		html_page += '''
+		out.write('''
 			var filters = Array.from(new Set(data_component_dmg_vars.map(d => d["demog_var"])));
 			var selected_filter = filters[0];
 			var dataFilter = createFilterData(data_component_dmg_vars.filter(d => d["demog_val"] != null));
@@ -6733,7 +6910,7 @@ def report(
 
 			});
 
-		'''
+		''')
 
 
 
@@ -6750,12 +6927,12 @@ def report(
 		if len(dict_df[key1]) > 0:
 
 			# Add updateGraphs_sim function to page
-			html_page += '''
+			out.write('''
 			function updateGraphs_{0}(){{
 
 				if({1}.value != ""){{
 
-			'''.format(key1, selector)
+			'''.format(key1, selector))
 
 
 			proj_selector = 'd["project"] == projSelector.value && ' if dict_project is not None else ''
@@ -6766,7 +6943,7 @@ def report(
 
 			for key2 in dict_df[key1]:
 				if key2 == 'learner_engagement':
-					html_page += '''
+					out.write('''
 					// LEARNER ENGAGEMENT
 
 					d3.select("#contentsub_{0}").remove();
@@ -7102,14 +7279,14 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
 
 
 				if key2 == 'learner_engagement_over_time':
-					html_page += '''
+					out.write('''
 					// LEARNER ENGAGEMENT OVER TIME
 
 					d3.select("#contentsub_{0}").remove();
@@ -7260,12 +7437,12 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
 				if key2 == 'overall_pass_rates':
-					html_page += '''
+					out.write('''
 					// OVERALL PASS RATES
 
 					d3.select("#contentsub_{0}").remove();
@@ -7399,14 +7576,14 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
 
 
 				if key2 == 'skill_pass_rates':
-					html_page += '''
+					out.write('''
 					// SKILL PASS RATES
 
 					d3.select("#contentsub_{0}").remove();
@@ -7578,14 +7755,14 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
 
 
 				if key2 == 'skill_baseline':
-					html_page += '''
+					out.write('''
 					// SKILL SCORES - BASELINE
 
 					d3.select("#contentsub_{0}").remove();
@@ -7735,12 +7912,12 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
 				if key2 == 'skill_improvement':
-					html_page += '''
+					out.write('''
 					// SKILL SCORES - IMPROVEMENT
 
 					d3.select("#contentsub_{0}").remove();
@@ -7890,14 +8067,14 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
 
 
 				if key2 == 'decision_levels':
-					html_page += '''
+					out.write('''
 					// DECISION LEVEL SUMMARY
 
 					d3.select("#contentsub_{0}").remove();
@@ -8063,14 +8240,14 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
 
 
 				if key2 == 'behaviors':
-					html_page += '''
+					out.write('''
 					// LEARNER BEHAVIORS AND DECISIONS
 
 					d3.select("#contentsub_{0}").remove();
@@ -8216,14 +8393,14 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
 
 
 				if key2 == 'time_spent':
-					html_page += '''
+					out.write('''
 					// TIME SPENT IN TASK MODE
 
 					d3.select("#contentsub_{0}").remove();
@@ -8339,12 +8516,12 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
 				if key2 == 'practice_mode':
-					html_page += '''
+					out.write('''
 					// PRACTICE MODE
 
 					d3.select("#contentsub_{0}").remove();
@@ -8542,12 +8719,12 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
 				if key2 == 'knowledge_check_1':
-					html_page += '''
+					out.write('''
 					// KNOWLEDGE CHECK
 
 					d3.select("#contentsub_knowledge_check").remove();
@@ -8776,7 +8953,7 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 
 
 
@@ -8784,7 +8961,7 @@ def report(
 
 					srv_comment_limit = survey_comment_limit if survey_comment_limit is not None else "Infinity"
 
-					html_page += '''
+					out.write('''
 					// SURVEY RESPONSES
 
 					d3.select("#contentsub_{0}").remove();
@@ -9276,10 +9453,10 @@ def report(
 					}}
 
 
-					'''.format(key2, proj_selector, dmg_selector, srv_comment_limit)
+					'''.format(key2, proj_selector, dmg_selector, srv_comment_limit))
 
 				if key2 == 'proj_engagement':
-					html_page += '''
+					out.write('''
 					// PROJECT - LEARNER ENGAGEMENT
 
 					d3.select("#contentsub_{0}").remove();
@@ -9432,11 +9609,11 @@ def report(
 					}}
 
 
-					'''.format(key2, dmg_selector)
+					'''.format(key2, dmg_selector))
 
 				
 				if key2 == 'proj_engagement_over_time':
-					html_page += '''
+					out.write('''
 					// PROJECT - LEARNER ENGAGEMENT OVER TIME
 
 					d3.select("#contentsub_{0}").remove();
@@ -9573,10 +9750,10 @@ def report(
 
 					}}
 
-					'''.format(key2, dmg_selector)
+					'''.format(key2, dmg_selector))
 
 				if key2 == 'proj_performance_comparison_sim':
-					html_page += '''
+					out.write('''
 					// PERFORMANCE IN SHARED SKILLS ACROSS SIMS
 					// Remove the existing element with ID "contentsub_proj_performance_comparison_sim" if it exists
 					d3.select("#contentsub_{0}").remove();
@@ -9705,12 +9882,12 @@ def report(
 
 					}}
 
-					'''.format(key2, proj_selector, dmg_selector)
+					'''.format(key2, proj_selector, dmg_selector))
 				
 
 				if key2 == 'proj_learner_counts_comparison_sim':
 					
-					html_page += '''
+					out.write('''
 					// LEARNER COUNTS SIM COMPARISON
 					// Remove the existing learner count comparison component if it exists
 					d3.select("#contentsub_{0}").remove();
@@ -9860,10 +10037,10 @@ def report(
 
 					}}
 
-					'''.format(key2, dmg_selector)
+					'''.format(key2, dmg_selector))
 
 				if key2 == 'proj_overall_pass_rates':
-					html_page += '''
+					out.write('''
 					// OVERALL PASS RATES BY SIM
 
 					d3.select("#contentsub_{0}").remove();
@@ -10059,11 +10236,11 @@ def report(
 					}}
 
 
-					'''.format(key2, dmg_selector)
+					'''.format(key2, dmg_selector))
 
 
 				if key2 == 'proj_skill_pass_rates':
-					html_page += '''
+					out.write('''
 					// SKILL PASS RATES BY SIM
 
 					d3.select("#contentsub_{0}").remove();
@@ -10300,12 +10477,12 @@ def report(
 					}}
 
 
-					'''.format(key2, dmg_selector)
+					'''.format(key2, dmg_selector))
 
 
 				if key2 == 'proj_time_spent':
 
-					html_page += '''
+					out.write('''
 					// TIME SPENT IN TASK MODE BY SIM
 
 					d3.select("#contentsub_{0}").remove();
@@ -10412,11 +10589,11 @@ def report(
 
 					}}
 
-					'''.format(key2, dmg_selector)
+					'''.format(key2, dmg_selector))
 
 
 				if key2 == 'proj_practice_mode':
-					html_page += '''
+					out.write('''
 					// PRACTICE MODE BY SIM
 
 					d3.select("#contentsub_{0}").remove();
@@ -10639,12 +10816,12 @@ def report(
 					}}
 
 
-					'''.format(key2, dmg_selector)
+					'''.format(key2, dmg_selector))
 
 
 				if key2 == 'proj_shared_skill_polar':
 
-					html_page += '''
+					out.write('''
 					// PERFORMANCE IN SHARED SKILLS ACROSS SIMS
 
 					d3.select("#contentsub_{0}").remove();
@@ -10722,12 +10899,12 @@ def report(
 
 					}}
 
-					'''.format(key2, dmg_selector)
+					'''.format(key2, dmg_selector))
 
 
 				if key2 == 'proj_shared_skill_bar':
 
-					html_page += '''
+					out.write('''
 					// PERFORMANCE IN SHARED SKILLS ACROSS SIMS
 
 					d3.select("#contentsub_{0}").remove();
@@ -10837,10 +11014,10 @@ def report(
 
 					}}
 
-					'''.format(key2, dmg_selector)
+					'''.format(key2, dmg_selector))
 
 				if key2 == 'proj_nps':
-					html_page += '''
+					out.write('''
 					// NPS SCORE BY SIM
 
 					d3.select("#contentsub_{0}").remove();
@@ -10947,10 +11124,10 @@ def report(
 					);
 
 
-					'''.format(key2, dmg_selector)
+					'''.format(key2, dmg_selector))
 				
 				if key2 == 'proj_seat_time':
-					html_page += '''
+					out.write('''
 					// TIME SEAT REDUCTION
 					// Remove the existing element with ID "contentsub_proj_seat_time" if it exists
 
@@ -11173,10 +11350,10 @@ def report(
 					);
 
 
-					'''.format(key2, proj_selector)
+					'''.format(key2, proj_selector))
 					
 				if key2 == 'dmg_engagement':
-					html_page += '''
+					out.write('''
 					// DEMOGRAPHICS - LEARNER ENGAGEMENT
 
 					d3.select("#contentsub_{0}").remove();
@@ -11307,11 +11484,11 @@ def report(
 					/*}}*/
 
 
-					'''.format(key2, proj_selector)
+					'''.format(key2, proj_selector))
 
 
 				if key2 == 'dmg_skill_baseline':
-					html_page += '''
+					out.write('''
 					// DEMOGRAPHICS - SKILL PERFORMANCE BASELINE
 
 					d3.select("#contentsub_{0}").remove();
@@ -11410,11 +11587,11 @@ def report(
 					/*}}*/
 
 
-					'''.format(key2, proj_selector)
+					'''.format(key2, proj_selector))
 
 
 				if key2 == 'dmg_decision_levels':
-					html_page += '''
+					out.write('''
 					// DEMOGRAPHICS - DECISION LEVEL SUMMARY
 
 					d3.select("#contentsub_{0}").remove();
@@ -11573,7 +11750,7 @@ def report(
 
 
 
-					'''.format(key2, proj_selector)
+					'''.format(key2, proj_selector))
 
 
 
@@ -11582,7 +11759,7 @@ def report(
 
 				if key2 == 'dmg_learner_counts':
 
-					html_page += '''
+					out.write('''
 					// LEARNER COUNTS BY DEMOGRAPHIC
 
 					d3.select("#contentsub_{0}").remove();
@@ -11689,7 +11866,7 @@ def report(
 
 					}}
 
-					'''.format(key2, proj_selector)
+					'''.format(key2, proj_selector))
 
 
 
@@ -11697,7 +11874,7 @@ def report(
 
 				if key2 == 'dmg_skill':
 
-					html_page += '''
+					out.write('''
 					// SKILL PERFORMANCE BY DEMOGRAPHIC
 
 					d3.select("#contentsub_{0}").remove();
@@ -11774,7 +11951,7 @@ def report(
 
 					}}
 
-					'''.format(key2, proj_selector)
+					'''.format(key2, proj_selector))
 
 
 
@@ -11782,7 +11959,7 @@ def report(
 
 				if key2 == 'dmg_shared_skill':
 
-					html_page += '''
+					out.write('''
 					// PERFORMANCE IN SHARED SKILLS ACROSS SIMS BY DEMOGRAPHIC
 
 					d3.select("#contentsub_{0}").remove();
@@ -11859,14 +12036,14 @@ def report(
 
 					}}
 
-					'''.format(key2, proj_selector)
+					'''.format(key2, proj_selector))
 
 
 
 
 
 			# Close updateGraph function
-			html_page += '''
+			out.write('''
 				}}
 
 				// Adjust heights of collapsible content
@@ -11880,10 +12057,10 @@ def report(
 
 			}}
 
-			'''.format(key1)
+			'''.format(key1))
 
 
-	html_page += '''
+	out.write('''
 
 	// Function to assign "options" to drop-down menu
 	function assignOptions(textArray, selector) {
@@ -11933,69 +12110,69 @@ def report(
 
 	}
 
-	'''
+	''')
 
 
 
 	# Change Graphs when Demographic variable/value changes
 	if demog_filters is not None:
-		html_page += '''
+		out.write('''
 		demogvarSelector.addEventListener('change', function(){
 			// Change options in Demog Value selector
 			assignOptions(demogs.filter(d => d['demog_var'] == demogvarSelector.value ).map(d => d['demog_val']), demogvalSelector);
 
-		'''
+		''')
 
 		if len(dict_df['proj']) > 0:
-			html_page += '''
+			out.write('''
 			updateGraphs_proj();
-		'''
+		''')
 
 		if len(dict_df['sim']) > 0:
-			html_page += '''
+			out.write('''
 			updateGraphs_sim();
-		'''
+		''')
 
 		if len(dict_df['srv']) > 0:
-			html_page += '''
+			out.write('''
 			updateGraphs_srv();
-		'''
+		''')
 
-		html_page += '''
+		out.write('''
 		}, true);
 
-		'''
+		''')
 
 
-		html_page += '''
+		out.write('''
 		demogvalSelector.addEventListener('change', function(){
-		'''
+		''')
 
 		if len(dict_df['proj']) > 0:
-			html_page += '''
+			out.write('''
 			updateGraphs_proj();
-		'''
+		''')
 
 		if len(dict_df['sim']) > 0:
-			html_page += '''
+			out.write('''
 			updateGraphs_sim();
-		'''
+		''')
 
 		if len(dict_df['srv']) > 0:
-			html_page += '''
+			out.write('''
 			updateGraphs_srv();
-		'''
+		''')
 
-		html_page += '''
+		out.write('''
 		}, true);
 
-		'''
+		''')
 
 
 
 	# Change graphs when projSelector changes
 	if len(dict_df['proj']) > 0:
-		html_page += '''
+		out.write('''
 		// Update plots when dropdown selections change
 		projSelector.addEventListener('change', function(){
 			var proj_sims = Array.from(new Set(data_component_proj_sims.filter(d => d['project'] == projSelector.value ).map(d => d['simname'])));
@@ -12011,54 +12188,54 @@ def report(
 			assignOptions(proj_sims, simSelector);
 
 			updateGraphs_proj();
-		'''
+		''')
 
 		if len(dict_df['sim']) > 0:
-			html_page += '''
+			out.write('''
 			updateGraphs_sim();
-		'''
+		''')
 
 		if len(dict_df['srv']) > 0:
-			html_page += '''
+			out.write('''
 			updateGraphs_srv();
-		'''
+		''')
 
 		if len(dict_df['dmg']) > 0:
-			html_page += '''
+			out.write('''
 			updateGraphs_dmg();
-		'''
+		''')
 
-		html_page += '''
+		out.write('''
 		}, true);
-		'''
+		''')
 
 
 	# Change graphs when simSelector changes
-	html_page += '''
+	out.write('''
 	simSelector.addEventListener('change', function(){
 		d3.select("#sim_header").text(simSelector.value);
 
-	'''
+	''')
 
 	if len(dict_df['sim']) > 0:
-		html_page += '''
+		out.write('''
 		updateGraphs_sim();
-		'''
+		''')
 
 	if len(dict_df['srv']) > 0:
-		html_page += '''
+		out.write('''
 		updateGraphs_srv();
-		'''
+		''')
 
 	if len(dict_df['dmg']) > 0:
-		html_page += '''
+		out.write('''
 		updateGraphs_dmg();
-		'''
+		''')
 
-	html_page += '''
+	out.write('''
 
 	}, true);
-	'''
+	''')
 
 
 
@@ -12080,19 +12257,38 @@ def report(
 
 
 
+	# Tabs with a data file or compressed data: update their graphs once the data is in, loading a file when
+	# its tab is first opened and decompressing the compressed blocks right away
+	for key1 in dict_tab_entries:
+		update_functions = ['createSummaryData', 'updateGraphs_dmg'] if key1 == 'dmg' else ['updateGraphs_' + key1]
+		out.write('''
+		deferUntilTabData("{0}", {1});
+		'''.format(key1, json.dumps(update_functions)))
+
+	if any(key1 in list_file_tabs for key1 in dict_tab_entries):
+		out.write('''
+		loadTabDataOnOpen({0});
+		'''.format(json.dumps({TAB_NAMES[key1]: key1 for key1 in dict_tab_entries if key1 in list_file_tabs})))
+
+	for key1 in dict_tab_entries:
+		if key1 in list_compressed_tabs:
+			out.write('''
+		loadTabData("{0}");
+		'''.format(key1))
+
 	if len(dict_df['proj']) > 0:
-		html_page += '''
+		out.write('''
 		/* ----- Create initial version of graphs ----> */
 		assignOptions(Array.from(new Set(data_component_sims.filter(d => d['project'] == projSelector.value ).map(d => d['simname']))), simSelector);
-		'''
+		''')
 	else:
-		html_page += '''
+		out.write('''
 		/* ----- Create initial version of graphs ----> */
 		assignOptions(sims, simSelector);
-		'''
+		''')
 
 	if len(dict_df['proj']) > 0:
-		html_page += '''
+		out.write('''
 		d3.select("#sim_header_proj").selectAll(".tspan").remove();
 		Array.from(new Set(data_component_proj_sims.filter(d => d['project'] == projSelector.value ).map(d => d['simname']))).forEach(function(vSim, iSim, aSim){
 		  d3.select("#sim_header_proj")
@@ -12101,24 +12297,24 @@ def report(
 			  .text(vSim);
 		});
 
-		'''
+		''')
 
-	html_page += '''
+	out.write('''
 	d3.select("#sim_header").text(simSelector.value);
 
-	'''
+	''')
 
 	for key in dict_df:
 		if len(dict_df[key]) > 0:
 
 			updateFunction = 'createSummaryData();' if key == "dmg" else "updateGraphs_{0}();".format(key)
 
-			html_page += '''
+			out.write('''
 			{0}
-			'''.format(updateFunction)
+			'''.format(updateFunction))
 
 
-	html_page += '''
+	out.write('''
 
 
 	// ----- Collapsing Sections ----->
@@ -12179,10 +12375,10 @@ def report(
 	/* <----- Add hovered class in selected list item ----- */
 
 
-	'''
+	''')
 
 
-	html_page += '''
+	out.write('''
 		//]]>
 		</script>
 		</div>
@@ -12194,6 +12390,79 @@ def report(
 	
 	</body>
 	</html>
-	'''
+	''')
+
 
-	return html_page
\ No newline at end of file
+
+def report_to_file(
+	dict_df,
+	path,
+	start_date,
+	end_date,
+	dict_project=None,
+	survey_comment_limit=None,
+	demog_filters=None,
+	mckinsey=False,
+	compact_data=False,
+	compress_data=False,
+	tab_data_files=False,
+	):
+	"""
+	Writes the HTML report straight to a file, streaming it section by section.
+
+	Args:
+		dict_df (dict): A dictionary containing the extracted and summarized data.
+		path (str): Path of the HTML file to create.
+		start_date (str): The start date for the data included in the report.
+		end_date (str): The end date for the data included in the report.
+		dict_project, survey_comment_limit, demog_filters, mckinsey, compact_data, compress_data: See write_report.
+		tab_data_files (bool, optional): Write the data of every tab but the first to sibling JSON files
+			(e.g. index_data_dmg.json), loaded when the tab is first opened. Defaults to False (single file).
+
+	Returns:
+		str: The path of the HTML file.
+	"""
+	with open(path, 'w', encoding='utf-8') as outfile:
+		write_report(
+			outfile, dict_df, start_date, end_date,
+			dict_project=dict_project,
+			survey_comment_limit=survey_comment_limit,
+			demog_filters=demog_filters,
+			mckinsey=mckinsey,
+			compact_data=compact_data,
+			compress_data=compress_data,
+			tab_data_path=os.path.splitext(path)[0] if tab_data_files else None,
+		)
+	return path
+
+
+
+def report(
+	dict_df,
+	start_date,
+	end_date,
+	dict_project=None,
+	survey_comment_limit=None,
+	demog_filters=None,
+	mckinsey=False,
+	compact_data=False,
+	compress_data=False,
+	):
+	"""
+	Generates an HTML report from the extracted and summarized data (see write_report for the arguments).
+	Prefer report_to_file for large reports, which never holds the whole page in memory.
+
+	Returns:
+		str: The generated HTML report as a string.
+	"""
+	out = io.StringIO()
+	write_report(
+		out, dict_df, start_date, end_date,
+		dict_project=dict_project,
+		survey_comment_limit=survey_comment_limit,
+		demog_filters=demog_filters,
+		mckinsey=mckinsey,
+		compact_data=compact_data,
+		compress_data=compress_data,
+	)
+	return out.getvalue()
@@ -0,0 +1,61 @@
+"""
+Compaction tests for the Parquet lake: only the small delta parts are merged, the
+base file and large files are left as they are, and no row is lost or duplicated.
+
+Run from sprint1/:
+    python -m pytest -q tests
+"""
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from skillwell_etl import lake
+from skillwell_etl.pipeline import ParquetPipeline
+
+
+def make_rows(ids):
+    return pd.DataFrame({'id': list(ids), 'simid': [1 + i % 2 for i in ids],
+                         'start': pd.to_datetime(['2025-01-15'] * len(ids)), 'value': [i / 4 for i in ids]})
+
+
+def read_ids(pipeline, table_name):
+    return sorted(pipeline.read_parquet_dataset(table_name)['id'])
+
+
+def test_single_file_table_keeps_base_file(tmp_path):
+    pipeline = ParquetPipeline('bucket', 'cust', local_data_dir=str(tmp_path))
+    pipeline.write_parquet_to_s3(make_rows(range(1, 101)), 'score')
+    base_file = pipeline.read_manifest('score')['files'][0]
+    base_mtime = (tmp_path / 'raw_tables' / 'cust' / base_file).stat().st_mtime_ns
+
+    for start in (101, 111, 121):
+        pipeline.append_parquet_part(make_rows(range(start, start + 10)), 'score', id_column='id')
+
+    assert pipeline.compact_table('score', row_group_size=7) == 2
+    files = pipeline.read_manifest('score')['files']
+    assert len(files) == 2 and base_file in files
+    assert (tmp_path / 'raw_tables' / 'cust' / base_file).stat().st_mtime_ns == base_mtime
+    assert read_ids(pipeline, 'score') == list(range(1, 131))
+
+    # The merged part is written in row groups of row_group_size
+    merged = next(f for f in files if f != base_file)
+    metadata = pq.ParquetFile(str(tmp_path / 'raw_tables' / 'cust' / merged)).metadata
+    assert metadata.num_rows == 30 and metadata.row_group(0).num_rows == 7
+
+    # Only the base file and one part left: nothing to merge
+    assert pipeline.compact_table('score') == 0
+
+
+def test_large_files_are_not_merged(tmp_path):
+    pipeline = ParquetPipeline('bucket', 'cust', local_data_dir=str(tmp_path), partitioned=True)
+    pipeline.write_parquet_to_s3(make_rows(range(1, 51)), 'sim_score_log')
+    for start in (51, 61, 71):
+        pipeline.append_parquet_part(make_rows(range(start, start + 10)), 'sim_score_log', id_column='id')
+    before = pipeline.read_manifest('sim_score_log')['files']
+    large = [f for f in before if lake.count_rows(pipeline.fs, [pipeline.get_lake_path(f)]) >= 20]
+
+    # Per partition (simid=1, simid=2): the backfilled 25-row file stays, the three 5-row parts merge
+    assert pipeline.compact_table('sim_score_log', max_file_rows=20) == 4
+    after = pipeline.read_manifest('sim_score_log')['files']
+    assert len(large) == 2 and set(large) <= set(after) and len(after) == 4
+    assert read_ids(pipeline, 'sim_score_log') == list(range(1, 81))
@@ -0,0 +1,84 @@
+"""
+Watermark tests for the Parquet lake: a full backfill must leave a manifest whose
+max_id matches the rewritten data, so the next incremental update by id doesn't
+append rows the backfill already copied.
+
+Run from sprint1/:
+    python -m pytest -q tests
+"""
+
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from skillwell_etl.pipeline import ParquetPipeline
+
+
+class SQLiteConnection:
+    """Stand-in for a PyMySQL connection (cursor(cursor_class), %s parameters) over sqlite."""
+
+    def __init__(self):
+        # The partitioned writer reads the stream from its own thread
+        self.db = sqlite3.connect(':memory:', check_same_thread=False)
+        self.db.execute('CREATE TABLE sim_score_log (id INTEGER, simid INTEGER, value REAL, start TEXT)')
+
+    def insert(self, ids):
+        self.db.executemany('INSERT INTO sim_score_log VALUES (?, ?, ?, ?)',
+                            [(i, 1 + i % 2, i / 4, f'2025-0{1 + i % 3}-15 10:00:00') for i in ids])
+
+    def cursor(self, cursor_class=None):
+        return SQLiteCursor(self.db.cursor())
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class SQLiteCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.description = None
+
+    def execute(self, query, args=None):
+        self.cursor.execute(query.replace('%s', '?'), args or ())
+        self.description = self.cursor.description
+
+    def fetchmany(self, size):
+        return self.cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def close(self):
+        self.cursor.close()
+
+
+# pd.read_sql_query warns about DBAPI connections other than sqlite3/SQLAlchemy
+@pytest.mark.filterwarnings('ignore:pandas only supports SQLAlchemy')
+@pytest.mark.parametrize('partitioned', [False, True])
+def test_full_backfill_resets_max_id(tmp_path, partitioned):
+    pipeline = ParquetPipeline('bucket', 'cust', local_data_dir=str(tmp_path), partitioned=partitioned)
+    db = SQLiteConnection()
+    db.insert(range(1, 6))
+
+    # Backfill ids 1-5, then append 6-7 incrementally (watermark max_id 7)
+    pipeline.backfill_table('sim_score_log', db, chunksize=2)
+    db.insert([6, 7])
+    assert len(pipeline.update_table_incremental_by_id('sim_score_log', db)) == 2
+    assert pipeline.read_manifest('sim_score_log')['max_id'] == 7
+
+    # Rows 8-10 arrive; a full backfill copies all of 1-10
+    db.insert(range(8, 11))
+    pipeline.backfill_table('sim_score_log', db, chunksize=2)
+    assert pipeline.read_manifest('sim_score_log')['max_id'] == 10
+
+    # Nothing new: the incremental run must not copy 8-10 again
+    assert pipeline.update_table_incremental_by_id('sim_score_log', db) is None
+    db.insert([11])
+    assert len(pipeline.update_table_incremental_by_id('sim_score_log', db)) == 1
+
+    ids = pipeline.read_parquet_dataset('sim_score_log')['id']
+    assert sorted(ids) == list(range(1, 12))
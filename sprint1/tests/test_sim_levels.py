@@ -0,0 +1,25 @@
+"""
+Equivalence tests for sim_levels(): the 'graph' engine must return the same frame as
+the 'merge' engine it replaced, on random dialogue graphs from skillwell_etl.benchmarks.
+
+Run from sprint1/:
+    python -m pytest -q tests
+"""
+
+import pandas as pd
+
+from skillwell_etl.benchmarks import check_sim_levels, make_dialogue_links
+from skillwell_etl.transform import sim_levels
+
+
+def test_engines_agree_on_random_graphs():
+    assert check_sim_levels(n_graphs=200, seed=2025) == 200
+
+
+def test_engines_agree_on_large_graph():
+    df = make_dialogue_links(n_nodes=400, width=6, p_decision=0.6, p_back=0.01, n_roots=2, seed=1)
+    pd.testing.assert_frame_equal(sim_levels(df, engine='graph'), sim_levels(df, engine='merge'))
+
+
+def test_dialogue_links_are_reproducible():
+    pd.testing.assert_frame_equal(make_dialogue_links(seed=7), make_dialogue_links(seed=7))